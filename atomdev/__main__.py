@@ -0,0 +1,10 @@
+import multiprocessing
+import sys
+
+from atomdev.core.cli import main
+
+
+if __name__ == "__main__":
+    # Required by the search process pool in the frozen (PyInstaller) build.
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1,4 +1,5 @@
 import logging
+import os
 import sys
 from pathlib import Path
 
@@ -9,8 +10,10 @@ from pylizlib.core.os.snap import SnapshotSettings
 from pylizlib.core.os.utils import PATH_DEFAULT_GIT_BASH
 from pylizlib.qtfw.domain.setting import QtFwQConfigItem
 from pylizlib.qtfw.model.qconfig import TextListValidator, ExecutableValidator
-from qfluentwidgets import QConfig, ConfigItem, BoolValidator, qconfig, FolderValidator
+from qfluentwidgets import QConfig, ConfigItem, BoolValidator, qconfig, FolderValidator, RangeValidator, OptionsValidator, \
+    EnumSerializer
 
+from atomdev.core.archive import CompressionLevel
 from atomdev.project import version, name, authors
 
 # Application object
@@ -22,6 +25,8 @@ PATH_SCRIPTS = Path(app.get_path()).joinpath("Scripts")
 PATH_TRASH = Path(app.get_path()).joinpath("Trash")
 PATH_LOGS = Path(app.get_path()).joinpath("Logs")
 PATH_TEMP = Path(app.get_path()).joinpath("Temp")
+PATH_SEARCH_CACHE = PATH_TEMP.joinpath("SearchCache")
+PATH_SIZE_CACHE = PATH_TEMP.joinpath("SizeCache.json")
 PATH_BACKUPS = Path(app.get_path()).joinpath("Backups")
 PATH_JSON_SETTING_FILE = Path(app.get_path()).joinpath("Settings.json")
 
@@ -42,12 +47,24 @@ DEFAULT_SETTING_PATH_GIT_BASH = PATH_DEFAULT_GIT_BASH.__str__()
 DEFAULT_SETTING_CONFIG_BACKUP_BEFORE_INSTALL = True
 DEFAULT_SETTING_CONFIG_BACKUP_BEFORE_EDIT = False
 DEFAULT_SETTING_CONFIG_BACKUP_BEFORE_DELETE = True
+DEFAULT_SETTING_CATALOGUE_BLOB_STORE = False
+DEFAULT_SETTING_DELTA_INSTALL = True
+DEFAULT_SETTING_STAGED_INSTALL = True
+DEFAULT_SETTING_LINK_DUPLICATES = True
+DEFAULT_SETTING_EXPORT_COMPRESSION = CompressionLevel.NORMAL
+DEFAULT_SETTING_EXPORT_ZSTD = False
+DEFAULT_SETTING_BACKUP_MAX_COUNT = 10
+DEFAULT_SETTING_BACKUP_MAX_AGE_DAYS = 90
+DEFAULT_SETTING_BACKUP_MAX_SIZE_GB = 20
+DEFAULT_SETTING_SEARCH_WORKERS = max(1, min(8, (os.cpu_count() or 1) - 1))
+DEFAULT_SETTING_SEARCH_MAX_FILE_SIZE_MB = 256
 
 # DEFINIZIONE DEI GRUPPI DI IMPOSTAZIONI
 SETTING_GROUP_CONFIGS = "Configurazioni"
 SETTING_GROUP_SCRIPTS = "Scripts"
 SETTING_GROUP_FAVORITES = "Preferiti"
 SETTING_GROUP_APP = "App"
+SETTING_GROUP_SEARCH = "Ricerca"
 
 # GESTIONE RISORSE
 RESOURCE_ID_LOGO = ':/resources/logo2.png'
@@ -67,18 +84,45 @@ logger.info("{} Application Started. Version: {}", app.name, app.version)
 
 
 # DEFINIZIONE DELLE IMPOSTAZIONI DELL'APPLICAZIONE
+class QtFwQRangeConfigItem(QtFwQConfigItem):
+    """A QtFwQConfigItem with a numeric range, usable by RangeSettingCard."""
+
+    @property
+    def range(self):
+        return self.validator.range
+
+
+class QtFwQOptionsConfigItem(QtFwQConfigItem):
+    """A QtFwQConfigItem with a fixed set of options, usable by OptionsSettingCard."""
+
+    @property
+    def options(self):
+        return self.validator.options
+
+
 class AppSettings(QConfig):
     config_tags = QtFwQConfigItem(True, SETTING_GROUP_CONFIGS, "Tag configurazioni", DEFAULT_SETTING_CONFIGURATION_TAGS, TextListValidator())
     catalogue_path = QtFwQConfigItem(True, SETTING_GROUP_CONFIGS, "Catalogue Path", DEFAULT_SETTING_CATALOGUE_PATH, FolderValidator())
     backup_before_install = QtFwQConfigItem(True, SETTING_GROUP_CONFIGS, "Backup Before Install", DEFAULT_SETTING_CONFIG_BACKUP_BEFORE_INSTALL, BoolValidator())
     backup_before_edit = QtFwQConfigItem(True, SETTING_GROUP_CONFIGS, "Backup Before Edit", DEFAULT_SETTING_CONFIG_BACKUP_BEFORE_EDIT, BoolValidator())
     backup_before_delete = QtFwQConfigItem(True, SETTING_GROUP_CONFIGS, "Backup Before Delete", DEFAULT_SETTING_CONFIG_BACKUP_BEFORE_DELETE, BoolValidator())
+    backup_max_count = QtFwQRangeConfigItem(True, SETTING_GROUP_CONFIGS, "Backup Max Count", DEFAULT_SETTING_BACKUP_MAX_COUNT, RangeValidator(0, 100))
+    backup_max_age_days = QtFwQRangeConfigItem(True, SETTING_GROUP_CONFIGS, "Backup Max Age (days)", DEFAULT_SETTING_BACKUP_MAX_AGE_DAYS, RangeValidator(0, 365))
+    backup_max_size_gb = QtFwQRangeConfigItem(True, SETTING_GROUP_CONFIGS, "Backup Max Size (GB)", DEFAULT_SETTING_BACKUP_MAX_SIZE_GB, RangeValidator(0, 500))
+    catalogue_blob_store = QtFwQConfigItem(True, SETTING_GROUP_CONFIGS, "Catalogue Blob Store", DEFAULT_SETTING_CATALOGUE_BLOB_STORE, BoolValidator())
+    delta_install = QtFwQConfigItem(True, SETTING_GROUP_CONFIGS, "Delta Install", DEFAULT_SETTING_DELTA_INSTALL, BoolValidator())
+    staged_install = QtFwQConfigItem(True, SETTING_GROUP_CONFIGS, "Staged Install", DEFAULT_SETTING_STAGED_INSTALL, BoolValidator())
+    link_duplicates = QtFwQConfigItem(True, SETTING_GROUP_CONFIGS, "Link Duplicates", DEFAULT_SETTING_LINK_DUPLICATES, BoolValidator())
+    export_compression = QtFwQOptionsConfigItem(True, SETTING_GROUP_CONFIGS, "Export Compression", DEFAULT_SETTING_EXPORT_COMPRESSION, OptionsValidator(CompressionLevel), EnumSerializer(CompressionLevel))
+    export_zstd = QtFwQConfigItem(True, SETTING_GROUP_CONFIGS, "Export Zstd", DEFAULT_SETTING_EXPORT_ZSTD, BoolValidator())
     snap_custom_data = QtFwQConfigItem(False, SETTING_GROUP_CONFIGS, "Snapshots custom data", DEFAULT_SETTING_SNAPSHOTS_CUSTOM_DATA, TextListValidator())
     git_bash_path = QtFwQConfigItem(False, SETTING_GROUP_SCRIPTS, "Git Bash path", DEFAULT_SETTING_PATH_GIT_BASH, ExecutableValidator())
     starred_dirs = QtFwQConfigItem(True, SETTING_GROUP_FAVORITES,"Cartelle preferite", DEFAULT_SETTING_STARRED_DIRS, TextListValidator())
     starred_files = QtFwQConfigItem(False, SETTING_GROUP_FAVORITES,"File preferiti", DEFAULT_SETTING_STARRED_FILES, TextListValidator())
     starred_exes = QtFwQConfigItem(False, SETTING_GROUP_FAVORITES, "Eseguibili Preferiti", DEFAULT_SETTING_STARRED_EXES, TextListValidator())
     starred_services = QtFwQConfigItem(False, SETTING_GROUP_FAVORITES, "Servizi Preferiti", DEFAULT_SETTING_STARRED_SERVICES, TextListValidator())
+    search_workers = QtFwQRangeConfigItem(True, SETTING_GROUP_SEARCH, "Search workers", DEFAULT_SETTING_SEARCH_WORKERS, RangeValidator(1, 32))
+    search_max_file_size = QtFwQRangeConfigItem(True, SETTING_GROUP_SEARCH, "Search max file size (MB)", DEFAULT_SETTING_SEARCH_MAX_FILE_SIZE_MB, RangeValidator(1, 4096))
     debug_test_mode = QtFwQConfigItem(False, SETTING_GROUP_APP, "DebugTestMode", False, BoolValidator())
 
 
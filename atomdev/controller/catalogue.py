@@ -10,6 +10,8 @@ from scipy.optimize import direct
 
 from atomdev.application.app import app
 from atomdev.controller.catalogue_searcher import CatalogueSearcherController
+from atomdev.core.archive import is_zstd_available
+from atomdev.core.install import InstallStats
 from atomdev.domain.data import DevlizSnapshotData
 from atomdev.model.catalogue import CatalogueModel
 from atomdev.model.dashboard import DashboardModel
@@ -21,18 +23,20 @@ class CatalogueController:
 
     def __init__(self,dash_model: DashboardModel):
         self.dash_model = dash_model
-        self.model = CatalogueModel()
+        self.model = CatalogueModel(dash_model.snap_catalogue)
         self.view = SnapshotCatalogueWidget(self.model)
 
 
     def init(self):
         self.view.signal_import_requested.connect(lambda: self.__open_config_dialog(False, None))
         self.view.signal_install_requested.connect(self.__install_snapshot)
+        self.view.signal_rollback_install_requested.connect(self.__rollback_install)
         self.view.signal_edit_requested.connect(self.__edit_snapshot)
         self.view.signal_delete_requested.connect(self.__delete_snapshot)
         self.view.signal_open_folder_requested.connect(self.__open_snap_directory)
         self.view.signal_duplicate_requested.connect(self.__duplicate_snapshot)
         self.view.signal_sort_requested.connect(self.view.sort)
+        self.view.signal_sort_order_requested.connect(self.view.sort_order)
         self.view.signal_search_internal_content_all.connect(self.__open_snapshot_searcher)
         self.view.signal_search_internal_content_single.connect(self.__open_snapshot_searcher_single)
         self.view.signal_export_request_snapshot.connect(self.__export_snapshot)
@@ -40,6 +44,9 @@ class CatalogueController:
         self.view.signal_delete_installed_folders_requested.connect(self.__delete_snap_installed_dirs)
         self.view.signal_update_with_local_dirs_requested.connect(self.__update_assoc_dirs_from_installed)
         self.view.signal_open_assoc_folder_requested.connect(self.__open_directory)
+        self.view.signal_export_cancel_requested.connect(self.model.stop_export)
+        self.model.signal_export_finished.connect(self.__on_export_finished)
+        self.model.signal_export_failed.connect(self.__on_export_failed)
 
     def update_data(self, snapshot_data: DevlizSnapshotData):
         self.model.set_snapshots(snapshot_data.snapshot_list)
@@ -75,13 +82,35 @@ class CatalogueController:
 
     def __install_snapshot(self, snap: Snapshot):
         try:
-            w = MessageBox("Installa configurazione", "Sei sicuro di voler installare lo snapshot selezionato ? Tutte le directory presenti attualmente verranno rimpiazzate con quelle contenute nello snapshot.", parent=self.view)
+            w = MessageBox("Installa configurazione", "Sei sicuro di voler installare lo snapshot selezionato ? Le directory presenti attualmente verranno rese identiche a quelle contenute nello snapshot.", parent=self.view)
             if w.exec_():
-                self.dash_model.snap_catalogue.install(snap)
+                stats = self.dash_model.snap_catalogue.install(snap)
                 self.dash_model.update()
+                if stats is not None:
+                    self.__show_install_stats(stats)
         except Exception as e:
             UiUtils.show_message("Errore di installazione", "Si è verificato un errore durante l'installazione: " + str(e))
 
+    def __rollback_install(self, snap: Snapshot):
+        try:
+            w = MessageBox("Ripristina installazione precedente", "Sei sicuro di voler ripristinare le cartelle sostituite dall'ultima installazione delle directory dello snapshot selezionato ?", parent=self.view)
+            if w.exec_():
+                restored = self.dash_model.snap_catalogue.rollback_install(snap)
+                if restored:
+                    UiUtils.show_message("Ripristino completato", f"Cartelle ripristinate: {restored}")
+                else:
+                    UiUtils.show_message("Ripristino", "Nessuna installazione precedente da ripristinare per le cartelle dello snapshot selezionato.")
+        except Exception as e:
+            UiUtils.show_message("Errore di ripristino", "Si è verificato un errore durante il ripristino: " + str(e))
+
+    def __show_install_stats(self, stats: InstallStats):
+        testo = (f"File copiati: {stats.copied_files} ({stats.copied_size / (1024 * 1024):.2f} MB)\n"
+                 f"File eliminati: {stats.deleted_files}\n"
+                 f"File invariati: {stats.unchanged_files} ({stats.unchanged_size / (1024 * 1024):.2f} MB non ricopiati)")
+        if stats.failed_files:
+            testo += f"\n\nAttenzione: {stats.failed_files} file non sono stati aggiornati, controllare il log."
+        UiUtils.show_message("Installazione completata", testo)
+
     def __edit_snapshot(self, snap: Snapshot):
         try:
             self.__open_config_dialog(True, snap)
@@ -99,6 +128,12 @@ class CatalogueController:
 
     def __open_snap_directory(self, snap: Snapshot):
         path = self.dash_model.snap_catalogue.get_snap_directory_path(snap)
+        try:
+            # I file condivisi con i duplicati vanno copiati prima che l'utente possa modificarli
+            self.dash_model.snap_catalogue.unshare_files(snap)
+        except OSError as e:
+            logger.error(f"Errore durante la separazione dei file condivisi: {str(e)}")
+            UiUtils.show_message("Attenzione", "Alcuni file sono condivisi con le configurazioni duplicate e non è stato possibile separarli: modificarli cambierebbe anche i duplicati.\n\n" + str(e))
         self.__open_directory(path)
 
     def __duplicate_snapshot(self, snap: Snapshot):
@@ -120,9 +155,9 @@ class CatalogueController:
                     app.path.__str__()
                 )
                 if directory:
-                    self.dash_model.snap_catalogue.export_snapshot(snap.id, Path(directory))
+                    self.__start_export(snap, Path(directory), False)
         except Exception as e:
-            UiUtils.show_message("Errore di duplicazione", "Si è verificato un errore durante la duplicazione: " + str(e))
+            UiUtils.show_message("Errore di esportazione", "Si è verificato un errore durante l'esportazione: " + str(e))
 
     def __export_snapshot_folders(self, snap: Snapshot):
         try:
@@ -134,10 +169,32 @@ class CatalogueController:
                     app.path.__str__()
                 )
                 if directory:
-                    self.dash_model.snap_catalogue.export_assoc_dirs(snap.id, Path(directory))
+                    self.__start_export(snap, Path(directory), True)
         except Exception as e:
             UiUtils.show_message("Errore di esportazione", "Si è verificato un errore durante l'esportazione: " + str(e))
 
+    def __start_export(self, snap: Snapshot, directory: Path, assoc_dirs: bool):
+        if self.model.is_exporting():
+            UiUtils.show_message("Esportazione in corso", "Attendere il termine dell'esportazione in corso prima di avviarne un'altra.")
+            return
+        if self.model.get_export_options().zstd and not is_zstd_available():
+            UiUtils.show_message("Compressione Zstandard non disponibile", "Il pacchetto zstandard non è installato: disattivare la compressione Zstandard nelle impostazioni.")
+            return
+        # L'archivio viene scritto in background: chiudere l'avanzamento annulla l'esportazione
+        self.model.export_snapshot(snap, directory, assoc_dirs)
+        self.view.show_export_progress(f"Esportazione di {snap.name}")
+
+    def __on_export_finished(self, zip_path: Path | None):
+        if zip_path is None:
+            self.view.hide_export_progress()
+            return
+        self.view.hide_export_progress("Esportazione completata")
+        UiUtils.show_message("Esportazione completata", "Archivio creato in " + zip_path.__str__())
+
+    def __on_export_failed(self, error: str):
+        self.view.hide_export_progress()
+        UiUtils.show_message("Errore di esportazione", "Si è verificato un errore durante l'esportazione: " + error)
+
     def __delete_snap_installed_dirs(self, snap: Snapshot):
         try:
             w = MessageBox("Elimina cartelle installate", "Sei sicuro di voler eliminare le cartelle installate attualmente nel sistema relative allo snapshot selezionato ?", parent=self.view)
@@ -1,9 +1,15 @@
 import os
+import shutil
+import stat
+from pathlib import Path
 
 from qfluentwidgets import MessageBox
 
-from pylizlib.core.os.snap import SnapshotCatalogue, Snapshot
+from pylizlib.core.os.snap import Snapshot
 
+from atomdev.application.app import PATH_TEMP
+from atomdev.core.catalogue import DevlizSnapshotCatalogue
+from atomdev.core.query import SearchMode, parse_terms
 from atomdev.model.catalogue_searcher import CatalogueSearcherModel
 from atomdev.view.catalogue_searcher import CatalogueSearcherView
 
@@ -17,20 +23,21 @@ class CatalogueSearcherController:
     interactions from the view and invokes the corresponding actions in the model.
     """
 
-    def __init__(self, catalogue: SnapshotCatalogue, parent=None):
+    def __init__(self, catalogue: DevlizSnapshotCatalogue, parent=None):
         """
         Initializes the CatalogueSearcherController.
 
         Args:
-            catalogue (SnapshotCatalogue): The catalogue data source.
+            catalogue (DevlizSnapshotCatalogue): The catalogue data source.
             parent (QWidget, optional): The parent widget. Defaults to None.
         """
+        self.catalogue = catalogue
         self.view = CatalogueSearcherView(parent)
         self.model = CatalogueSearcherModel(catalogue)
 
         # Connect view and model
         self.view.setModel(self.model.table_model)
-        self.view.tree_view.setModel(self.model.tree_model_manager.model)
+        self.view.tree_view.setModel(self.model.tree_model)
 
         # Connect signals
         self.model.signal_search_finished.connect(self._on_search_finished)
@@ -51,14 +58,31 @@ class CatalogueSearcherController:
         """
         self.model.table_model.remove_snapshot(row)
 
-    def _on_file_double_clicked(self, file_path: str):
+    def _on_file_double_clicked(self, file_path: str, source_path: str):
         """
         Handles the double-click event on a file in the results tree.
-        Attempts to open the file with the default system application.
+        Attempts to open the file with the default system application. Files of
+        snapshots stored in the blob store do not exist at their path: a read-only
+        copy of their content is opened instead. Files shared with a duplicate
+        snapshot get their own copy first, so saving them does not change the other
+        snapshot; if that fails a read-only copy is opened.
 
         Args:
             file_path (str): The path to the file to open.
+            source_path (str): The path of the file holding its content.
         """
+        try:
+            if not os.path.exists(file_path) and source_path != file_path and os.path.isfile(source_path):
+                file_path = self.__get_preview_copy(file_path, source_path)
+            elif os.path.isfile(file_path):
+                try:
+                    self.catalogue.unshare_file(Path(file_path))
+                except OSError as e:
+                    print(f"Error unsharing file {file_path}, opening a read-only copy: {e}")
+                    file_path = self.__get_preview_copy(file_path, file_path)
+        except OSError as e:
+            print(f"Error opening file {file_path}: {e}")
+            return
         if os.path.isfile(file_path):
             try:
                 os.startfile(file_path)
@@ -67,12 +91,23 @@ class CatalogueSearcherController:
         elif os.path.isdir(file_path):
             print(f"Cannot open directory: {file_path}")
 
+    @staticmethod
+    def __get_preview_copy(file_path: str, source_path: str) -> str:
+        preview_dir = PATH_TEMP.joinpath("Anteprime", os.path.basename(os.path.dirname(source_path)) + os.path.basename(source_path))
+        preview_dir.mkdir(parents=True, exist_ok=True)
+        preview_path = preview_dir.joinpath(os.path.basename(file_path))
+        if not preview_path.exists():
+            shutil.copyfile(source_path, preview_path)
+            os.chmod(preview_path, stat.S_IREAD)
+        return str(preview_path)
+
     def _perform_search(self):
         """
         Gathers search parameters from the view and triggers a search in the model.
         """
         search_text = self.view.search_bar.text()
-        if not search_text.strip():
+        search_mode = self.view.get_selected_search_mode()
+        if not search_text.strip() or (search_mode == SearchMode.MULTI_TERM and not parse_terms(search_text)):
             m = MessageBox(
                 "Testo mancante",
                 "Per favore, inserisci un testo prima di avviare la ricerca.",
@@ -82,7 +117,6 @@ class CatalogueSearcherController:
             return
 
         self.view.set_operation_status(True)
-        query_type = self.view.get_selected_query_type()
         search_target = self.view.get_selected_search_target()
         extensions = self.view.get_selected_extensions()
 
@@ -90,7 +124,7 @@ class CatalogueSearcherController:
         self.view.action_start.setEnabled(False)
         self.view.action_stop.setEnabled(True)
 
-        self.model.search(search_text, query_type, search_target, extensions)
+        self.model.search(search_text, search_mode, search_target, extensions)
 
     def _stop_search(self):
         """Stops the search operation in the model and updates the UI state."""
@@ -112,10 +146,14 @@ class CatalogueSearcherController:
         Opens the search dialog window.
 
         Loads the specified snapshot(s) into the model and shows the dialog.
+        When the dialog is closed any running search is stopped and the search
+        process pool is released.
 
         Args:
             snapshot (Snapshot | None, optional): A specific snapshot to load,
                                                   or None to load all. Defaults to None.
         """
         self.model.load_snapshots_from_catalogue(snapshot)
-        self.view.exec_()
\ No newline at end of file
+        self.view.exec_()
+        self.model.stop_search()
+        self.model.dispose()
\ No newline at end of file
@@ -25,6 +25,10 @@ class SettingController:
         self.view.signal_open_dir_request.connect(self.__open_directory)
         self.view.signal_clear_backups_request.connect(self.__clear_backup_directory)
         self.view.signal_open_about_dialog_request.connect(self.__open_info_dialog)
+        AppSettings.catalogue_blob_store.valueChanged.connect(self.__on_blob_store_changed)
+        AppSettings.delta_install.valueChanged.connect(self.__on_delta_install_changed)
+        AppSettings.staged_install.valueChanged.connect(self.__on_staged_install_changed)
+        AppSettings.link_duplicates.valueChanged.connect(self.__on_link_duplicates_changed)
 
     def __ask_catalogue_path(self):
         directory = QFileDialog.getExistingDirectory(None, "Seleziona la cartella del catalogo")
@@ -37,6 +41,19 @@ class SettingController:
         else:
             logger.trace("Nessun percorso selezionato.")
 
+    def __on_blob_store_changed(self, enabled: bool):
+        # Vale solo per le nuove configurazioni: quelle esistenti si migrano con "python -m atomdev storage migrate"
+        self.dash_model.snap_catalogue.use_blob_store = enabled
+
+    def __on_delta_install_changed(self, enabled: bool):
+        self.dash_model.snap_catalogue.delta_install = enabled
+
+    def __on_staged_install_changed(self, enabled: bool):
+        self.dash_model.snap_catalogue.staged_install = enabled
+
+    def __on_link_duplicates_changed(self, enabled: bool):
+        self.dash_model.snap_catalogue.link_duplicates = enabled
+
     def __open_directory(self):
         import subprocess
         import platform
@@ -0,0 +1,366 @@
+import importlib.util
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import Callable, Iterable, BinaryIO
+
+from loguru import logger
+
+from atomdev.core.walker import walk
+
+
+ZIP_CHUNK_SIZE = 1024 * 1024
+DEFAULT_ZIP_WORKERS = max(1, min(8, (os.cpu_count() or 1) - 1))
+
+_ZIP_STORED = 0
+_ZIP_DEFLATED = 8
+_ZIP_ZSTANDARD = 93
+_ZIP64_LIMIT = 0xFFFFFFFF
+_ZIP64_ENTRIES_LIMIT = 0xFFFF
+# Files at least this large get ZIP64 sizes: their data may not fit 32 bits once compressed.
+_ZIP64_FILE_THRESHOLD = 0xF0000000
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_RECORD = struct.Struct("<IHHHHIIH")
+_ZIP64_END_RECORD = struct.Struct("<IQHHIIQQQQ")
+_ZIP64_END_LOCATOR = struct.Struct("<IIQI")
+_FLAG_UTF8 = 0x800
+
+
+class CompressionLevel(Enum):
+    """How hard the files of an archive are compressed."""
+    STORE = "store"
+    FAST = "fast"
+    NORMAL = "normal"
+    BEST = "best"
+
+
+_DEFLATE_LEVELS = {CompressionLevel.FAST: 1, CompressionLevel.NORMAL: 6, CompressionLevel.BEST: 9}
+_ZSTD_LEVELS = {CompressionLevel.FAST: 3, CompressionLevel.NORMAL: 9, CompressionLevel.BEST: 19}
+
+
+def is_zstd_available() -> bool:
+    """Checks whether the optional zstandard package, needed by zstd archives, is installed."""
+    return importlib.util.find_spec("zstandard") is not None
+
+
+@dataclass
+class ZipOptions:
+    """
+    The options of an archive written by write_files_zip.
+
+    Attributes:
+        level: The compression level.
+        zstd: Whether to compress with Zstandard (ZIP method 93) instead of Deflate. Faster
+              and smaller, but only recent archivers (e.g. 7-Zip 24, WinZip) can extract it,
+              and it needs the optional zstandard package.
+        workers: The number of threads reading and compressing the files.
+    """
+    level: CompressionLevel = CompressionLevel.NORMAL
+    zstd: bool = False
+    workers: int = DEFAULT_ZIP_WORKERS
+
+
+def get_export_zip_name(prefix: str, snap_id: str, suffix: str) -> str:
+    """
+    Returns the name of an export archive, in the format used by pylizlib backups.
+
+    Args:
+        prefix (str): The prefix of the name (e.g. "export").
+        snap_id (str): The ID of the exported snapshot.
+        suffix (str): The suffix of the backup type ("_ad" or "_sd").
+
+    Returns:
+        str: The file name, with the current timestamp.
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"{prefix}_{snap_id}{suffix}_{timestamp}.zip"
+
+
+def write_trees_zip(
+        zip_path: Path,
+        trees: list[tuple[Path, str]],
+        options: ZipOptions = ZipOptions(),
+        on_progress: Callable[[int, int], None] | None = None,
+        is_cancelled: Callable[[], bool] | None = None,
+) -> bool:
+    """
+    Writes the files of one or more directory trees into a zip archive.
+
+    The trees are walked with the shared parallel walker; entries are written in
+    path order so the archive does not depend on the order of the walk.
+
+    Args:
+        zip_path (Path): The archive to create. Its directory is created if needed.
+        trees (list[tuple[Path, str]]): The root of every tree with the directory it
+                                        gets inside the archive ("" for the archive root).
+        options (ZipOptions): The compression options.
+        on_progress (Callable[[int, int], None], optional): See write_files_zip.
+        is_cancelled (Callable[[], bool], optional): See write_files_zip.
+
+    Returns:
+        bool: True if the archive was written, False if it was cancelled.
+    """
+    return write_files_zip(zip_path, get_trees_files(trees), options, on_progress, is_cancelled)
+
+
+def get_trees_files(trees: list[tuple[Path, str]]) -> list[tuple[str, str, int | None]]:
+    """
+    Lists the files of one or more directory trees as entries for write_files_zip.
+
+    Args:
+        trees (list[tuple[Path, str]]): The root of every tree with the directory it
+                                        gets inside the archive ("" for the archive root).
+
+    Returns:
+        list[tuple[str, str, int | None]]: The files with their name inside the archive, in path order.
+    """
+    files = []
+    for root, arc_root in trees:
+        prefix_len = len(os.path.join(root, ""))
+        files.extend((path, os.path.join(arc_root, path[prefix_len:]), None) for path in sorted(entry.path for entry in walk(root)))
+    return files
+
+
+def write_files_zip(
+        zip_path: Path,
+        files: Iterable[tuple[str, str, int | None]],
+        options: ZipOptions = ZipOptions(),
+        on_progress: Callable[[int, int], None] | None = None,
+        is_cancelled: Callable[[], bool] | None = None,
+) -> bool:
+    """
+    Writes a list of files into a zip archive, compressing them in parallel.
+
+    The files are cut in chunks of ZIP_CHUNK_SIZE bytes, read and compressed by a
+    pool of threads (zlib and zstandard release the GIL) and written to the archive
+    in order as soon as they are ready, so no temporary copy is made and the memory
+    used does not depend on the size of the files. Deflate chunks are flushed to a
+    byte boundary and concatenated into one stream per file, as pigz does; Zstandard
+    chunks are concatenated frames.
+
+    Args:
+        zip_path (Path): The archive to create. Its directory is created if needed.
+        files (Iterable[tuple[str, str, int | None]]): The path of every file, its name inside
+                                                       the archive and the modification time (ns)
+                                                       to record, or None to use the one of the file.
+        options (ZipOptions): The compression options.
+        on_progress (Callable[[int, int], None], optional): Called with the bytes written so far
+                                                             and the total, after every chunk.
+        is_cancelled (Callable[[], bool], optional): Polled between chunks to abort the archive.
+
+    Returns:
+        bool: True if the archive was written, False if it was cancelled (it is then deleted).
+
+    Raises:
+        OSError: If a file cannot be read or the archive cannot be written; the archive is deleted.
+        ImportError: If zstd is requested and the zstandard package is not installed.
+    """
+    compressor = _get_chunk_compressor(options)
+    entries = []
+    for path, arcname, mtime_ns in files:
+        stat = os.stat(path)
+        entries.append(_ZipEntry(path, arcname, stat.st_size, mtime_ns if mtime_ns is not None else stat.st_mtime_ns))
+    total = sum(entry.size for entry in entries)
+    zip_path.parent.mkdir(parents=True, exist_ok=True)
+    method = _ZIP_STORED if options.level == CompressionLevel.STORE else _ZIP_ZSTANDARD if options.zstd else _ZIP_DEFLATED
+    written = 0
+    completed = False
+    try:
+        with open(zip_path, "wb") as f, ThreadPoolExecutor(max_workers=max(1, options.workers), thread_name_prefix="zip") as executor:
+            writer = _ZipWriter(f, method)
+            pending: deque[tuple[_ZipEntry, bool, Future]] = deque()
+            max_pending = max(1, options.workers) * 4
+            chunks = ((entry, offset, last) for entry in entries for offset, last in _get_chunks(entry.size))
+            try:
+                while True:
+                    for entry, offset, last in chunks:
+                        pending.append((entry, last, executor.submit(compressor, entry.path, offset, last)))
+                        if len(pending) >= max_pending:
+                            break
+                    if not pending:
+                        break
+                    if is_cancelled is not None and is_cancelled():
+                        return False
+                    written += writer.write_chunk(*_pop_result(pending))
+                    if on_progress is not None:
+                        on_progress(written, total)
+                writer.close()
+                completed = True
+            finally:
+                for _, _, future in pending:
+                    future.cancel()
+        return True
+    finally:
+        if not completed:
+            logger.debug(f"Archive {zip_path} not completed, deleting it")
+            zip_path.unlink(missing_ok=True)
+
+
+@dataclass
+class _ZipEntry:
+    path: str
+    arcname: str
+    size: int
+    mtime_ns: int
+    header_offset: int = 0
+    crc: int = 0
+    compressed_size: int = 0
+    file_size: int = 0
+    zip64: bool = field(init=False)
+
+    def __post_init__(self):
+        self.zip64 = self.size >= _ZIP64_FILE_THRESHOLD
+
+
+def _get_chunks(size: int) -> Iterable[tuple[int, bool]]:
+    if size == 0:
+        return [(0, True)]
+    return [(offset, offset + ZIP_CHUNK_SIZE >= size) for offset in range(0, size, ZIP_CHUNK_SIZE)]
+
+
+def _pop_result(pending: deque) -> tuple['_ZipEntry', bool, bytes, bytes]:
+    entry, last, future = pending.popleft()
+    raw, compressed = future.result()
+    return entry, last, raw, compressed
+
+
+def _get_chunk_compressor(options: ZipOptions) -> Callable[[str, int, bool], tuple[bytes, bytes]]:
+    """Returns the function reading and compressing a chunk of a file, run by the worker threads."""
+
+    def read_chunk(path: str, offset: int) -> bytes:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return f.read(ZIP_CHUNK_SIZE)
+
+    if options.level == CompressionLevel.STORE:
+        def store(path: str, offset: int, last: bool) -> tuple[bytes, bytes]:
+            raw = read_chunk(path, offset)
+            return raw, raw
+        return store
+
+    if options.zstd:
+        import zstandard
+        level = _ZSTD_LEVELS[options.level]
+
+        def compress_zstd(path: str, offset: int, last: bool) -> tuple[bytes, bytes]:
+            raw = read_chunk(path, offset)
+            return raw, zstandard.ZstdCompressor(level=level).compress(raw)
+        return compress_zstd
+
+    level = _DEFLATE_LEVELS[options.level]
+
+    def compress_deflate(path: str, offset: int, last: bool) -> tuple[bytes, bytes]:
+        raw = read_chunk(path, offset)
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        return raw, compressor.compress(raw) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+    return compress_deflate
+
+
+def _get_dos_time(mtime_ns: int) -> tuple[int, int]:
+    t = time.localtime(mtime_ns / 1e9)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class _ZipWriter:
+    """
+    Writes the entries of a zip archive from chunks already compressed.
+
+    The local header of an entry is written with empty sizes and CRC, and rewritten
+    once its last chunk is written (the archive is a regular, seekable file).
+    ZIP64 records are used for large files, large archives and many entries.
+    """
+
+    def __init__(self, f: BinaryIO, method: int):
+        self.f = f
+        self.method = method
+        self.entries: list[_ZipEntry] = []
+
+    def write_chunk(self, entry: _ZipEntry, last: bool, raw: bytes, compressed: bytes) -> int:
+        if not self.entries or self.entries[-1] is not entry:
+            entry.header_offset = self.f.tell()
+            self.entries.append(entry)
+            self.__write_local_header(entry)
+        self.f.write(compressed)
+        entry.crc = zlib.crc32(raw, entry.crc)
+        entry.file_size += len(raw)
+        entry.compressed_size += len(compressed)
+        if last:
+            end = self.f.tell()
+            self.f.seek(entry.header_offset)
+            self.__write_local_header(entry)
+            self.f.seek(end)
+        return len(raw)
+
+    def close(self):
+        cd_offset = self.f.tell()
+        for entry in self.entries:
+            self.__write_central_header(entry)
+        cd_size = self.f.tell() - cd_offset
+        count = len(self.entries)
+        if count > _ZIP64_ENTRIES_LIMIT or cd_offset > _ZIP64_LIMIT or cd_size > _ZIP64_LIMIT:
+            zip64_end_offset = self.f.tell()
+            self.f.write(_ZIP64_END_RECORD.pack(0x06064b50, _ZIP64_END_RECORD.size - 12, 45, 45, 0, 0, count, count, cd_size, cd_offset))
+            self.f.write(_ZIP64_END_LOCATOR.pack(0x07064b50, 0, zip64_end_offset, 1))
+            count = min(count, _ZIP64_ENTRIES_LIMIT)
+            cd_size = min(cd_size, _ZIP64_LIMIT)
+            cd_offset = min(cd_offset, _ZIP64_LIMIT)
+        self.f.write(_END_RECORD.pack(0x06054b50, 0, 0, count, count, cd_size, cd_offset, 0))
+
+    def __get_name(self, entry: _ZipEntry) -> tuple[bytes, int]:
+        name = entry.arcname.replace(os.sep, "/").lstrip("/")
+        try:
+            return name.encode("ascii"), 0
+        except UnicodeEncodeError:
+            return name.encode("utf-8"), _FLAG_UTF8
+
+    def __get_version(self, zip64: bool) -> int:
+        if self.method == _ZIP_ZSTANDARD:
+            return 63
+        return 45 if zip64 else 20
+
+    def __write_local_header(self, entry: _ZipEntry):
+        name, flags = self.__get_name(entry)
+        dos_time, dos_date = _get_dos_time(entry.mtime_ns)
+        extra = b""
+        compressed_size, file_size = entry.compressed_size, entry.file_size
+        if entry.zip64:
+            extra = struct.pack("<HHQQ", 1, 16, file_size, compressed_size)
+            compressed_size = file_size = _ZIP64_LIMIT
+        self.f.write(_LOCAL_HEADER.pack(
+            0x04034b50, self.__get_version(entry.zip64), flags, self.method, dos_time, dos_date,
+            entry.crc, compressed_size, file_size, len(name), len(extra),
+        ))
+        self.f.write(name)
+        self.f.write(extra)
+
+    def __write_central_header(self, entry: _ZipEntry):
+        name, flags = self.__get_name(entry)
+        dos_time, dos_date = _get_dos_time(entry.mtime_ns)
+        zip64_fields = []
+        compressed_size, file_size, header_offset = entry.compressed_size, entry.file_size, entry.header_offset
+        if entry.zip64:
+            zip64_fields += [file_size, compressed_size]
+            compressed_size = file_size = _ZIP64_LIMIT
+        if header_offset > _ZIP64_LIMIT:
+            zip64_fields.append(header_offset)
+            header_offset = _ZIP64_LIMIT
+        extra = struct.pack(f"<HH{len(zip64_fields)}Q", 1, 8 * len(zip64_fields), *zip64_fields) if zip64_fields else b""
+        version = self.__get_version(bool(zip64_fields))
+        self.f.write(_CENTRAL_HEADER.pack(
+            0x02014b50, version, version, flags, self.method, dos_time, dos_date, entry.crc,
+            compressed_size, file_size, len(name), len(extra), 0, 0, 0, 0, header_offset,
+        ))
+        self.f.write(name)
+        self.f.write(extra)
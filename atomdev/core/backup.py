@@ -0,0 +1,367 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable
+
+from loguru import logger
+
+from atomdev.core.walker import walk, DEFAULT_WALK_WORKERS
+
+
+BACKUP_TIME_FORMAT = "%Y%m%d_%H%M%S_%f"
+BACKUP_PARTIAL_SUFFIX = ".partial"
+BACKUP_PARTIAL_GRACE_PERIOD = 24 * 60 * 60
+LEGACY_BACKUP_SOURCE = ""
+
+
+@dataclass
+class BackupInfo:
+    """
+    A backup found in the backup directory.
+
+    Attributes:
+        path: The directory of the backup (or the zip file of a legacy backup).
+        source: What was backed up, e.g. "<snapshot id>_ad" for the associated directories
+                of a snapshot; LEGACY_BACKUP_SOURCE for the zip files of older versions.
+        reason: Why the backup was made (e.g. "preinstall", "beforeDelete").
+        created: When the backup was made.
+    """
+    path: Path
+    source: str
+    reason: str
+    created: datetime
+
+
+@dataclass
+class BackupRetention:
+    """
+    How many backups are kept. A limit of 0 disables it.
+
+    Attributes:
+        max_count: The number of backups kept for every source.
+        max_age_days: The age after which a backup is deleted, in days.
+        max_size: The disk space the backups may use, in bytes; the oldest backups
+                  are deleted until they fit.
+    """
+    max_count: int = 0
+    max_age_days: int = 0
+    max_size: int = 0
+
+
+@dataclass
+class BackupStats:
+    """
+    Counters of a backup written by BackupStore.create.
+
+    Attributes:
+        path: The directory of the backup.
+        linked_files: The files unchanged since the previous backup, linked to it instead of copied.
+        copied_files: The files copied.
+        copied_size: The bytes copied.
+        failed_files: The files that could not be backed up (see the log).
+    """
+    path: Path | None = None
+    linked_files: int = 0
+    copied_files: int = 0
+    copied_size: int = 0
+    failed_files: int = 0
+
+
+@dataclass
+class PruneStats:
+    """
+    Counters of a pruning of the backups.
+
+    Attributes:
+        backups: The number of backups deleted.
+        size: The disk space freed, in bytes.
+        kept_backups: The number of backups left.
+        kept_size: The disk space still used by the backups, in bytes.
+    """
+    backups: int = 0
+    size: int = 0
+    kept_backups: int = 0
+    kept_size: int = 0
+
+
+class BackupStore:
+    """
+    The backups made before installing, editing and deleting snapshots.
+
+    Every backup is a plain directory tree, stored in a subdirectory named after its
+    source. Backups are incremental: a file whose size and modification time match
+    the previous backup of the same source is hardlinked to it instead of copied, so
+    a backup only takes the space of the files changed since the previous one, while
+    every backup still holds the complete tree and can be deleted independently.
+    Where hardlinks are not available the files are copied.
+
+    Files of a backup are shared with the other backups: they must never be modified
+    in place. A backup is written into a '.partial' directory and renamed when
+    complete, so interrupted backups are never used as the base of the next one.
+    """
+
+    def __init__(self, root: Path, max_workers: int = DEFAULT_WALK_WORKERS):
+        """
+        Initializes the BackupStore. The directory is created on the first backup.
+
+        Args:
+            root (Path): The backup directory.
+            max_workers (int): The number of threads writing the files of a backup.
+        """
+        self.root = root
+        self.max_workers = max_workers
+        self._prune_lock = threading.Lock()
+
+    def list_backups(self, source: str | None = None) -> list[BackupInfo]:
+        """
+        Lists the complete backups, oldest first.
+
+        Args:
+            source (str | None): Only list the backups of this source.
+
+        Returns:
+            list[BackupInfo]: The backups, including the zip files of older versions
+                              when no source is given.
+        """
+        backups: list[BackupInfo] = []
+        sources = [self.root.joinpath(source)] if source is not None else self.__iter_root()
+        for source_path in sources:
+            if source_path.is_file() and source is None:
+                if source_path.suffix.lower() == ".zip":
+                    created = datetime.fromtimestamp(source_path.stat().st_mtime)
+                    backups.append(BackupInfo(source_path, LEGACY_BACKUP_SOURCE, "", created))
+                continue
+            if not source_path.is_dir():
+                continue
+            for backup_path in source_path.iterdir():
+                info = _parse_backup_path(backup_path)
+                if info is not None:
+                    backups.append(info)
+        return sorted(backups, key=lambda b: (b.created, b.path.name))
+
+    def get_latest(self, source: str) -> BackupInfo | None:
+        """Returns the most recent complete backup of a source, or None if it has none."""
+        backups = self.list_backups(source)
+        return backups[-1] if backups else None
+
+    def create(self, source: str, reason: str, files: Iterable[tuple[str, str, int | None]]) -> BackupStats:
+        """
+        Backs up a set of files, linking the unchanged ones to the previous backup of the source.
+
+        Files that cannot be read are logged and left out of the backup.
+
+        Args:
+            source (str): What is backed up; backups of the same source share their unchanged files.
+            reason (str): Why the backup is made, recorded in the name of the backup.
+            files (Iterable[tuple[str, str, int | None]]): The path of every file, its path inside the
+                                                           backup and the modification time (ns) to
+                                                           record, or None to use the one of the file
+                                                           (the entries of write_files_zip).
+
+        Returns:
+            BackupStats: The backup and how its files were written.
+
+        Raises:
+            OSError: If the backup directory cannot be written; the partial backup is deleted.
+        """
+        previous = self.get_latest(source)
+        name = f"{datetime.now().strftime(BACKUP_TIME_FORMAT)}_{reason}"
+        backup_path = self.root.joinpath(source, name)
+        partial_path = backup_path.with_name(name + BACKUP_PARTIAL_SUFFIX)
+        partial_path.mkdir(parents=True)
+        try:
+            jobs: list[tuple[str, Path, str | None, int | None]] = []
+            directories: set[Path] = set()
+            for path, rel_path, mtime_ns in files:
+                parts = rel_path.replace(os.sep, "/").split("/")
+                target = partial_path.joinpath(*parts)
+                base = os.path.join(previous.path, *parts) if previous is not None else None
+                directories.add(target.parent)
+                jobs.append((path, target, base, mtime_ns))
+            for directory in sorted(directories):
+                directory.mkdir(parents=True, exist_ok=True)
+
+            if self.max_workers > 1 and len(jobs) > 1:
+                with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="backup") as executor:
+                    outcomes = list(executor.map(_backup_file, jobs))
+            else:
+                outcomes = [_backup_file(job) for job in jobs]
+            partial_path.rename(backup_path)
+        except BaseException:
+            shutil.rmtree(partial_path, ignore_errors=True)
+            raise
+
+        stats = BackupStats(path=backup_path)
+        for outcome in outcomes:
+            if outcome is None:
+                stats.failed_files += 1
+            elif outcome < 0:
+                stats.linked_files += 1
+            else:
+                stats.copied_files += 1
+                stats.copied_size += outcome
+        logger.info(f"Backup {backup_path} written: {stats.copied_files} files copied ({stats.copied_size} bytes), "
+                    f"{stats.linked_files} unchanged files linked to the previous backup")
+        return stats
+
+    def prune(self, retention: BackupRetention, now: datetime | None = None) -> PruneStats:
+        """
+        Deletes the backups exceeding the retention limits, and the leftovers of interrupted backups.
+
+        The backups beyond max_count and older than max_age_days are deleted first, then
+        the oldest remaining ones until the disk space used is within max_size. Files
+        shared between backups are counted once, and deleting a backup only frees the
+        files no other backup links. The most recent backup of every source is always
+        kept, whatever the limits, so the last state before an operation can be restored.
+
+        Args:
+            retention (BackupRetention): The limits.
+            now (datetime | None): The current time, to compute the ages.
+
+        Returns:
+            PruneStats: What was deleted and what is left.
+        """
+        with self._prune_lock:
+            now = now or datetime.now()
+            self.__remove_partial_backups(now)
+            backups = self.list_backups()
+            by_source: dict[str, list[BackupInfo]] = {}
+            for backup in backups:
+                by_source.setdefault(backup.source, []).append(backup)
+            protected = {id(items[-1]) for source, items in by_source.items() if source != LEGACY_BACKUP_SOURCE}
+
+            doomed: list[BackupInfo] = []
+            max_age = timedelta(days=retention.max_age_days)
+            for source, items in by_source.items():
+                for i, backup in enumerate(items):
+                    if id(backup) in protected:
+                        continue
+                    too_many = retention.max_count > 0 and source != LEGACY_BACKUP_SOURCE and len(items) - i > retention.max_count
+                    too_old = retention.max_age_days > 0 and now - backup.created > max_age
+                    if too_many or too_old:
+                        doomed.append(backup)
+
+            # Disk usage by inode: hardlinked files are counted once and freed with their last link.
+            files = {id(backup): _get_backup_files(backup.path) for backup in backups}
+            inodes: dict[tuple[int, int], list[int]] = {}
+            for backup_files in files.values():
+                for key, size in backup_files:
+                    inodes.setdefault(key, [size, 0])[1] += 1
+            total = sum(size for size, _ in inodes.values())
+
+            result = PruneStats()
+
+            def release(backup: BackupInfo):
+                nonlocal total
+                for key, size in files[id(backup)]:
+                    inode = inodes[key]
+                    inode[1] -= 1
+                    if inode[1] == 0:
+                        total -= size
+                        result.size += size
+
+            for backup in doomed:
+                release(backup)
+            if retention.max_size > 0:
+                doomed_ids = {id(backup) for backup in doomed}
+                for backup in backups:
+                    if total <= retention.max_size:
+                        break
+                    if id(backup) in protected or id(backup) in doomed_ids:
+                        continue
+                    doomed.append(backup)
+                    release(backup)
+
+            for backup in doomed:
+                try:
+                    if backup.path.is_dir():
+                        shutil.rmtree(backup.path)
+                    else:
+                        backup.path.unlink()
+                    result.backups += 1
+                except OSError as e:
+                    logger.warning(f"Unable to delete backup {backup.path}: {e}")
+            for source in by_source:
+                if source != LEGACY_BACKUP_SOURCE:
+                    try:
+                        self.root.joinpath(source).rmdir()
+                    except OSError:
+                        pass
+            result.kept_backups = len(backups) - result.backups
+            result.kept_size = total
+            if result.backups:
+                logger.info(f"{result.backups} backups deleted ({result.size} bytes freed), "
+                            f"{result.kept_backups} kept ({result.kept_size} bytes)")
+            return result
+
+    def __iter_root(self) -> list[Path]:
+        try:
+            return list(self.root.iterdir())
+        except FileNotFoundError:
+            return []
+
+    def __remove_partial_backups(self, now: datetime):
+        threshold = now.timestamp() - BACKUP_PARTIAL_GRACE_PERIOD
+        for source_path in self.__iter_root():
+            if not source_path.is_dir():
+                continue
+            for backup_path in source_path.glob("*" + BACKUP_PARTIAL_SUFFIX):
+                try:
+                    if backup_path.stat().st_mtime < threshold:
+                        logger.warning(f"Removing the interrupted backup {backup_path}")
+                        shutil.rmtree(backup_path)
+                except OSError as e:
+                    logger.warning(f"Unable to remove the interrupted backup {backup_path}: {e}")
+
+
+def _parse_backup_path(path: Path) -> BackupInfo | None:
+    if not path.is_dir() or path.name.endswith(BACKUP_PARTIAL_SUFFIX):
+        return None
+    stamp_len = len(datetime(2000, 1, 1).strftime(BACKUP_TIME_FORMAT))
+    try:
+        created = datetime.strptime(path.name[:stamp_len], BACKUP_TIME_FORMAT)
+    except ValueError:
+        return None
+    return BackupInfo(path, path.parent.name, path.name[stamp_len + 1:], created)
+
+
+def _get_backup_files(path: Path) -> list[tuple[tuple[int, int], int]]:
+    if path.is_file():
+        stat = path.stat()
+        return [((stat.st_dev, stat.st_ino), stat.st_size)]
+    files = []
+    for entry in walk(path):
+        try:
+            # DirEntry.stat does not report the inode on Windows: ask the file itself.
+            stat = os.stat(entry.path)
+        except OSError:
+            continue
+        files.append(((stat.st_dev, stat.st_ino), stat.st_size))
+    return files
+
+
+def _backup_file(job: tuple[str, Path, str | None, int | None]) -> int | None:
+    """Backs up one file; returns -1 if it was linked, the bytes copied otherwise, None on error."""
+    path, target, base, mtime_ns = job
+    try:
+        stat = os.stat(path)
+        mtime_ns = mtime_ns if mtime_ns is not None else stat.st_mtime_ns
+        if base is not None:
+            try:
+                base_stat = os.stat(base)
+                if base_stat.st_size == stat.st_size and base_stat.st_mtime_ns == mtime_ns:
+                    os.link(base, target)
+                    return -1
+            except OSError:
+                # No previous version, another volume, or too many links: copy it.
+                pass
+        shutil.copyfile(path, target)
+        os.utime(target, ns=(mtime_ns, mtime_ns))
+        return stat.st_size
+    except OSError as e:
+        logger.error(f"Could not back up file {path}: {e}")
+        return None
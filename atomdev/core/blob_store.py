@@ -0,0 +1,182 @@
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from loguru import logger
+
+from atomdev.core.walker import walk
+
+
+BLOB_STORE_DIR_NAME = ".atomdev-blobs"
+BLOB_SNAPSHOT_MARKER = ".atomdev-blobref"
+BLOB_GC_GRACE_PERIOD = 24 * 60 * 60
+
+
+def get_blob_store_path(catalogue_path: Path) -> Path:
+    """Returns the path of the blob store of a catalogue."""
+    return catalogue_path.joinpath(BLOB_STORE_DIR_NAME)
+
+
+def is_blob_snapshot(snapshot_path: Path) -> bool:
+    """
+    Checks whether a snapshot stores its files in the blob store of the catalogue
+    instead of copying them into its own directory.
+
+    Args:
+        snapshot_path (Path): The directory of the snapshot in the catalogue.
+    """
+    return snapshot_path.joinpath(BLOB_SNAPSHOT_MARKER).is_file()
+
+
+@dataclass
+class BlobStoreStats:
+    """
+    Counters describing a set of blobs.
+
+    Attributes:
+        blobs: The number of blobs.
+        size: Their total size, in bytes.
+    """
+    blobs: int = 0
+    size: int = 0
+
+
+class BlobStore:
+    """
+    A content-addressed store of files, shared by the snapshots of a catalogue.
+
+    Every distinct file content is stored once, in a file named after its hash
+    (the digest recorded in the snapshot manifests) inside a subdirectory named
+    after the first byte of the hash. A snapshot stored in blobs only keeps its
+    metadata and its manifest, which maps every relative path to a blob.
+
+    Blobs are written to a temporary file and renamed into place, so several
+    machines can import into the same catalogue at the same time.
+    """
+
+    def __init__(self, root: Path):
+        """
+        Initializes the BlobStore. The directory is created on the first write.
+
+        Args:
+            root (Path): The directory holding the blobs.
+        """
+        self.root = root
+
+    def get_blob_path(self, digest: bytes) -> Path:
+        """Returns the path of the blob with the given content hash (it may not exist)."""
+        name = digest.hex()
+        return self.root.joinpath(name[:2], name[2:])
+
+    def has(self, digest: bytes) -> bool:
+        """Checks whether the blob with the given content hash is stored."""
+        return self.get_blob_path(digest).is_file()
+
+    def add_file(self, path: str, digest: bytes) -> bool:
+        """
+        Stores the content of a file, unless a blob with the same hash already exists.
+
+        An existing blob gets its modification time refreshed, so a garbage collection
+        running at the same time (see collect_garbage) does not delete it before the
+        manifest referencing it is saved.
+
+        Args:
+            path (str): The file to store.
+            digest (bytes): The content hash of the file.
+
+        Returns:
+            bool: True if the blob was written, False if it was already stored.
+
+        Raises:
+            OSError: If the file cannot be read or the blob cannot be written.
+        """
+        blob_path = self.get_blob_path(digest)
+        try:
+            os.utime(blob_path)
+            return False
+        except FileNotFoundError:
+            pass
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = blob_path.with_name(f"{blob_path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+        try:
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, blob_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return True
+
+    def copy_to(self, digest: bytes, destination: Path, mtime_ns: int | None = None):
+        """
+        Writes the content of a blob to a file.
+
+        Args:
+            digest (bytes): The content hash of the blob.
+            destination (Path): The file to write. Its directory must exist.
+            mtime_ns (int | None): The modification time to give to the file, usually the
+                                   one recorded in the manifest.
+
+        Raises:
+            OSError: If the blob is missing or the file cannot be written.
+        """
+        shutil.copyfile(self.get_blob_path(digest), destination)
+        if mtime_ns is not None:
+            os.utime(destination, ns=(mtime_ns, mtime_ns))
+
+    def iter_blobs(self) -> Iterator[tuple[bytes, Path, int, int]]:
+        """
+        Yields the stored blobs, skipping temporary and unknown files.
+
+        Yields:
+            tuple[bytes, Path, int, int]: The content hash, the path, the size and the
+                                          modification time (ns) of every blob.
+        """
+        for entry in walk(self.root):
+            head = os.path.basename(os.path.dirname(entry.path))
+            name = os.path.basename(entry.path)
+            try:
+                digest = bytes.fromhex(head + name)
+            except ValueError:
+                continue
+            yield digest, Path(entry.path), entry.size, entry.mtime_ns
+
+    def get_stats(self) -> BlobStoreStats:
+        """Returns the number and the total size of the stored blobs."""
+        stats = BlobStoreStats()
+        for _, _, size, _ in self.iter_blobs():
+            stats.blobs += 1
+            stats.size += size
+        return stats
+
+    def collect_garbage(self, referenced: set[bytes], grace_period: float = BLOB_GC_GRACE_PERIOD) -> BlobStoreStats:
+        """
+        Deletes the blobs no manifest references any more.
+
+        Blobs written or reused less than `grace_period` seconds ago are kept, as
+        they may belong to a snapshot being imported on another machine whose
+        manifest is not saved yet.
+
+        Args:
+            referenced (set[bytes]): The content hashes referenced by the manifests of the catalogue.
+            grace_period (float): The minimum age of a blob to be deleted, in seconds.
+
+        Returns:
+            BlobStoreStats: The number and the total size of the deleted blobs.
+        """
+        removed = BlobStoreStats()
+        threshold_ns = time.time_ns() - int(grace_period * 1_000_000_000)
+        for digest, path, size, mtime_ns in self.iter_blobs():
+            if digest in referenced or mtime_ns > threshold_ns:
+                continue
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.warning(f"Unable to delete blob {path}: {e}")
+                continue
+            removed.blobs += 1
+            removed.size += size
+        return removed
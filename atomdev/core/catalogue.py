@@ -0,0 +1,720 @@
+import os
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+from loguru import logger
+from pylizlib.core.data.gen import gen_random_string
+from pylizlib.core.os.snap import SnapshotCatalogue, Snapshot, SnapEditAction, SnapshotUtils, SnapshotSettings, \
+    SnapshotManager, SnapshotSerializer, SnapEditType
+
+from atomdev.core.archive import get_export_zip_name, write_trees_zip, write_files_zip, get_trees_files, ZipOptions
+from atomdev.core.backup import BackupStore
+from atomdev.core.blob_store import BlobStore, BlobStoreStats, BLOB_STORE_DIR_NAME, BLOB_SNAPSHOT_MARKER, \
+    get_blob_store_path, is_blob_snapshot
+from atomdev.core.clone import clone_tree, unshare_tree, unshare_file
+from atomdev.core.install import clear_directory, materialize_tree, grant_everyone_full_control, InstallStats, \
+    get_tree_entries, get_tree_directories, sync_tree, get_previous_tree_path, get_staging_tree_path, recover_staged_install, \
+    keep_replaced_tree, swap_trees
+from atomdev.core.manifest import SnapshotManifest, ManifestEntry, build_manifest, get_manifest_path
+from atomdev.core.search import refresh_snapshot_index, iter_snapshot_files, iter_tree_files
+from atomdev.core.walker import get_tree_size
+
+
+class DevlizSnapshotCatalogue(SnapshotCatalogue):
+    """
+    The snapshot catalogue used by the application.
+
+    Extends the pylizlib catalogue so that the file manifest and the content index
+    of a snapshot are rebuilt every time its files are written into the catalogue,
+    and so that exports walk the directories with the shared parallel walker.
+
+    Manifests are kept in memory once loaded, so sizes and differences can be read
+    without touching the disk (see get_cached_manifest).
+
+    Snapshots can also be stored in the blob store of the catalogue: their directory
+    then only holds the metadata and the manifest, which references the content of
+    every file by hash, and a file shared by many snapshots is stored once. New
+    snapshots use the blob store when use_blob_store is set; existing ones keep the
+    storage they were created with until migrate_to_blob_store is called.
+
+    Installations are incremental and staged by default (see install, delta_install
+    and staged_install), and duplicates share the files of the original snapshot
+    instead of copying them (see duplicate_by_id and link_duplicates).
+
+    The backups made before installing, editing and deleting are incremental trees
+    in the backup store (see BackupStore) instead of full zip archives.
+    """
+
+    def __init__(
+            self,
+            path_catalogue: Path,
+            settings: SnapshotSettings = SnapshotSettings(),
+            use_blob_store: bool = False,
+            delta_install: bool = True,
+            staged_install: bool = True,
+            link_duplicates: bool = True,
+    ):
+        """
+        Initializes the DevlizSnapshotCatalogue.
+
+        Args:
+            path_catalogue (Path): The root directory path for the catalogue.
+            settings (SnapshotSettings): Global settings to apply to snapshots in this catalogue.
+            use_blob_store (bool): Whether new snapshots store their files in the blob store.
+            delta_install (bool): Whether installations only write the files that differ.
+            staged_install (bool): Whether installations are prepared aside and swapped in.
+            link_duplicates (bool): Whether duplicates share the files of the original snapshot.
+        """
+        super().__init__(path_catalogue, settings)
+        self.use_blob_store = use_blob_store
+        self.delta_install = delta_install
+        self.staged_install = staged_install
+        self.link_duplicates = link_duplicates
+        self.blob_store = BlobStore(get_blob_store_path(path_catalogue))
+        self.backup_store = BackupStore(settings.backup_path) if settings.backup_path is not None else None
+        self._manifests: dict[str, SnapshotManifest] = {}
+        self._manifests_lock = threading.Lock()
+
+    def set_catalogue_path(self, new_path: Path):
+        """
+        Sets a new path for the snapshot catalogue, forgetting the manifests loaded from the old one.
+
+        Args:
+            new_path (Path): The new path for the catalogue.
+        """
+        super().set_catalogue_path(new_path)
+        self.blob_store = BlobStore(get_blob_store_path(new_path))
+        with self._manifests_lock:
+            self._manifests.clear()
+
+    def get_all(self) -> list[Snapshot]:
+        """
+        Retrieves all snapshots from the catalogue, skipping the blob store directory.
+
+        Returns:
+            list[Snapshot]: The snapshots found in the catalogue.
+        """
+        self.path_catalogue.mkdir(parents=True, exist_ok=True)
+        snapshots: list[Snapshot] = []
+        for current_dir in self.path_catalogue.iterdir():
+            if current_dir.is_dir() and current_dir.name != BLOB_STORE_DIR_NAME:
+                snap = SnapshotUtils.get_snapshot_from_path(current_dir, self.settings.json_filename)
+                if snap is not None:
+                    snapshots.append(snap)
+        return snapshots
+
+    def is_blob_snapshot(self, snap: Snapshot) -> bool:
+        """Checks whether a snapshot stores its files in the blob store."""
+        return is_blob_snapshot(self.__get_snapshot_path(snap))
+
+    def add(self, snap: Snapshot):
+        """
+        Adds a new snapshot to the catalogue, writing its manifest and indexing its content.
+        With use_blob_store set, only the files whose content is not stored yet are copied.
+
+        Args:
+            snap (Snapshot): The Snapshot object to add.
+        """
+        if not self.use_blob_store:
+            super().add(snap)
+            self.refresh_snapshot_files(snap)
+            return
+        snapshot_path = self.__get_snapshot_path(snap)
+        if snapshot_path.exists():
+            shutil.rmtree(snapshot_path)
+        snapshot_path.mkdir(parents=True)
+        files = [file for dir_assoc in snap.directories for file in iter_tree_files(Path(dir_assoc.original_path), dir_assoc.directory_name)]
+        self.__save_blob_snapshot(snap, build_manifest(files, blob_store=self.blob_store))
+
+    def update_snapshot_by_edits(self, snap: Snapshot, edits: list[SnapEditAction]):
+        """
+        Updates a snapshot using a pre-computed list of edit actions and refreshes its
+        manifest and content index.
+
+        Args:
+            snap (Snapshot): The Snapshot object to update.
+            edits (list[SnapEditAction]): The edit actions to apply.
+        """
+        snap_manager = SnapshotManager(snap, self.path_catalogue, self.settings)
+        if self.settings.bck_before_modify_enabled:
+            self.__backup_snapshot(snap, "beforeEdit")
+        snap_manager.update_json_base_fields()
+        snap_manager.update_json_data_fields()
+        if not self.is_blob_snapshot(snap):
+            snap_manager.update_from_actions_list(edits)
+            self.refresh_snapshot_files(snap)
+            return
+        added_paths = {e.new_path for e in edits if e.action_type == SnapEditType.ADD_DIR}
+        kept_names = {d.directory_name for d in snap.directories if d.original_path not in added_paths}
+        kept = [entry for entry in self.get_manifest(snap) or () if entry.rel_path.split("/", 1)[0] in kept_names]
+        files = [file for d in snap.directories if d.original_path in added_paths for file in iter_tree_files(Path(d.original_path), d.directory_name)]
+        added = build_manifest(files, blob_store=self.blob_store)
+        self.__save_blob_snapshot(snap, SnapshotManifest.from_entries(kept + list(added)))
+
+    def update_assoc_with_installed(self, snap_id: str):
+        """
+        Updates the snapshot's copy of the associated directories with the installed
+        ones and refreshes its manifest and content index.
+
+        Args:
+            snap_id (str): The ID of the snapshot to update.
+        """
+        snap = self.get_by_id(snap_id)
+        if snap is None or not self.is_blob_snapshot(snap):
+            super().update_assoc_with_installed(snap_id)
+            if snap is not None:
+                self.refresh_snapshot_files(snap)
+            return
+        files = []
+        for dir_assoc in snap.directories:
+            if Path(dir_assoc.original_path).is_dir():
+                files.extend(iter_tree_files(Path(dir_assoc.original_path), dir_assoc.directory_name))
+            else:
+                logger.warning(f"Original path '{dir_assoc.original_path}' for snapshot '{snap.id}' does not exist. The snapshot's copy has been cleared.")
+        manifest = build_manifest(files, self.get_manifest(snap), self.blob_store)
+        sizes = manifest.get_directory_sizes()
+        for dir_assoc in snap.directories:
+            dir_assoc.mb_size = sizes.get(dir_assoc.directory_name, 0) / (1024 * 1024)
+        snap.date_last_modified = datetime.now()
+        self.__save_blob_snapshot(snap, manifest)
+
+    def install(self, snap: Snapshot) -> InstallStats | None:
+        """
+        Installs a snapshot's contents to their original target locations.
+
+        With staged_install set, the new version of every target directory is first
+        written next to it (see get_staging_tree_path) and then exchanged with it by
+        renaming (see swap_trees): the targets are never left half-written, and the
+        replaced trees are kept for rollback_install, instead of the backup zip. The
+        trees kept by the last installation are only replaced once the exchange succeeded.
+
+        With delta_install set, only the files that differ from the installed ones (or
+        from the staging tree, for staged installations) are copied and only the files
+        the snapshot does not contain are deleted (see sync_tree); otherwise the
+        directories are cleared and fully rewritten. Snapshots stored in blobs are
+        written directly from the blob store.
+
+        Args:
+            snap (Snapshot): The Snapshot object to install.
+
+        Returns:
+            InstallStats | None: What was copied and left in place, or None for a clean
+                                 in-place installation of a copied snapshot.
+
+        Raises:
+            ValueError: If the manifest of the snapshot is missing and cannot be rebuilt.
+            OSError: If a staged installation cannot be completed; the installed
+                     directories are then unchanged.
+        """
+        is_blob = self.is_blob_snapshot(snap)
+        if not is_blob and not self.delta_install and not self.staged_install:
+            if self.settings.bck_before_install_enabled:
+                self.__backup_assoc_dirs(snap, "preinstall")
+            SnapshotManager(snap, self.path_catalogue, self.settings).install(self.settings.install_with_everyone_full_control)
+            return None
+        # For copied snapshots this also picks up files edited directly in the catalogue.
+        manifest = self.refresh_manifest(snap)
+        if manifest is None:
+            raise ValueError(f"The manifest of snapshot {snap.id} is missing or corrupted, it cannot be installed.")
+        snap_manager = SnapshotManager(snap, self.path_catalogue, self.settings)
+        if self.staged_install:
+            stats = self.__install_staged(snap, manifest, is_blob)
+        else:
+            if self.settings.bck_before_install_enabled:
+                self.__backup_assoc_dirs(snap, "preinstall")
+            stats = self.__install_in_place(snap, manifest, is_blob)
+        snap.date_last_used = datetime.now()
+        SnapshotSerializer.update_field(snap_manager.path_snapshot_json, "date_last_used", snap.date_last_used.isoformat())
+        logger.info(f"Snapshot {snap.id} installed: {stats.copied_files} files copied ({stats.copied_size} bytes), "
+                    f"{stats.deleted_files} deleted, {stats.unchanged_files} unchanged ({stats.unchanged_size} bytes not copied)")
+        return stats
+
+    def rollback_install(self, snap: Snapshot) -> int:
+        """
+        Restores the directories replaced by the last staged installation of the
+        associated directories of a snapshot, exchanging them with the installed ones.
+        Rolling back again reinstalls the replaced version.
+
+        Args:
+            snap (Snapshot): The snapshot whose associated directories are restored.
+
+        Returns:
+            int: The number of directories restored (those without a previous tree are skipped).
+
+        Raises:
+            OSError: If a directory cannot be exchanged; the directories are then unchanged.
+        """
+        targets = [Path(d.original_path) for d in snap.directories]
+        for target in targets:
+            recover_staged_install(target)
+        targets = [target for target in targets if get_previous_tree_path(target).is_dir()]
+        swap_trees([(target, get_previous_tree_path(target)) for target in targets])
+        logger.info(f"Previous installation of {len(targets)} directories of snapshot {snap.id} restored")
+        return len(targets)
+
+    def duplicate_by_id(self, snap_id: str):
+        """
+        Duplicates a snapshot by its ID.
+
+        With link_duplicates set, the copies of the associated directories are cloned
+        (see clone_tree): the duplicate shares the data of their files with the original
+        until one of them is replaced, and a real copy is only made where the file system
+        does not allow it. Every write of the catalogue replaces files instead of
+        modifying them, and unshare_files (or unshare_file for a single file) must be
+        called before the files of a snapshot are handed over for editing. Snapshots
+        stored in blobs only copy their metadata.
+
+        Args:
+            snap_id (str): The ID of the snapshot to duplicate.
+
+        Raises:
+            ValueError: If no snapshot is found with the given ID.
+            FileNotFoundError: If the snapshot directory does not exist.
+        """
+        snap = self.get_by_id(snap_id)
+        if snap is None:
+            raise ValueError(f"No snapshot found with ID {snap_id}")
+        if not self.link_duplicates or self.is_blob_snapshot(snap):
+            super().duplicate_by_id(snap_id)
+            return
+        source_path = self.__get_snapshot_path(snap)
+        if not source_path.exists():
+            raise FileNotFoundError(f"The snapshot path {source_path} does not exist.")
+        manifest = self.get_cached_manifest(snap)
+        snap.id = gen_random_string(self.settings.snap_id_length)
+        snap.name = snap.name + " Copy"
+        snap.date_created = datetime.now()
+        new_path = self.__get_snapshot_path(snap)
+        new_path.mkdir(parents=True)
+        dir_names = {d.directory_name for d in snap.directories}
+        for item in source_path.iterdir():
+            if item.name in dir_names and item.is_dir():
+                stats = clone_tree(item, new_path.joinpath(item.name))
+                logger.info(f"Directory '{item.name}' duplicated: {stats.reflinked} files reflinked, "
+                            f"{stats.hardlinked} hardlinked, {stats.copied} copied ({stats.copied_size} bytes)")
+            elif item.is_dir():
+                shutil.copytree(item, new_path.joinpath(item.name))
+            elif item.name != self.settings.json_filename:
+                # Metadata files are rewritten in place, so they always get their own copy.
+                shutil.copy2(item, new_path.joinpath(item.name))
+        SnapshotSerializer.to_json(snap, new_path.joinpath(self.settings.json_filename))
+        if manifest is not None:
+            with self._manifests_lock:
+                self._manifests[snap.id] = manifest
+
+    def unshare_files(self, snap: Snapshot) -> int:
+        """
+        Gives the snapshot its own copy of the files it shares with its duplicates (see
+        duplicate_by_id), so they can be modified in place, e.g. by the user.
+
+        Args:
+            snap (Snapshot): The snapshot.
+
+        Returns:
+            int: The number of files copied.
+
+        Raises:
+            OSError: If a shared file cannot be copied.
+        """
+        snapshot_path = self.__get_snapshot_path(snap)
+        unshared = sum(unshare_tree(snapshot_path.joinpath(d.directory_name)) for d in snap.directories)
+        if unshared:
+            logger.info(f"{unshared} files of snapshot {snap.id} unshared from its duplicates")
+        return unshared
+
+    def unshare_file(self, file_path: Path) -> bool:
+        """
+        Gives a single file of a snapshot its own copy if it is shared with a duplicate
+        (see duplicate_by_id), so it can be opened for editing without copying the other
+        files of the snapshot as unshare_files does.
+
+        Args:
+            file_path (Path): The file, inside the directory of a snapshot.
+
+        Returns:
+            bool: True if the file was copied, False if it was not shared.
+
+        Raises:
+            OSError: If the file cannot be copied.
+        """
+        unshared = unshare_file(file_path)
+        if unshared:
+            logger.info(f"File {file_path} unshared from the duplicates of its snapshot")
+        return unshared
+
+    def delete(self, snap: Snapshot):
+        """
+        Deletes a snapshot from the catalogue, forgetting its manifest. The blobs
+        of the snapshot are deleted by collect_garbage once no snapshot uses them.
+
+        Args:
+            snap (Snapshot): The Snapshot object to delete.
+        """
+        if self.settings.bck_before_delete_enabled:
+            self.__backup_snapshot(snap, "beforeDelete")
+        SnapshotManager(snap, self.path_catalogue, self.settings).delete()
+        with self._manifests_lock:
+            self._manifests.pop(snap.id, None)
+
+    def migrate_to_blob_store(self, snap: Snapshot) -> int:
+        """
+        Moves the files of a snapshot into the blob store, deleting the copies of its
+        associated directories from the snapshot directory.
+
+        The copies are deleted only after every file is stored and the manifest and the
+        storage marker are saved, so an interrupted migration can simply be run again.
+
+        Args:
+            snap (Snapshot): The snapshot to migrate. Snapshots already stored in blobs are
+                             only cleaned of the copies left by an interrupted migration.
+
+        Returns:
+            int: The number of bytes freed in the snapshot directory.
+
+        Raises:
+            OSError: If a file cannot be stored or the manifest cannot be saved; the
+                     snapshot is then left unchanged.
+        """
+        snapshot_path = self.__get_snapshot_path(snap)
+        if not is_blob_snapshot(snapshot_path):
+            manifest_path = get_manifest_path(snapshot_path)
+            files = list(iter_snapshot_files(snap, snapshot_path))
+            manifest = build_manifest(files, SnapshotManifest.load(manifest_path), self.blob_store)
+            if len(manifest) != len(files):
+                raise OSError(f"Unable to store {len(files) - len(manifest)} files of snapshot {snap.id} in the blob store.")
+            manifest.save(manifest_path)
+            snapshot_path.joinpath(BLOB_SNAPSHOT_MARKER).touch()
+            with self._manifests_lock:
+                self._manifests[snap.id] = manifest
+        freed = 0
+        for dir_assoc in snap.directories:
+            copy_path = snapshot_path.joinpath(dir_assoc.directory_name)
+            if copy_path.is_dir():
+                freed += get_tree_size(copy_path)
+                shutil.rmtree(copy_path)
+        logger.info(f"Snapshot {snap.id} moved to the blob store, {freed} bytes freed.")
+        return freed
+
+    def collect_garbage(self) -> BlobStoreStats:
+        """
+        Deletes the blobs that no snapshot of the catalogue references any more.
+
+        Returns:
+            BlobStoreStats: The number and the total size of the deleted blobs.
+
+        Raises:
+            ValueError: If the manifest of a snapshot stored in blobs cannot be read; nothing
+                        is deleted, as the blobs of that snapshot would be lost.
+        """
+        referenced: set[bytes] = set()
+        for snap in self.get_all():
+            snapshot_path = self.__get_snapshot_path(snap)
+            if not is_blob_snapshot(snapshot_path):
+                continue
+            manifest = SnapshotManifest.load(get_manifest_path(snapshot_path))
+            if manifest is None:
+                raise ValueError(f"The manifest of snapshot {snap.id} is missing or corrupted, blobs not collected.")
+            referenced.update(manifest.get_digests())
+        removed = self.blob_store.collect_garbage(referenced)
+        logger.info(f"{removed.blobs} unused blobs deleted ({removed.size} bytes).")
+        return removed
+
+    def refresh_snapshot_files(self, snap: Snapshot):
+        """
+        Walks the files of a snapshot once and refreshes both its manifest and its content index.
+        Errors are logged and ignored: without a manifest sizes are read from the snapshot
+        metadata, and searches fall back to a full scan without an index.
+
+        Args:
+            snap (Snapshot): The snapshot whose files changed.
+        """
+        snapshot_path = self.__get_snapshot_path(snap)
+        files = list(iter_snapshot_files(snap, snapshot_path))
+        if not is_blob_snapshot(snapshot_path):
+            self.refresh_manifest(snap, files)
+        try:
+            refresh_snapshot_index(snap, snapshot_path, files)
+        except OSError as e:
+            logger.warning(f"Unable to update the content index of snapshot {snap.id}: {e}")
+
+    def refresh_manifest(self, snap: Snapshot, files: list | None = None) -> SnapshotManifest | None:
+        """
+        Builds or updates the file manifest stored in the snapshot directory.
+        Only the files changed since the previous manifest are hashed again. The manifest
+        of a snapshot stored in blobs describes its content and is only loaded.
+
+        Args:
+            snap (Snapshot): The snapshot to describe.
+            files (list | None): The files of the snapshot as returned by iter_snapshot_files,
+                                 if already listed. If None, the snapshot is walked.
+
+        Returns:
+            SnapshotManifest | None: The manifest, or None if it could not be written.
+        """
+        snapshot_path = self.__get_snapshot_path(snap)
+        if is_blob_snapshot(snapshot_path):
+            return self.get_manifest(snap)
+        manifest_path = get_manifest_path(snapshot_path)
+        if files is None:
+            files = list(iter_snapshot_files(snap, snapshot_path))
+        manifest = build_manifest(files, SnapshotManifest.load(manifest_path))
+        try:
+            manifest.save(manifest_path)
+        except OSError as e:
+            logger.warning(f"Unable to save the file manifest of snapshot {snap.id}: {e}")
+            return None
+        with self._manifests_lock:
+            self._manifests[snap.id] = manifest
+        logger.debug(f"File manifest of snapshot {snap.id} updated ({len(manifest)} files).")
+        return manifest
+
+    def get_manifest(self, snap: Snapshot) -> SnapshotManifest | None:
+        """
+        Returns the file manifest of a snapshot, reading it from the snapshot directory
+        if it is not in memory yet. Snapshots written before manifests existed get one
+        built on the first call.
+
+        Args:
+            snap (Snapshot): The snapshot.
+
+        Returns:
+            SnapshotManifest | None: The manifest, or None if the snapshot directory does not exist
+                                     (or if the manifest of a snapshot stored in blobs is lost).
+        """
+        manifest = self.get_cached_manifest(snap)
+        if manifest is not None:
+            return manifest
+        snapshot_path = self.__get_snapshot_path(snap)
+        if not snapshot_path.is_dir():
+            return None
+        manifest = SnapshotManifest.load(get_manifest_path(snapshot_path))
+        if manifest is None and is_blob_snapshot(snapshot_path):
+            logger.error(f"The manifest of snapshot {snap.id} is missing or corrupted: its files cannot be read.")
+            return None
+        if manifest is None:
+            return self.refresh_manifest(snap)
+        with self._manifests_lock:
+            self._manifests[snap.id] = manifest
+        return manifest
+
+    def get_cached_manifest(self, snap: Snapshot) -> SnapshotManifest | None:
+        """
+        Returns the file manifest of a snapshot if it is already in memory, without touching the disk.
+
+        Args:
+            snap (Snapshot): The snapshot.
+
+        Returns:
+            SnapshotManifest | None: The manifest, or None if it was never loaded.
+        """
+        with self._manifests_lock:
+            return self._manifests.get(snap.id)
+
+    def load_manifests(self, snapshots: list[Snapshot]) -> dict[str, SnapshotManifest]:
+        """
+        Loads the manifests of several snapshots into memory. Meant to run in a
+        background task, so the views can then use get_cached_manifest.
+
+        Args:
+            snapshots (list[Snapshot]): The snapshots.
+
+        Returns:
+            dict[str, SnapshotManifest]: The manifests found, by snapshot id.
+        """
+        manifests = {}
+        for snap in snapshots:
+            manifest = self.get_manifest(snap)
+            if manifest is not None:
+                manifests[snap.id] = manifest
+        return manifests
+
+    def export_assoc_dirs(
+            self,
+            snap_id: str,
+            destination_path: Path,
+            options: ZipOptions = ZipOptions(),
+            on_progress: Callable[[int, int], None] | None = None,
+            is_cancelled: Callable[[], bool] | None = None,
+    ) -> Path | None:
+        """
+        Exports the associated directories of a snapshot to a zip file.
+
+        Args:
+            snap_id (str): The ID of the snapshot to export.
+            destination_path (Path): The folder where the exported zip file will be saved.
+            options (ZipOptions): The compression options of the archive.
+            on_progress (Callable[[int, int], None], optional): Called with the bytes written so far and the total.
+            is_cancelled (Callable[[], bool], optional): Polled while writing to abort the export.
+
+        Returns:
+            Path | None: The zip file, or None if the export was cancelled.
+        """
+        snap = self.get_by_id(snap_id)
+        if not snap:
+            raise ValueError(f"No snapshot found with ID {snap_id}")
+        trees = [(Path(d.original_path), Path(d.original_path).name) for d in snap.directories]
+        zip_path = destination_path.joinpath(get_export_zip_name("export", snap.id, "_ad"))
+        return zip_path if write_trees_zip(zip_path, trees, options, on_progress, is_cancelled) else None
+
+    def export_snapshot(
+            self,
+            snap_id: str,
+            destination_path: Path,
+            options: ZipOptions = ZipOptions(),
+            on_progress: Callable[[int, int], None] | None = None,
+            is_cancelled: Callable[[], bool] | None = None,
+    ) -> Path | None:
+        """
+        Exports the entire snapshot directory (the internal backup) to a zip file.
+        Snapshots stored in blobs are exported with their files, as if they were copied.
+
+        Args:
+            snap_id (str): The ID of the snapshot to export.
+            destination_path (Path): The folder where the exported zip file will be saved.
+            options (ZipOptions): The compression options of the archive.
+            on_progress (Callable[[int, int], None], optional): Called with the bytes written so far and the total.
+            is_cancelled (Callable[[], bool], optional): Polled while writing to abort the export.
+
+        Returns:
+            Path | None: The zip file, or None if the export was cancelled.
+        """
+        snap = self.get_by_id(snap_id)
+        if not snap:
+            raise ValueError(f"No snapshot found with ID {snap_id}")
+        zip_path = destination_path.joinpath(get_export_zip_name("export_snap", snap.id, "_sd"))
+        written = write_files_zip(zip_path, self.__get_archive_files(snap, ""), options, on_progress, is_cancelled)
+        return zip_path if written else None
+
+    def export_catalogue(
+            self,
+            destination_path: Path,
+            file_name: str = "catalogue_export.zip",
+            options: ZipOptions = ZipOptions(),
+            on_progress: Callable[[int, int], None] | None = None,
+            is_cancelled: Callable[[], bool] | None = None,
+    ) -> Path | None:
+        """
+        Exports the entire catalogue to a single zip file.
+
+        Args:
+            destination_path (Path): The folder where the exported zip file will be saved.
+            file_name (str): The name for the output zip file.
+            options (ZipOptions): The compression options of the archive.
+            on_progress (Callable[[int, int], None], optional): Called with the bytes written so far and the total.
+            is_cancelled (Callable[[], bool], optional): Polled while writing to abort the export.
+
+        Returns:
+            Path | None: The zip file, or None if the catalogue is empty or the export was cancelled.
+        """
+        snapshots = self.get_all()
+        if not snapshots:
+            logger.warning("Catalogue is empty. Nothing to export.")
+            return None
+        zip_path = destination_path.joinpath(file_name)
+        files = [file for snap in snapshots for file in self.__get_archive_files(snap, snap.folder_name)]
+        return zip_path if write_files_zip(zip_path, files, options, on_progress, is_cancelled) else None
+
+    def __get_snapshot_path(self, snap: Snapshot) -> Path:
+        return SnapshotUtils.get_snapshot_path(snap.folder_name, self.path_catalogue)
+
+    def __get_archive_files(self, snap: Snapshot, arc_root: str) -> list[tuple[str, str, int | None]]:
+        """Lists the files of a snapshot directory for an archive, taking the files of blob snapshots from the store."""
+        snapshot_path = self.__get_snapshot_path(snap)
+        files = get_trees_files([(snapshot_path, arc_root)])
+        if not is_blob_snapshot(snapshot_path):
+            return files
+        files = [file for file in files if os.path.basename(file[0]) != BLOB_SNAPSHOT_MARKER]
+        for file in iter_snapshot_files(snap, snapshot_path):
+            files.append((file.blob_path, os.path.join(arc_root, *file.rel_path.split("/")), file.mtime_ns))
+        return sorted(files, key=lambda file: file[1])
+
+    def __install_in_place(self, snap: Snapshot, manifest: SnapshotManifest, is_blob: bool) -> InstallStats:
+        stats = InstallStats()
+        for dir_assoc in snap.directories:
+            install_location = Path(dir_assoc.original_path)
+            entries = get_tree_entries(manifest, dir_assoc.directory_name)
+            if is_blob and not self.delta_install:
+                logger.info(f"Performing clean installation of '{dir_assoc.directory_name}' from the blob store to '{install_location}'")
+                install_location.mkdir(parents=True, exist_ok=True)
+                clear_directory(install_location)
+                stats.copied_size += materialize_tree(self.blob_store, manifest, dir_assoc.directory_name, install_location)
+                stats.copied_files += len(entries)
+            else:
+                logger.info(f"Performing delta installation of '{dir_assoc.directory_name}' to '{install_location}'")
+                stats.add(sync_tree(entries, install_location, *self.__get_install_source(snap, dir_assoc.directory_name, is_blob)))
+            if self.settings.install_with_everyone_full_control:
+                grant_everyone_full_control(install_location)
+        return stats
+
+    def __install_staged(self, snap: Snapshot, manifest: SnapshotManifest, is_blob: bool) -> InstallStats:
+        """
+        Writes every associated directory in its staging tree, swaps them all in, then
+        keeps the replaced trees as the previous ones. If a directory cannot be written or
+        swapped in, the installed and previous trees are left as they were.
+        """
+        stats = InstallStats()
+        targets = []
+        for dir_assoc in snap.directories:
+            target = Path(dir_assoc.original_path)
+            recover_staged_install(target)
+            staging = get_staging_tree_path(target)
+            logger.info(f"Staging '{dir_assoc.directory_name}' in '{staging}'")
+            staging.mkdir(parents=True, exist_ok=True)
+            if not self.delta_install:
+                clear_directory(staging)
+            entries = get_tree_entries(manifest, dir_assoc.directory_name)
+            stats.add(sync_tree(entries, staging, *self.__get_install_source(snap, dir_assoc.directory_name, is_blob)))
+            if self.settings.install_with_everyone_full_control:
+                grant_everyone_full_control(staging)
+            targets.append(target)
+        if stats.failed_files:
+            raise OSError(f"{stats.failed_files} files could not be prepared for the installation, the installed directories were not changed.")
+        swap_trees([(target, get_staging_tree_path(target)) for target in targets])
+        for target in targets:
+            try:
+                keep_replaced_tree(target)
+            except OSError as e:
+                logger.error(f"Unable to keep the replaced version of '{target}' for rollback: {e}")
+        return stats
+
+    def __get_install_source(self, snap: Snapshot, directory_name: str, is_blob: bool) -> tuple[Callable[[str, ManifestEntry], str], list[str]]:
+        """Returns where sync_tree reads the files of an associated directory from, and its directories to keep."""
+        if is_blob:
+            return lambda rel_path, entry: str(self.blob_store.get_blob_path(entry.digest)), []
+        source_dir = self.__get_snapshot_path(snap).joinpath(directory_name)
+        return lambda rel_path, entry: os.path.join(source_dir, *rel_path.split("/")), get_tree_directories(source_dir)
+
+    def __backup_snapshot(self, snap: Snapshot, reason: str):
+        """Backs up the snapshot directory, with the files of blob snapshots taken from the store."""
+        try:
+            self.backup_store.create(f"{snap.id}_sd", reason, self.__get_archive_files(snap, ""))
+        except Exception as e:
+            logger.error(f"Unable to back up snapshot {snap.id}: {e}")
+
+    def __backup_assoc_dirs(self, snap: Snapshot, reason: str):
+        """Backs up the installed copies of the associated directories of a snapshot."""
+        try:
+            trees = [(Path(d.original_path), Path(d.original_path).name) for d in snap.directories]
+            self.backup_store.create(f"{snap.id}_ad", reason, get_trees_files(trees))
+        except Exception as e:
+            logger.error(f"Unable to back up the associated directories of snapshot {snap.id}: {e}")
+
+    def __save_blob_snapshot(self, snap: Snapshot, manifest: SnapshotManifest):
+        """
+        Saves the manifest, the blob marker and the metadata of a snapshot stored in blobs,
+        in this order, then indexes its content. The blobs must already be stored: the
+        marker is written only once the manifest pointing at them is.
+        """
+        snapshot_path = self.__get_snapshot_path(snap)
+        manifest.save(get_manifest_path(snapshot_path))
+        snapshot_path.joinpath(BLOB_SNAPSHOT_MARKER).touch()
+        with self._manifests_lock:
+            self._manifests[snap.id] = manifest
+        SnapshotSerializer.to_json(snap, snapshot_path.joinpath(self.settings.json_filename))
+        try:
+            refresh_snapshot_index(snap, snapshot_path)
+        except OSError as e:
+            logger.warning(f"Unable to update the content index of snapshot {snap.id}: {e}")
@@ -0,0 +1,385 @@
+import bisect
+import re
+import unicodedata
+from dataclasses import dataclass
+
+from pylizlib.core.os.snap import Snapshot
+
+
+FIELD_NAME = "name"
+FIELD_DESC = "desc"
+FIELD_TAG = "tag"
+FIELD_AUTHOR = "author"
+
+# The names a field can be written with in a query, English and Italian.
+FIELD_ALIASES = {
+    "name": FIELD_NAME, "nome": FIELD_NAME,
+    "desc": FIELD_DESC, "descrizione": FIELD_DESC,
+    "tag": FIELD_TAG, "tags": FIELD_TAG,
+    "author": FIELD_AUTHOR, "autore": FIELD_AUTHOR,
+}
+FIELD_WEIGHTS = {FIELD_NAME: 3.0, FIELD_TAG: 2.0, FIELD_AUTHOR: 1.5, FIELD_DESC: 1.0}
+DATA_FIELD_WEIGHT = 1.5
+
+MATCH_EXACT = 1.0
+MATCH_PREFIX = 0.8
+MATCH_INFIX = 0.5
+MATCH_FUZZY = 0.4
+FUZZY_MIN_LENGTH = 4
+INFIX_MIN_LENGTH = 2
+TERM_CACHE_SIZE = 256
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+_QUERY_PATTERN = re.compile(r'(?:([^\s:"]+):)?(?:"([^"]*)"?|(\S+))')
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes a text for case and accent insensitive matching.
+
+    Args:
+        text (str): The text to normalize.
+
+    Returns:
+        str: The text case-folded, without accents and with its whitespace collapsed.
+    """
+    text = text.casefold()
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return " ".join(text.split())
+
+
+def get_data_field(key: str) -> str:
+    """Returns the name of the query field of a custom data key (e.g. "Numero macchina" -> "numero_macchina")."""
+    return normalize_text(key).replace(" ", "_")
+
+
+def get_snapshot_fields(snap: Snapshot) -> dict[str, str]:
+    """
+    Returns the normalized text of every searchable field of a snapshot: name,
+    description, tags (one per line), author and every custom data value.
+    """
+    fields = {
+        FIELD_NAME: normalize_text(snap.name),
+        FIELD_DESC: normalize_text(snap.desc),
+        FIELD_TAG: "\n".join(normalize_text(tag) for tag in snap.tags),
+        FIELD_AUTHOR: normalize_text(snap.author or ""),
+    }
+    for key, value in (snap.data or {}).items():
+        field = get_data_field(key)
+        if field not in fields:
+            fields[field] = normalize_text(str(value))
+    return fields
+
+
+@dataclass
+class QueryTerm:
+    """
+    A term of a catalogue query.
+
+    Attributes:
+        field: The field the term is searched in, or None for every field.
+        tokens: The words of the term, all required.
+        phrase: The normalized text of a term that must appear as written: a quoted term of several
+                words, or a term with punctuation (e.g. "1.2", "c++") or of one letter. None otherwise.
+    """
+    field: str | None
+    tokens: list[str]
+    phrase: str | None = None
+
+
+def parse_query(text: str, data_fields: set[str] = frozenset()) -> list[QueryTerm]:
+    """
+    Parses the text typed in the catalogue search box.
+
+    Words are separated by spaces and must all match. A word can be limited to a
+    field with "field:word" (name, desc, tag, author, their Italian names, or the
+    name of a custom data key with its spaces replaced by "_"), and a quoted text
+    must appear as written: tag:JIRA macchina:"FLEX 2" speedy. Words with
+    punctuation or of one letter must also appear as written, since their words
+    alone would match too much ("c++") or too little ("1.2" in "v1.2").
+
+    Args:
+        text (str): The query.
+        data_fields (set[str]): The fields of the custom data keys (see get_data_field). A
+                                prefix that is not a known field is searched as text.
+
+    Returns:
+        list[QueryTerm]: The terms, without the empty ones.
+    """
+    terms = []
+    for match in _QUERY_PATTERN.finditer(text):
+        field_name, quoted, word = match.groups()
+        field = None
+        if field_name is not None:
+            field = FIELD_ALIASES.get(normalize_text(field_name), get_data_field(field_name))
+            if field not in FIELD_WEIGHTS and field not in data_fields:
+                field = None
+                word = f"{field_name}:{quoted if quoted is not None else word}"
+                quoted = None
+        value = normalize_text(quoted if quoted is not None else word)
+        tokens = _TOKEN_PATTERN.findall(value)
+        if tokens:
+            phrase = value if value != tokens[0] or len(value) < INFIX_MIN_LENGTH else None
+            terms.append(QueryTerm(field, tokens, phrase))
+    return terms
+
+
+def _get_deletes(token: str) -> set[str]:
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def _is_within_one_edit(a: str, b: str) -> bool:
+    """Checks whether two words differ by at most one insertion, deletion, substitution or swap of adjacent letters."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:] or (i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:])
+    return a[i:] == b[i + 1:]
+
+
+class CatalogueFilter:
+    """
+    Filters the snapshots of the catalogue by the text typed in the search box,
+    with an in-memory inverted index of their words.
+
+    Every word of every field (see get_snapshot_fields) maps to the snapshots
+    containing it, by field. A query word matches the words equal to it, starting
+    with it, containing it, or differing from it by one typo (for words of
+    FUZZY_MIN_LENGTH letters or more without digits: codes and numbers must be
+    exact), so results are found while a word is being typed and despite small
+    mistakes. Snapshots are ranked by how well and where their words match (a match
+    in the name counts more than one in the description).
+
+    The index is updated incrementally: setting the snapshots again only re-indexes
+    the ones added or changed. The matches of every query word are cached until the
+    index changes, so typing a query only evaluates the word being typed, and the
+    words it can match are looked for among the ones matched by the same word
+    before the last keystroke.
+
+    Terms with a word shorter than INFIX_MIN_LENGTH are not looked up in the index,
+    whose words would miss them inside other words: their phrase is looked for in
+    the text of the fields, among the snapshots containing the phrase typed before
+    the last keystroke when it is part of the new one.
+    """
+
+    def __init__(self):
+        self._snapshots: list[Snapshot] = []
+        self._positions: dict[str, int] = {}
+        self._docs: dict[str, tuple[Snapshot, dict[str, str]]] = {}
+        self._postings: dict[str, dict[str, set[str]]] = {}
+        self._vocabulary: list[str] | None = None
+        self._deletes: dict[str, set[str]] = {}
+        self._data_fields: dict[str, int] = {}
+        self._term_cache: dict[tuple[str | None, str], dict[str, float]] = {}
+        self._last_infix: tuple[str, list[str]] = ("", [])
+        self._last_phrase: tuple[str | None, str, list[str]] | None = None
+
+    def set_snapshots(self, snapshots: list[Snapshot]):
+        """
+        Sets the snapshots to filter, in the order equally ranked results are returned.
+        Only the snapshots added or changed since the last call are (re)indexed.
+
+        Args:
+            snapshots (list[Snapshot]): The snapshots. Ids must be unique.
+        """
+        ids = {snap.id for snap in snapshots}
+        changed = False
+        for snap_id in [snap_id for snap_id in self._docs if snap_id not in ids]:
+            self.__remove(snap_id)
+            changed = True
+        for snap in snapshots:
+            doc = self._docs.get(snap.id)
+            if doc is not None and (doc[0] is snap or doc[0] == snap):
+                self._docs[snap.id] = (snap, doc[1])
+                continue
+            if doc is not None:
+                self.__remove(snap.id)
+            self.__add(snap)
+            changed = True
+        self._snapshots = list(snapshots)
+        self._positions = {snap.id: i for i, snap in enumerate(snapshots)}
+        if changed:
+            self._term_cache.clear()
+            self._last_infix = ("", [])
+            self._last_phrase = None
+
+    def filter(self, text: str) -> list[Snapshot]:
+        """
+        Returns the snapshots matching a query (see parse_query), best matches first.
+
+        Args:
+            text (str): The query; case, accents and repeated spaces are ignored.
+
+        Returns:
+            list[Snapshot]: The snapshots matched, by decreasing relevance and then in the
+                            order they were set (all of them, in that order, if the query is empty).
+        """
+        terms = parse_query(text, set(self._data_fields))
+        if not terms:
+            return list(self._snapshots)
+        matches = []
+        for term in terms:
+            if self.__is_scanned(term):
+                matches.append(self.__match_phrase(term))
+            else:
+                matches.extend(self.__match_token(term.field, token) for token in term.tokens)
+        matches.sort(key=len)
+        scores = dict(matches[0])
+        for match in matches[1:]:
+            scores = {snap_id: score + match[snap_id] for snap_id, score in scores.items() if snap_id in match}
+            if not scores:
+                return []
+        for term in terms:
+            if term.phrase is not None and not self.__is_scanned(term):
+                scores = {snap_id: score for snap_id, score in scores.items() if self.__get_phrase_weight(snap_id, term)}
+        if len(scores) * 8 < len(self._snapshots):
+            positions = self._positions
+            ranked = sorted(scores, key=lambda snap_id: (-scores[snap_id], positions[snap_id]))
+            return [self._snapshots[positions[snap_id]] for snap_id in ranked]
+        # Many matches: a pass in the order of the snapshots, by score, is cheaper than sorting.
+        buckets: dict[float, list[Snapshot]] = {}
+        get_score = scores.get
+        for snap in self._snapshots:
+            score = get_score(snap.id)
+            if score is not None:
+                buckets.setdefault(score, []).append(snap)
+        return [snap for score in sorted(buckets, reverse=True) for snap in buckets[score]]
+
+    def __add(self, snap: Snapshot):
+        fields = get_snapshot_fields(snap)
+        self._docs[snap.id] = (snap, fields)
+        for field, value in fields.items():
+            if field not in FIELD_WEIGHTS:
+                self._data_fields[field] = self._data_fields.get(field, 0) + 1
+            for token in set(_TOKEN_PATTERN.findall(value)):
+                by_field = self._postings.get(token)
+                if by_field is None:
+                    by_field = self._postings[token] = {}
+                    self._vocabulary = None
+                    if len(token) >= FUZZY_MIN_LENGTH - 1:
+                        for variant in _get_deletes(token):
+                            self._deletes.setdefault(variant, set()).add(token)
+                by_field.setdefault(field, set()).add(snap.id)
+
+    def __remove(self, snap_id: str):
+        _, fields = self._docs.pop(snap_id)
+        for field, value in fields.items():
+            if field not in FIELD_WEIGHTS:
+                self._data_fields[field] -= 1
+                if not self._data_fields[field]:
+                    del self._data_fields[field]
+            for token in set(_TOKEN_PATTERN.findall(value)):
+                by_field = self._postings[token]
+                docs = by_field[field]
+                docs.discard(snap_id)
+                if docs:
+                    continue
+                del by_field[field]
+                if by_field:
+                    continue
+                del self._postings[token]
+                self._vocabulary = None
+                if len(token) >= FUZZY_MIN_LENGTH - 1:
+                    for variant in _get_deletes(token):
+                        tokens = self._deletes[variant]
+                        tokens.discard(token)
+                        if not tokens:
+                            del self._deletes[variant]
+
+    @staticmethod
+    def __is_scanned(term: QueryTerm) -> bool:
+        return term.phrase is not None and min(map(len, term.tokens)) < INFIX_MIN_LENGTH
+
+    def __get_phrase_weight(self, snap_id: str, term: QueryTerm) -> float:
+        """Returns the weight of the best field of a snapshot containing the phrase of a term, 0 if none does."""
+        fields = self._docs[snap_id][1]
+        if term.field is not None:
+            return FIELD_WEIGHTS.get(term.field, DATA_FIELD_WEIGHT) if term.phrase in fields.get(term.field, "") else 0.0
+        if term.phrase in fields[FIELD_NAME]:
+            # The name comes first and weighs the most.
+            return FIELD_WEIGHTS[FIELD_NAME]
+        weight = 0.0
+        for field, value in fields.items():
+            if term.phrase in value:
+                weight = max(weight, FIELD_WEIGHTS.get(field, DATA_FIELD_WEIGHT))
+        return weight
+
+    def __match_phrase(self, term: QueryTerm) -> dict[str, float]:
+        """Returns the score of every snapshot containing the phrase of a term, looked for in the text of its fields."""
+        key = (term.field, f'"{term.phrase}"')
+        cached = self._term_cache.get(key)
+        if cached is not None:
+            return cached
+        # Snapshots containing the phrase also contain the shorter phrase typed before it.
+        last = self._last_phrase
+        candidates = last[2] if last is not None and last[0] == term.field and last[1] in term.phrase else self._docs
+        scores: dict[str, float] = {}
+        for snap_id in candidates:
+            weight = self.__get_phrase_weight(snap_id, term)
+            if weight:
+                scores[snap_id] = weight * MATCH_INFIX
+        self._last_phrase = (term.field, term.phrase, list(scores))
+        if len(self._term_cache) >= TERM_CACHE_SIZE:
+            self._term_cache.pop(next(iter(self._term_cache)))
+        self._term_cache[key] = scores
+        return scores
+
+    def __match_token(self, field: str | None, token: str) -> dict[str, float]:
+        """Returns the score of every snapshot matching a query word, in a field or in any field."""
+        key = (field, token)
+        cached = self._term_cache.get(key)
+        if cached is not None:
+            return cached
+        # The best weight of every matched word, applied from the highest so every snapshot keeps its best.
+        weights: dict[tuple[str, str], float] = {}
+        for word, weight in self.__match_words(token):
+            for word_field in self._postings[word]:
+                if field is None or word_field == field:
+                    total = weight * FIELD_WEIGHTS.get(word_field, DATA_FIELD_WEIGHT)
+                    if weights.get((word, word_field), 0.0) < total:
+                        weights[(word, word_field)] = total
+        scores: dict[str, float] = {}
+        for (word, word_field), weight in sorted(weights.items(), key=lambda item: -item[1]):
+            docs = self._postings[word][word_field]
+            scores.update(dict.fromkeys(docs - scores.keys(), weight))
+        if len(self._term_cache) >= TERM_CACHE_SIZE:
+            self._term_cache.pop(next(iter(self._term_cache)))
+        self._term_cache[key] = scores
+        return scores
+
+    def __match_words(self, token: str) -> list[tuple[str, float]]:
+        """Returns the indexed words a query word matches, with the weight of the match."""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        vocabulary = self._vocabulary
+        words: dict[str, float] = {}
+        start = bisect.bisect_left(vocabulary, token)
+        end = bisect.bisect_left(vocabulary, token + "\U0010ffff", start)
+        for word in vocabulary[start:end]:
+            words[word] = MATCH_EXACT if word == token else MATCH_PREFIX
+        if len(token) >= INFIX_MIN_LENGTH:
+            # Words containing the token also contain the shorter token typed before it.
+            last_token, last_words = self._last_infix
+            candidates = last_words if last_token and last_token in token else vocabulary
+            infix = [word for word in candidates if token in word]
+            self._last_infix = (token, infix)
+            for word in infix:
+                words.setdefault(word, MATCH_INFIX)
+        if len(token) >= FUZZY_MIN_LENGTH and token.isalpha():
+            candidates = set(self._deletes.get(token, ()))
+            for variant in _get_deletes(token):
+                if variant in self._postings:
+                    candidates.add(variant)
+                candidates.update(self._deletes.get(variant, ()))
+            for word in candidates:
+                if word not in words and _is_within_one_edit(token, word):
+                    words[word] = MATCH_FUZZY
+        return list(words.items())
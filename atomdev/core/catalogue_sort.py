@@ -0,0 +1,91 @@
+from typing import Any, Callable
+
+from pylizlib.core.os.snap import Snapshot, SnapshotSortKey
+
+
+class CatalogueSorter:
+    """
+    Sorts the snapshots of the catalogue by a SnapshotSortKey, like
+    SnapshotUtils.sort_snapshots: strings are compared ignoring case and the
+    snapshots without a value are placed at the end, in both directions.
+
+    The key of every snapshot is computed once per sort key and kept until the
+    snapshot changes, and every order computed is kept until the snapshots are set
+    again, so switching between sort keys or directions already used costs nothing.
+    Sizes are never measured here: they come from the function given, which must
+    answer without touching the disk.
+    """
+
+    def __init__(self, get_size: Callable[[Snapshot], int | None]):
+        """
+        Initializes the CatalogueSorter.
+
+        Args:
+            get_size (Callable[[Snapshot], int | None]): Returns the size of a snapshot
+                                                         for SnapshotSortKey.ASSOC_DIR_MB_SIZE,
+                                                         or None if unknown.
+        """
+        self.get_size = get_size
+        self._snapshots: list[Snapshot] = []
+        self._by_id: dict[str, Snapshot] = {}
+        self._keys: dict[SnapshotSortKey, dict[str, Any]] = {}
+        self._orders: dict[tuple[SnapshotSortKey, bool], list[Snapshot]] = {}
+
+    def set_snapshots(self, snapshots: list[Snapshot]):
+        """
+        Sets the snapshots to sort. The keys of the snapshots added or changed since
+        the last call are computed again; the order of the list given is the order
+        of snapshots with equal keys.
+
+        Args:
+            snapshots (list[Snapshot]): The snapshots. Ids must be unique.
+        """
+        by_id = {snap.id: snap for snap in snapshots}
+        stale = [snap_id for snap_id, snap in self._by_id.items() if by_id.get(snap_id) is not snap and by_id.get(snap_id) != snap]
+        for keys in self._keys.values():
+            for snap_id in stale:
+                keys.pop(snap_id, None)
+        self._snapshots = list(snapshots)
+        self._by_id = by_id
+        self._orders.clear()
+
+    def invalidate_sizes(self):
+        """Forgets the sizes of the snapshots, to be called when the function giving them would answer differently."""
+        self._keys.pop(SnapshotSortKey.ASSOC_DIR_MB_SIZE, None)
+        self._orders.pop((SnapshotSortKey.ASSOC_DIR_MB_SIZE, False), None)
+        self._orders.pop((SnapshotSortKey.ASSOC_DIR_MB_SIZE, True), None)
+
+    def sort(self, sort_key: SnapshotSortKey, descending: bool = False) -> list[Snapshot]:
+        """
+        Returns the snapshots sorted by a key.
+
+        Args:
+            sort_key (SnapshotSortKey): The key to sort by.
+            descending (bool): True to sort from the greatest value.
+
+        Returns:
+            list[Snapshot]: A new list with the snapshots sorted.
+        """
+        order = self._orders.get((sort_key, descending))
+        if order is None:
+            keys = self.__get_keys(sort_key)
+            with_value = [snap for snap in self._snapshots if keys[snap.id] is not None]
+            without_value = [snap for snap in self._snapshots if keys[snap.id] is None]
+            with_value.sort(key=lambda snap: keys[snap.id], reverse=descending)
+            order = self._orders[(sort_key, descending)] = with_value + without_value
+        return list(order)
+
+    def __get_keys(self, sort_key: SnapshotSortKey) -> dict[str, Any]:
+        keys = self._keys.setdefault(sort_key, {})
+        for snap in self._snapshots:
+            if snap.id not in keys:
+                keys[snap.id] = self.__get_key(snap, sort_key)
+        return keys
+
+    def __get_key(self, snap: Snapshot, sort_key: SnapshotSortKey) -> Any:
+        if sort_key == SnapshotSortKey.ASSOC_DIR_MB_SIZE:
+            return self.get_size(snap)
+        value = getattr(snap, sort_key.value)
+        if isinstance(value, str):
+            return value.casefold()
+        return value
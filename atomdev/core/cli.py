@@ -0,0 +1,242 @@
+"""
+Command line interface of AtomDev.
+
+This module must not import PySide6 or qfluentwidgets (directly or through
+atomdev.application), so it can run headless in scripts and CI.
+
+Usage:
+    python -m atomdev search QUERY [options]
+    python -m atomdev storage {status,migrate,gc} [options]
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from loguru import logger
+from pylizlib.core.app.pylizapp import PylizApp
+from pylizlib.core.os.snap import Snapshot, SnapshotSearchParams, SnapshotSearchResult, QueryType, SearchTarget
+
+from atomdev.core.catalogue import DevlizSnapshotCatalogue
+from atomdev.core.query import MultiTermSearchParams, MULTI_TERM_SEPARATOR
+from atomdev.core.search import IndexedSnapshotSearcher, SnapshotSearchStats
+from atomdev.project import name, version, authors
+
+
+EXIT_FOUND = 0
+EXIT_NOT_FOUND = 1
+EXIT_ERROR = 2
+
+# Same names used by atomdev.application.app, which cannot be imported here.
+SETTINGS_FILE_NAME = "Settings.json"
+SETTINGS_GROUP_CONFIGS = "Configurazioni"
+SETTINGS_KEY_CATALOGUE_PATH = "Catalogue Path"
+DEFAULT_CATALOGUE_DIR_NAME = "Catalogue"
+
+
+def get_default_catalogue_path() -> Path:
+    """
+    Returns the catalogue path configured in the application settings, or the
+    default catalogue directory if the settings do not define one.
+    """
+    app_path = Path(PylizApp(name, version, name, authors[0][0]).get_path())
+    try:
+        settings = json.loads(app_path.joinpath(SETTINGS_FILE_NAME).read_text(encoding="utf-8"))
+        return Path(settings[SETTINGS_GROUP_CONFIGS][SETTINGS_KEY_CATALOGUE_PATH])
+    except (OSError, ValueError, KeyError, TypeError):
+        return app_path.joinpath(DEFAULT_CATALOGUE_DIR_NAME)
+
+
+def _get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="atomdev", description="AtomDev command line tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    search = subparsers.add_parser(
+        "search",
+        help="Search the snapshots of the catalogue, printing one JSON object per hit.",
+        description="Search the snapshots of the catalogue. Hits are printed to stdout as JSON lines "
+                    "while they are found. Exit status is 0 if something was found, 1 if not, 2 on errors.",
+    )
+    search.add_argument("query", help=f"The text to search (a regex with --regex, terms separated by '{MULTI_TERM_SEPARATOR}' with --multi).")
+    mode = search.add_mutually_exclusive_group()
+    mode.add_argument("--regex", action="store_true", help="Interpret the query as a regular expression.")
+    mode.add_argument("--multi", action="store_true", help=f"Search several terms separated by '{MULTI_TERM_SEPARATOR}' in one pass.")
+    search.add_argument("--names", action="store_true", help="Search file names instead of file contents.")
+    search.add_argument("--ext", action="append", default=[], metavar="EXT", help="Only search files with this extension (e.g. .xml). Repeatable.")
+    search.add_argument("--snapshot", action="append", default=[], metavar="ID_OR_NAME", help="Only search this snapshot. Repeatable.")
+    search.add_argument("--catalogue", type=Path, default=None, help="The catalogue directory. Defaults to the one configured in the application.")
+    search.add_argument("--workers", type=int, default=max(1, min(8, (os.cpu_count() or 1) - 1)), help="Number of worker processes (1 = no parallelism).")
+    search.add_argument("--limit", type=int, default=None, help="Stop after this many hits.")
+    search.add_argument("--max-file-size", type=int, default=None, metavar="MB", help="Skip files larger than this size.")
+    search.add_argument("--no-index-update", action="store_true", help="Do not write refreshed content indexes into the catalogue.")
+    search.add_argument("--verbose", action="store_true", help="Log debug messages to stderr.")
+
+    storage = subparsers.add_parser(
+        "storage",
+        help="Manage the blob store of the catalogue, printing one JSON object per line.",
+        description="Manage the blob store of the catalogue. 'status' prints how the snapshots are stored, "
+                    "'migrate' moves the files of copied snapshots into the blob store, 'gc' deletes the blobs "
+                    "no snapshot uses any more. Exit status is 0 on success, 2 on errors.",
+    )
+    storage.add_argument("action", choices=["status", "migrate", "gc"], help="The operation to run.")
+    storage.add_argument("--snapshot", action="append", default=[], metavar="ID_OR_NAME", help="Only migrate this snapshot. Repeatable.")
+    storage.add_argument("--catalogue", type=Path, default=None, help="The catalogue directory. Defaults to the one configured in the application.")
+    storage.add_argument("--verbose", action="store_true", help="Log debug messages to stderr.")
+    return parser
+
+
+def _get_params(args: argparse.Namespace) -> SnapshotSearchParams:
+    search_target = SearchTarget.FILE_NAME if args.names else SearchTarget.FILE_CONTENT
+    extensions = [ext if ext.startswith(".") else f".{ext}" for ext in args.ext]
+    if args.multi:
+        return MultiTermSearchParams.from_text(args.query, search_target, extensions)
+    query_type = QueryType.REGEX if args.regex else QueryType.TEXT
+    return SnapshotSearchParams(query=args.query, query_type=query_type, search_target=search_target, extensions=extensions)
+
+
+def _select_snapshots(snapshots: list[Snapshot], selectors: list[str]) -> list[Snapshot]:
+    if not selectors:
+        return snapshots
+    return [snap for snap in snapshots if snap.id in selectors or snap.name in selectors]
+
+
+def _to_json_line(snapshot: Snapshot, res: SnapshotSearchResult) -> str:
+    return json.dumps({
+        "snapshot_id": snapshot.id,
+        "snapshot": res.snapshot_name,
+        "file": str(res.file_path),
+        "term": res.searched_text,
+        "line": res.line_number,
+        "offset": getattr(res, "byte_offset", None),
+        "text": res.line_content,
+    }, ensure_ascii=False)
+
+
+def run_search(args: argparse.Namespace) -> int:
+    """
+    Runs the search subcommand.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        int: The exit status.
+    """
+    catalogue_path = args.catalogue if args.catalogue is not None else get_default_catalogue_path()
+    if not catalogue_path.is_dir():
+        logger.error(f"Catalogue directory not found: {catalogue_path}")
+        return EXIT_ERROR
+    if args.limit is not None and args.limit <= 0:
+        logger.error("--limit must be a positive number")
+        return EXIT_ERROR
+
+    catalogue = DevlizSnapshotCatalogue(catalogue_path)
+    snapshots = _select_snapshots(catalogue.get_all(), args.snapshot)
+    if args.snapshot and not snapshots:
+        logger.error(f"No snapshot matches {', '.join(args.snapshot)}")
+        return EXIT_ERROR
+    params = _get_params(args)
+    max_file_size = args.max_file_size * 1024 * 1024 if args.max_file_size else None
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 and not args.names else None
+    searcher = IndexedSnapshotSearcher(catalogue, update_index=not args.no_index_update, executor=executor, max_file_size=max_file_size)
+    stats = SnapshotSearchStats()
+    printed = 0
+
+    def on_results(results: list[SnapshotSearchResult]):
+        nonlocal printed
+        if searcher.is_cancelled():
+            return
+        if args.limit is not None:
+            results = results[:args.limit - printed]
+        sys.stdout.write("".join(_to_json_line(snapshot, res) + "\n" for res in results))
+        sys.stdout.flush()
+        printed += len(results)
+        if args.limit is not None and printed >= args.limit:
+            searcher.cancel()
+
+    try:
+        for snapshot in snapshots:
+            searcher.search(snapshot, params, on_results=on_results)
+            stats.add(searcher.last_stats)
+            if searcher.is_cancelled():
+                break
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head): stop quietly, without
+        # failing again when the interpreter flushes stdout at exit.
+        searcher.cancel()
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    logger.debug(f"Search completed: {printed} hits, {stats.files_scanned} files scanned of {stats.files_total}, {stats.index_hits} excluded by the index")
+    return EXIT_FOUND if printed else EXIT_NOT_FOUND
+
+
+def run_storage(args: argparse.Namespace) -> int:
+    """
+    Runs the storage subcommand.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        int: The exit status.
+    """
+    catalogue_path = args.catalogue if args.catalogue is not None else get_default_catalogue_path()
+    if not catalogue_path.is_dir():
+        logger.error(f"Catalogue directory not found: {catalogue_path}")
+        return EXIT_ERROR
+    catalogue = DevlizSnapshotCatalogue(catalogue_path)
+    snapshots = catalogue.get_all()
+
+    if args.action == "status":
+        blob_snapshots = sum(1 for snap in snapshots if catalogue.is_blob_snapshot(snap))
+        stats = catalogue.blob_store.get_stats()
+        print(json.dumps({"snapshots": len(snapshots), "blob_snapshots": blob_snapshots, "blobs": stats.blobs, "blobs_size": stats.size}))
+        return EXIT_FOUND
+
+    if args.action == "migrate":
+        selected = _select_snapshots(snapshots, args.snapshot)
+        if args.snapshot and not selected:
+            logger.error(f"No snapshot matches {', '.join(args.snapshot)}")
+            return EXIT_ERROR
+        status = EXIT_FOUND
+        for snap in selected:
+            try:
+                freed = catalogue.migrate_to_blob_store(snap)
+            except OSError as e:
+                logger.error(f"Unable to migrate snapshot {snap.id}: {e}")
+                status = EXIT_ERROR
+                continue
+            print(json.dumps({"snapshot_id": snap.id, "snapshot": snap.name, "freed": freed}, ensure_ascii=False), flush=True)
+        return status
+
+    try:
+        removed = catalogue.collect_garbage()
+    except ValueError as e:
+        logger.error(str(e))
+        return EXIT_ERROR
+    print(json.dumps({"deleted_blobs": removed.blobs, "deleted_size": removed.size}))
+    return EXIT_FOUND
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Entry point of the command line interface.
+
+    Args:
+        argv (list[str] | None): The arguments, without the program name. Defaults to sys.argv.
+
+    Returns:
+        int: The exit status.
+    """
+    args = _get_parser().parse_args(argv)
+    logger.remove()
+    logger.add(sys.stderr, level="DEBUG" if args.verbose else "WARNING", format="{time:HH:mm:ss} | {level} | {message}")
+    if args.command == "search":
+        return run_search(args)
+    if args.command == "storage":
+        return run_storage(args)
+    return EXIT_ERROR
@@ -0,0 +1,175 @@
+import os
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from loguru import logger
+
+from atomdev.core.walker import walk, DEFAULT_WALK_WORKERS
+
+
+# ioctl request of Linux to share the extents of a file (btrfs, XFS).
+FICLONE = 0x40049409
+UNSHARE_TMP_SUFFIX = ".atomdev-unshare.tmp"
+
+
+@dataclass
+class CloneStats:
+    """
+    Counters of a tree cloned by clone_tree.
+
+    Attributes:
+        reflinked: The files sharing their data with the source until one is modified.
+        hardlinked: The files linked to the source file (same data, same file).
+        copied: The files copied, where neither reflinks nor hardlinks are available.
+        copied_size: The bytes copied.
+    """
+    reflinked: int = 0
+    hardlinked: int = 0
+    copied: int = 0
+    copied_size: int = 0
+
+
+class _Cloner:
+    """Clones files, remembering which methods the file system does not support."""
+
+    def __init__(self):
+        self.can_reflink = sys.platform == "linux"
+        self.can_hardlink = True
+
+    def clone(self, src: str, dst: str) -> str:
+        if self.can_reflink:
+            if self.__reflink(src, dst):
+                return "reflink"
+            self.can_reflink = False
+        if self.can_hardlink:
+            try:
+                os.link(src, dst)
+                return "hardlink"
+            except OSError as e:
+                # Another volume or a file system without links (FAT, some network shares).
+                logger.debug(f"Hardlinks not available for {dst}, copying instead: {e}")
+                self.can_hardlink = False
+        shutil.copy2(src, dst)
+        return "copy"
+
+    @staticmethod
+    def __reflink(src: str, dst: str) -> bool:
+        import fcntl
+        try:
+            with open(src, "rb") as f_src, open(dst, "wb") as f_dst:
+                fcntl.ioctl(f_dst.fileno(), FICLONE, f_src.fileno())
+            shutil.copystat(src, dst)
+            return True
+        except OSError:
+            try:
+                os.unlink(dst)
+            except OSError:
+                pass
+            return False
+
+
+def clone_tree(src: Path, dst: Path, max_workers: int = DEFAULT_WALK_WORKERS) -> CloneStats:
+    """
+    Recreates a tree sharing the data of its files with the source instead of copying it.
+
+    Every file is reflinked where the file system supports it (the copy then gets its
+    own data when either side is modified), otherwise hardlinked to the source file,
+    otherwise copied (e.g. across volumes). Hardlinked files are the same file as the
+    source: they must only be replaced, never modified in place, until unshare_tree
+    gives them their own copy.
+
+    Args:
+        src (Path): The tree to clone.
+        dst (Path): The new tree. It must not exist.
+        max_workers (int): The number of threads cloning the files.
+
+    Returns:
+        CloneStats: How the files were cloned.
+
+    Raises:
+        OSError: If a directory or a file cannot be created.
+    """
+    root = str(src)
+    files: list[tuple[str, str, int]] = []
+    dst.mkdir(parents=True)
+    for entry in sorted(walk(src, include_dirs=True), key=lambda e: e.path):
+        target = os.path.join(dst, os.path.relpath(entry.path, root))
+        if entry.is_dir:
+            os.makedirs(target, exist_ok=True)
+        else:
+            files.append((entry.path, target, entry.size))
+
+    cloner = _Cloner()
+
+    def run_job(job: tuple[str, str, int]) -> str:
+        return cloner.clone(job[0], job[1])
+
+    if max_workers > 1 and len(files) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="clone") as executor:
+            methods = list(executor.map(run_job, files))
+    else:
+        methods = [run_job(job) for job in files]
+    stats = CloneStats()
+    for (_, _, size), method in zip(files, methods):
+        if method == "reflink":
+            stats.reflinked += 1
+        elif method == "hardlink":
+            stats.hardlinked += 1
+        else:
+            stats.copied += 1
+            stats.copied_size += size
+    return stats
+
+
+def unshare_tree(root: Path) -> int:
+    """
+    Gives its own copy to every hardlinked file of a tree, so it can be modified in
+    place without changing the other trees sharing it (see clone_tree).
+
+    Args:
+        root (Path): The tree.
+
+    Returns:
+        int: The number of files copied.
+
+    Raises:
+        OSError: If a shared file cannot be copied.
+    """
+    unshared = 0
+    for entry in walk(root):
+        if unshare_file(entry.path):
+            unshared += 1
+    return unshared
+
+
+def unshare_file(path: str | Path) -> bool:
+    """
+    Gives its own copy to a file if it is hardlinked (see clone_tree), so it can be
+    modified in place without changing the other trees sharing it.
+
+    Args:
+        path (str | Path): The file.
+
+    Returns:
+        bool: True if the file was copied, False if it was not shared.
+
+    Raises:
+        OSError: If the file cannot be copied.
+    """
+    # DirEntry.stat does not report the link count on Windows: ask the file itself.
+    if os.stat(path).st_nlink <= 1:
+        return False
+    tmp_path = str(path) + UNSHARE_TMP_SUFFIX
+    try:
+        shutil.copy2(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return True
@@ -0,0 +1,403 @@
+import os
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable
+
+from loguru import logger
+
+from atomdev.core.blob_store import BlobStore
+from atomdev.core.manifest import ManifestEntry, hash_file
+from atomdev.core.walker import walk, DEFAULT_WALK_WORKERS
+
+
+PREVIOUS_TREE_SUFFIX = ".atomdev-previous"
+STAGING_TREE_SUFFIX = ".atomdev-staging"
+RECYCLED_TREE_SUFFIX = ".atomdev-recycled"
+SWAP_TREE_SUFFIX = ".atomdev-swap"
+
+
+@dataclass
+class InstallStats:
+    """
+    Counters of a delta installation.
+
+    Attributes:
+        copied_files: The files written because they were missing or different.
+        copied_size: The bytes written.
+        deleted_files: The installed files deleted because the snapshot does not contain them.
+        unchanged_files: The installed files left in place because they match the snapshot.
+        unchanged_size: The bytes not copied thanks to the unchanged files.
+        failed_files: The files that could not be written or deleted (see the log).
+    """
+    copied_files: int = 0
+    copied_size: int = 0
+    deleted_files: int = 0
+    unchanged_files: int = 0
+    unchanged_size: int = 0
+    failed_files: int = 0
+
+    def add(self, other: 'InstallStats'):
+        """Adds the counters of another installation to these ones."""
+        self.copied_files += other.copied_files
+        self.copied_size += other.copied_size
+        self.deleted_files += other.deleted_files
+        self.unchanged_files += other.unchanged_files
+        self.unchanged_size += other.unchanged_size
+        self.failed_files += other.failed_files
+
+
+def clear_directory(path: Path):
+    """
+    Deletes the content of a directory, keeping the directory itself.
+    Items that cannot be deleted are logged and skipped.
+
+    Args:
+        path (Path): The directory to clear.
+    """
+    for item in path.iterdir():
+        try:
+            if item.is_dir() and not item.is_symlink():
+                shutil.rmtree(item)
+            else:
+                item.unlink()
+        except OSError as e:
+            logger.error(f"Could not remove item {item} during clean install: {e}")
+
+
+def get_tree_entries(entries: Iterable[ManifestEntry], directory_name: str) -> list[tuple[str, ManifestEntry]]:
+    """
+    Selects the manifest entries of an associated directory.
+
+    Args:
+        entries (Iterable[ManifestEntry]): The entries of a snapshot manifest.
+        directory_name (str): The name of the directory inside the snapshot (SnapDirAssociation.directory_name).
+
+    Returns:
+        list[tuple[str, ManifestEntry]]: The entries with their path relative to the directory.
+    """
+    prefix = directory_name + "/"
+    return [(entry.rel_path[len(prefix):], entry) for entry in entries if entry.rel_path.startswith(prefix)]
+
+
+def materialize_tree(store: BlobStore, entries: Iterable[ManifestEntry], directory_name: str, destination: Path) -> int:
+    """
+    Writes the files of an associated directory of a snapshot stored in blobs.
+    Files that cannot be written are logged and skipped.
+
+    Args:
+        store (BlobStore): The blob store of the catalogue.
+        entries (Iterable[ManifestEntry]): The entries of the snapshot manifest.
+        directory_name (str): The name of the directory inside the snapshot.
+        destination (Path): The directory receiving the files. It must exist.
+
+    Returns:
+        int: The number of bytes written.
+    """
+    written = 0
+    created: set[Path] = {destination}
+    for rel_path, entry in get_tree_entries(entries, directory_name):
+        target = destination.joinpath(*rel_path.split("/"))
+        try:
+            if target.parent not in created:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                created.add(target.parent)
+            store.copy_to(entry.digest, target, entry.mtime_ns)
+            written += entry.size
+        except OSError as e:
+            logger.error(f"Could not copy item {target} during install: {e}")
+    return written
+
+
+def get_tree_directories(root: Path) -> list[str]:
+    """
+    Lists the subdirectories of a tree, including the empty ones.
+
+    Args:
+        root (Path): The root of the tree.
+
+    Returns:
+        list[str]: The paths of the subdirectories relative to the root, with '/' separators.
+    """
+    root_path = str(root)
+    return [os.path.relpath(entry.path, root_path).replace(os.sep, "/") for entry in walk(root, include_dirs=True) if entry.is_dir]
+
+
+def sync_tree(
+        entries: list[tuple[str, ManifestEntry]],
+        destination: Path,
+        get_source: Callable[[str, ManifestEntry], str],
+        directories: Iterable[str] = (),
+        max_workers: int = DEFAULT_WALK_WORKERS,
+) -> InstallStats:
+    """
+    Makes an installed directory match the files of a snapshot, writing only what differs.
+
+    An installed file is kept if its size and modification time match the manifest,
+    or if its size matches and its content hash is the one of the manifest (its
+    modification time is then corrected, so the next installation skips the hash).
+    Missing and different files are copied, files and directories the snapshot does
+    not contain are deleted. Files that cannot be written or deleted are logged and
+    skipped, as in a clean installation.
+
+    Args:
+        entries (list[tuple[str, ManifestEntry]]): The files of the directory, with their path
+                                                   relative to it (see get_tree_entries).
+        destination (Path): The installed directory. It is created if missing.
+        get_source (Callable[[str, ManifestEntry], str]): Returns the file to copy for an entry.
+        directories (Iterable[str]): Relative paths of directories to keep even if they
+                                     contain no file (e.g. the empty directories of the snapshot).
+        max_workers (int): The number of threads comparing and copying the files.
+
+    Returns:
+        InstallStats: What was copied, deleted and left in place.
+    """
+    destination.mkdir(parents=True, exist_ok=True)
+    root = str(destination)
+    installed_files: dict[str, tuple[int, int]] = {}
+    installed_dirs: set[str] = set()
+    for entry in walk(destination, include_dirs=True):
+        rel_path = os.path.relpath(entry.path, root).replace(os.sep, "/")
+        if entry.is_dir:
+            installed_dirs.add(rel_path)
+        else:
+            installed_files[rel_path] = (entry.size, entry.mtime_ns)
+
+    wanted_files = {rel_path for rel_path, _ in entries}
+    wanted_dirs = set(directories)
+    for rel_path in wanted_files:
+        parent = rel_path.rpartition("/")[0]
+        while parent and parent not in wanted_dirs:
+            wanted_dirs.add(parent)
+            parent = parent.rpartition("/")[0]
+
+    stats = InstallStats()
+    for rel_path in installed_files.keys() - wanted_files:
+        try:
+            destination.joinpath(*rel_path.split("/")).unlink()
+            stats.deleted_files += 1
+        except OSError as e:
+            logger.error(f"Could not remove item {rel_path} from {destination} during install: {e}")
+            stats.failed_files += 1
+    # Children sort after their parent, so in reverse order they are removed first.
+    for rel_path in sorted(installed_dirs - wanted_dirs, reverse=True):
+        try:
+            shutil.rmtree(destination.joinpath(*rel_path.split("/")))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Could not remove directory {rel_path} from {destination} during install: {e}")
+    for rel_path in sorted(wanted_dirs - installed_dirs):
+        destination.joinpath(*rel_path.split("/")).mkdir(parents=True, exist_ok=True)
+
+    def run_job(job: tuple[str, ManifestEntry]) -> bool | None:
+        rel_path, entry = job
+        target = destination.joinpath(*rel_path.split("/"))
+        try:
+            installed = installed_files.get(rel_path)
+            if installed is not None and installed[0] == entry.size:
+                if installed[1] == entry.mtime_ns:
+                    return False
+                if hash_file(str(target)) == entry.digest:
+                    os.utime(target, ns=(entry.mtime_ns, entry.mtime_ns))
+                    return False
+            shutil.copyfile(get_source(rel_path, entry), target)
+            os.utime(target, ns=(entry.mtime_ns, entry.mtime_ns))
+            return True
+        except OSError as e:
+            logger.error(f"Could not copy item {target} during install: {e}")
+            return None
+
+    if max_workers > 1 and len(entries) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="install") as executor:
+            outcomes = list(executor.map(run_job, entries))
+    else:
+        outcomes = [run_job(job) for job in entries]
+    for (_, entry), copied in zip(entries, outcomes):
+        if copied is None:
+            stats.failed_files += 1
+        elif copied:
+            stats.copied_files += 1
+            stats.copied_size += entry.size
+        else:
+            stats.unchanged_files += 1
+            stats.unchanged_size += entry.size
+    return stats
+
+
+def get_previous_tree_path(target: Path) -> Path:
+    """
+    Returns the directory holding the previous version of an installed directory:
+    the tree replaced by the last staged installation, which rollback_install puts back.
+    """
+    return target.with_name(f".{target.name}{PREVIOUS_TREE_SUFFIX}")
+
+
+def get_staging_tree_path(target: Path) -> Path:
+    """
+    Returns the directory where staged installations write the new version of an
+    installed directory, next to it so on the same volume, before exchanging it
+    with the target. Between installations it holds an older version, so the next
+    installation only copies what changed (see keep_replaced_tree).
+    """
+    return target.with_name(f".{target.name}{STAGING_TREE_SUFFIX}")
+
+
+def _get_swap_path(other: Path) -> Path:
+    # Where a tree waits on its way to `other`: one per destination, so an interrupted
+    # installation (towards the staging tree) and an interrupted rollback (towards the
+    # previous tree) are told apart.
+    return other.with_name(f"{other.name}{SWAP_TREE_SUFFIX}")
+
+
+def _get_recycled_path(target: Path) -> Path:
+    return target.with_name(f".{target.name}{RECYCLED_TREE_SUFFIX}")
+
+
+def recover_swap(target: Path, other: Path):
+    """
+    Completes or undoes an exchange of trees interrupted by a crash (see swap_trees).
+
+    Args:
+        target (Path): The installed directory.
+        other (Path): The directory it was being exchanged with.
+    """
+    swap_path = _get_swap_path(other)
+    if not swap_path.is_dir():
+        return
+    if not target.exists():
+        logger.warning(f"Restoring '{target}' after an interrupted installation")
+        swap_path.rename(target)
+    elif not other.exists():
+        logger.warning(f"Completing the interrupted installation of '{target}'")
+        swap_path.rename(other)
+    else:
+        logger.error(f"Leftover directory '{swap_path}' of an interrupted installation, it must be removed by hand")
+
+
+def recover_staged_install(target: Path):
+    """
+    Completes or undoes the staged installation or rollback of a directory interrupted
+    by a crash, so its staging and previous trees are where they are expected.
+
+    Args:
+        target (Path): The installed directory.
+    """
+    staging_path = get_staging_tree_path(target)
+    previous_path = get_previous_tree_path(target)
+    recover_swap(target, staging_path)
+    recover_swap(target, previous_path)
+    recycled_path = _get_recycled_path(target)
+    if recycled_path.is_dir():
+        logger.warning(f"Completing the interrupted installation of '{target}'")
+        if not previous_path.exists() and staging_path.is_dir():
+            staging_path.rename(previous_path)
+        if not staging_path.exists():
+            recycled_path.rename(staging_path)
+        else:
+            shutil.rmtree(recycled_path)
+
+
+def keep_replaced_tree(target: Path):
+    """
+    Makes the tree replaced by a staged installation, left in the staging directory
+    by swap_trees, the previous tree of the target. The old previous tree becomes the
+    staging tree of the next installation.
+
+    Args:
+        target (Path): The installed directory.
+
+    Raises:
+        OSError: If a directory cannot be renamed; recover_staged_install completes the exchange.
+    """
+    staging_path = get_staging_tree_path(target)
+    previous_path = get_previous_tree_path(target)
+    if not previous_path.exists():
+        staging_path.rename(previous_path)
+        return
+    recycled_path = _get_recycled_path(target)
+    previous_path.rename(recycled_path)
+    staging_path.rename(previous_path)
+    recycled_path.rename(staging_path)
+
+
+def _swap_tree(target: Path, other: Path):
+    swap_path = _get_swap_path(other)
+    has_target = target.exists()
+    if has_target:
+        target.rename(swap_path)
+    try:
+        other.rename(target)
+    except OSError:
+        if has_target:
+            swap_path.rename(target)
+        raise
+    if has_target:
+        swap_path.rename(other)
+
+
+def swap_trees(pairs: list[tuple[Path, Path]]):
+    """
+    Exchanges every installed directory with another tree: its staging tree to
+    install, its previous tree to roll back.
+
+    Every exchange is made of directory renames, so it takes the same short time
+    whatever the size of the trees. Either all the directories are exchanged or none:
+    if a rename fails (e.g. a file of the target is open in another program), the
+    exchanges already done are reverted.
+
+    Args:
+        pairs (list[tuple[Path, Path]]): The installed directories, with the tree each one
+                                         is exchanged with. The trees must exist.
+
+    Raises:
+        OSError: If a directory cannot be exchanged; the directories are then unchanged.
+    """
+    swapped: list[tuple[Path, Path]] = []
+    try:
+        for target, other in pairs:
+            _swap_tree(target, other)
+            swapped.append((target, other))
+    except OSError as e:
+        for done, done_other in reversed(swapped):
+            try:
+                _swap_tree(done, done_other)
+            except OSError as revert_error:
+                logger.error(f"Unable to restore '{done}' after a failed installation: {revert_error}")
+        raise OSError(f"Unable to replace '{target}', the installed directories were not changed: {e}") from e
+
+
+def grant_everyone_full_control(path: Path):
+    """
+    Gives the 'Everyone' group full control over a directory, inherited by its content.
+    Does nothing outside Windows; errors (including a missing pywin32) are logged.
+
+    Args:
+        path (Path): The directory.
+    """
+    if sys.platform != "win32":
+        return
+    try:
+        import pywintypes
+        import win32security
+        import ntsecuritycon as con
+    except ImportError:
+        logger.error("pywin32 not installed, cannot set file permissions.")
+        return
+    try:
+        logger.info(f"Setting full control permissions for Everyone on '{path}'")
+        everyone, _, _ = win32security.LookupAccountName("", "Everyone")
+        sd = win32security.GetFileSecurity(str(path), win32security.DACL_SECURITY_INFORMATION)
+        dacl = sd.GetSecurityDescriptorDacl()
+        dacl.AddAccessAllowedAceEx(
+            win32security.ACL_REVISION,
+            con.OBJECT_INHERIT_ACE | con.CONTAINER_INHERIT_ACE,
+            con.GENERIC_ALL,
+            everyone
+        )
+        sd.SetSecurityDescriptorDacl(1, dacl, 0)
+        win32security.SetFileSecurity(str(path), win32security.DACL_SECURITY_INFORMATION, sd)
+    except (OSError, pywintypes.error) as e:
+        logger.error(f"Failed to set permissions on '{path}': {e}")
@@ -0,0 +1,306 @@
+import hashlib
+import struct
+import zlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple
+
+from loguru import logger
+
+from atomdev.core.blob_store import BlobStore
+from atomdev.core.search_index import to_le_bytes, from_le_bytes
+from atomdev.core.walker import DEFAULT_WALK_WORKERS
+
+
+MANIFEST_FILE_NAME = ".atomdev-manifest"
+MANIFEST_MAGIC = b"ADMF"
+MANIFEST_VERSION = 1
+HASH_SIZE = 16
+HASH_READ_SIZE = 1024 * 1024
+
+_HEADER = struct.Struct("<4sH")
+_COUNTS = struct.Struct("<II")
+
+
+def get_manifest_path(snapshot_path: Path) -> Path:
+    """Returns the path of the file manifest stored inside a snapshot directory."""
+    return snapshot_path.joinpath(MANIFEST_FILE_NAME)
+
+
+def hash_file(path: str) -> bytes:
+    """
+    Computes the content hash stored in the manifests (a 128 bit BLAKE2b digest).
+
+    Args:
+        path (str): The file to hash.
+
+    Returns:
+        bytes: The HASH_SIZE bytes of the digest.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    digest = hashlib.blake2b(digest_size=HASH_SIZE)
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_READ_SIZE):
+            digest.update(chunk)
+    return digest.digest()
+
+
+class ManifestEntry(NamedTuple):
+    """
+    A file recorded in a snapshot manifest.
+
+    Attributes:
+        rel_path: The path of the file relative to the snapshot directory, with '/' separators.
+        size: The size of the file in bytes.
+        mtime_ns: The modification time of the file in nanoseconds.
+        digest: The content hash of the file (see hash_file).
+    """
+    rel_path: str
+    size: int
+    mtime_ns: int
+    digest: bytes
+
+
+@dataclass
+class ManifestDiff:
+    """
+    The differences between two manifests, as relative paths.
+
+    Attributes:
+        added: The files only present in the newer manifest.
+        removed: The files only present in the older manifest.
+        modified: The files present in both whose content hash differs.
+    """
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    modified: list[str] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        """Returns True if the two manifests describe the same content."""
+        return not (self.added or self.removed or self.modified)
+
+
+class SnapshotManifest:
+    """
+    The list of the files stored in a snapshot, with their size, modification time
+    and content hash.
+
+    The manifest is written when the files of the snapshot are written into the
+    catalogue, so sizes and differences can be read from it without walking the
+    snapshot directory. The data is stored by column (one array per attribute),
+    sorted by relative path.
+    """
+
+    def __init__(self, paths: list[str], sizes: array, mtimes: array, digests: bytes):
+        self.paths = paths
+        self.sizes = sizes
+        self.mtimes = mtimes
+        self.digests = digests
+        self._path_to_id = {path: i for i, path in enumerate(paths)}
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __iter__(self) -> Iterator[ManifestEntry]:
+        for file_id in range(len(self.paths)):
+            yield self._get_entry(file_id)
+
+    def _get_entry(self, file_id: int) -> ManifestEntry:
+        digest = self.digests[file_id * HASH_SIZE:(file_id + 1) * HASH_SIZE]
+        return ManifestEntry(self.paths[file_id], self.sizes[file_id], self.mtimes[file_id], digest)
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[ManifestEntry]) -> 'SnapshotManifest':
+        """
+        Creates a manifest from a set of entries, e.g. taken from other manifests.
+
+        Args:
+            entries (Iterable[ManifestEntry]): The entries, in any order.
+
+        Returns:
+            SnapshotManifest: The manifest, sorted by relative path.
+        """
+        entries = sorted(entries, key=lambda e: e.rel_path)
+        return cls(
+            [e.rel_path for e in entries],
+            array("Q", (e.size for e in entries)),
+            array("q", (e.mtime_ns for e in entries)),
+            b"".join(e.digest for e in entries),
+        )
+
+    def get(self, rel_path: str) -> ManifestEntry | None:
+        """
+        Returns the entry of a file.
+
+        Args:
+            rel_path (str): The path of the file relative to the snapshot directory.
+
+        Returns:
+            ManifestEntry | None: The entry, or None if the file is not in the manifest.
+        """
+        file_id = self._path_to_id.get(rel_path)
+        return self._get_entry(file_id) if file_id is not None else None
+
+    @property
+    def total_size(self) -> int:
+        """The total size of the files, in bytes."""
+        return sum(self.sizes)
+
+    def get_digests(self) -> set[bytes]:
+        """Returns the distinct content hashes of the files."""
+        return {self.digests[i:i + HASH_SIZE] for i in range(0, len(self.digests), HASH_SIZE)}
+
+    def get_directory_sizes(self) -> dict[str, int]:
+        """
+        Returns the total size of the files of every associated directory.
+
+        Returns:
+            dict[str, int]: The sizes in bytes, by directory name inside the snapshot
+                            (SnapDirAssociation.directory_name).
+        """
+        sizes: dict[str, int] = {}
+        for path, size in zip(self.paths, self.sizes):
+            name = path.split("/", 1)[0]
+            sizes[name] = sizes.get(name, 0) + size
+        return sizes
+
+    def diff(self, other: 'SnapshotManifest') -> ManifestDiff:
+        """
+        Compares this manifest with a newer one.
+
+        Args:
+            other (SnapshotManifest): The newer manifest.
+
+        Returns:
+            ManifestDiff: The files added, removed and modified going from this manifest to the other one.
+        """
+        result = ManifestDiff()
+        for file_id, path in enumerate(self.paths):
+            other_id = other._path_to_id.get(path)
+            if other_id is None:
+                result.removed.append(path)
+            elif self.digests[file_id * HASH_SIZE:(file_id + 1) * HASH_SIZE] != other.digests[other_id * HASH_SIZE:(other_id + 1) * HASH_SIZE]:
+                result.modified.append(path)
+        result.added = [path for path in other.paths if path not in self._path_to_id]
+        return result
+
+    def save(self, path: Path):
+        """
+        Writes the manifest to disk in its compressed binary format.
+
+        Args:
+            path (Path): The destination file.
+        """
+        path_blob = "\0".join(self.paths).encode("utf-8", errors="surrogateescape")
+        payload = bytearray(_COUNTS.pack(len(self.paths), len(path_blob)))
+        payload += path_blob
+        payload += to_le_bytes(self.sizes)
+        payload += to_le_bytes(self.mtimes)
+        payload += self.digests
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_bytes(_HEADER.pack(MANIFEST_MAGIC, MANIFEST_VERSION) + zlib.compress(bytes(payload), 6))
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'SnapshotManifest | None':
+        """
+        Reads a manifest from disk.
+
+        Args:
+            path (Path): The manifest file.
+
+        Returns:
+            SnapshotManifest | None: The manifest, or None if it is missing, corrupted
+                                     or written by an incompatible version.
+        """
+        try:
+            raw = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Unable to read file manifest {path}: {e}")
+            return None
+        try:
+            magic, version = _HEADER.unpack_from(raw)
+            if magic != MANIFEST_MAGIC or version != MANIFEST_VERSION:
+                return None
+            payload = zlib.decompress(raw[_HEADER.size:])
+            file_count, path_blob_len = _COUNTS.unpack_from(payload)
+            pos = _COUNTS.size
+            path_blob = payload[pos:pos + path_blob_len].decode("utf-8", errors="surrogateescape")
+            pos += path_blob_len
+            paths = path_blob.split("\0") if file_count else []
+            sizes, pos = from_le_bytes("Q", payload, pos, file_count)
+            mtimes, pos = from_le_bytes("q", payload, pos, file_count)
+            digests = payload[pos:pos + file_count * HASH_SIZE]
+            if len(paths) != file_count or len(digests) != file_count * HASH_SIZE:
+                return None
+            return cls(paths, sizes, mtimes, digests)
+        except (struct.error, zlib.error, ValueError) as e:
+            logger.warning(f"File manifest {path} is corrupted: {e}")
+            return None
+
+
+def build_manifest(
+        files: Iterable,
+        previous: SnapshotManifest | None = None,
+        blob_store: BlobStore | None = None,
+        max_workers: int = DEFAULT_WALK_WORKERS,
+) -> SnapshotManifest:
+    """
+    Builds the manifest of a set of files, hashing their content.
+
+    Files whose size and modification time match the previous manifest keep their
+    hash without being read again. The others are hashed by a pool of threads
+    (hashlib releases the GIL while hashing). Files that cannot be read are
+    logged and left out.
+
+    Args:
+        files (Iterable): The files, with path, rel_path, size and mtime_ns attributes.
+        previous (SnapshotManifest | None): The manifest to take the unchanged hashes from.
+        blob_store (BlobStore | None): If given, the content of every file is also stored
+                                       in it (only the blobs not stored yet are written).
+        max_workers (int): The number of threads hashing the files.
+
+    Returns:
+        SnapshotManifest: The manifest of the files, sorted by relative path.
+    """
+    files = sorted(files, key=lambda f: f.rel_path)
+    digests: list[bytes | None] = [None] * len(files)
+    for i, file in enumerate(files):
+        old = previous.get(file.rel_path) if previous is not None else None
+        if old is not None and old.size == file.size and old.mtime_ns == file.mtime_ns:
+            digests[i] = old.digest
+    jobs = [i for i, digest in enumerate(digests) if digest is None or blob_store is not None]
+
+    def run_job(i: int) -> tuple[bytes | None, bool]:
+        file = files[i]
+        try:
+            digest = digests[i] if digests[i] is not None else hash_file(file.path)
+            written = blob_store is not None and blob_store.add_file(file.path, digest)
+            return digest, written
+        except OSError as e:
+            logger.warning(f"Unable to read file {file.path} for the manifest: {e}")
+            return None, False
+
+    if max_workers > 1 and len(jobs) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="manifest") as executor:
+            outcomes = list(executor.map(run_job, jobs))
+    else:
+        outcomes = [run_job(i) for i in jobs]
+    for i, (digest, _) in zip(jobs, outcomes):
+        digests[i] = digest
+    if blob_store is not None:
+        logger.debug(f"{sum(written for _, written in outcomes)} new blobs written for {len(files)} files.")
+
+    kept = [i for i, digest in enumerate(digests) if digest is not None]
+    return SnapshotManifest(
+        [files[i].rel_path for i in kept],
+        array("Q", (files[i].size for i in kept)),
+        array("q", (files[i].mtime_ns for i in kept)),
+        b"".join(digests[i] for i in kept),
+    )
@@ -0,0 +1,38 @@
+import time
+from typing import Callable
+
+
+DEFAULT_PROGRESS_INTERVAL = 0.1
+
+ProgressCallback = Callable[[str, int, int], None]
+
+
+class ProgressThrottle:
+    """
+    Wraps a progress callback so that it is called at most once every `min_interval`
+    seconds (10 times a second by default).
+
+    Scanning thousands of small files reports progress far more often than a user can
+    see it, and every report running on a worker thread becomes a queued signal for
+    the GUI thread. Intermediate reports are dropped, the first and the last one
+    (current == total) always go through, so the final state is never lost.
+    """
+
+    def __init__(self, callback: ProgressCallback, min_interval: float = DEFAULT_PROGRESS_INTERVAL):
+        """
+        Initializes the ProgressThrottle.
+
+        Args:
+            callback (ProgressCallback): The callback receiving the item name, the total and the current count.
+            min_interval (float): The minimum time between two calls, in seconds.
+        """
+        self.callback = callback
+        self.min_interval = min_interval
+        self._last_call: float | None = None
+
+    def __call__(self, name: str, total: int, current: int):
+        now = time.monotonic()
+        if current < total and self._last_call is not None and now - self._last_call < self.min_interval:
+            return
+        self._last_call = now
+        self.callback(name, total, current)
@@ -0,0 +1,82 @@
+import re
+from dataclasses import dataclass, field
+from enum import Enum
+
+from pylizlib.core.os.snap import SnapshotSearchParams, QueryType, SearchTarget
+
+
+MULTI_TERM_SEPARATOR = ";"
+
+
+class SearchMode(Enum):
+    """
+    The query modes offered by the catalogue searcher: the pylizlib query types
+    plus the multi-term mode, which searches several plain terms at once.
+    """
+    TEXT = "text"
+    REGEX = "regex"
+    MULTI_TERM = "multi"
+
+    @property
+    def query_type(self) -> QueryType:
+        """The pylizlib QueryType used to run a search in this mode."""
+        return QueryType.TEXT if self == SearchMode.TEXT else QueryType.REGEX
+
+
+def parse_terms(text: str) -> list[str]:
+    """
+    Splits the text of a multi-term query into its terms.
+
+    Args:
+        text (str): The terms separated by MULTI_TERM_SEPARATOR.
+
+    Returns:
+        list[str]: The distinct non-empty terms, stripped and in their original order.
+    """
+    terms = [term.strip() for term in text.split(MULTI_TERM_SEPARATOR)]
+    return list(dict.fromkeys(term for term in terms if term))
+
+
+@dataclass
+class MultiTermSearchParams(SnapshotSearchParams):
+    """
+    Parameters of a multi-term search.
+
+    The query is a single alternation regex of all the terms, so every file is
+    scanned once whatever the number of terms; the terms matched by a line are
+    then reported separately, each result carrying its term as searched_text.
+
+    Attributes:
+        terms: The plain text terms to search.
+    """
+    terms: list[str] = field(default_factory=list)
+
+    @classmethod
+    def from_text(cls, text: str, search_target: SearchTarget, extensions: list[str]) -> 'MultiTermSearchParams':
+        """
+        Builds the parameters from the text typed in the search bar.
+
+        Args:
+            text (str): The terms separated by MULTI_TERM_SEPARATOR.
+            search_target (SearchTarget): The target of the search.
+            extensions (list[str]): The file extensions to filter by.
+
+        Returns:
+            MultiTermSearchParams: The parameters with the combined regex as query.
+        """
+        terms = parse_terms(text)
+        # Longer terms first, so the alternation prefers them when terms overlap.
+        query = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+        return cls(query=query, search_target=search_target, query_type=QueryType.REGEX, extensions=extensions, terms=terms)
+
+    def get_matched_terms(self, text: str) -> list[str]:
+        """
+        Returns the terms contained in a text already matched by the combined query.
+
+        Args:
+            text (str): A matching line or file name.
+
+        Returns:
+            list[str]: The terms found in the text, in the order they were given.
+        """
+        return [term for term in self.terms if term in text]
@@ -0,0 +1,278 @@
+import mmap
+import re
+from dataclasses import dataclass
+from itertools import accumulate
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+from pylizlib.core.os.snap import SnapshotSearchParams, SnapshotSearchResult, QueryType
+
+from atomdev.core.query import MultiTermSearchParams
+from atomdev.core.search_index import get_required_literals
+
+
+DEFAULT_SCAN_WINDOW_SIZE = 4 * 1024 * 1024
+BINARY_SNIFF_SIZE = 8192
+CONTEXT_READ_SIZE = 8192
+
+_LINE_BREAK_RE = re.compile(rb"\r\n|\r|\n")
+# Line breaks of str.splitlines that files read in text mode do not break on.
+_OTHER_LINE_BREAKS = ("\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+
+
+@dataclass
+class ContentSearchResult(SnapshotSearchResult):
+    """
+    A SnapshotSearchResult of a content search that also records where the matching
+    line starts in the file, so its text and context can be read again with a seek.
+
+    Attributes:
+        byte_offset: The offset of the first byte of the matching line.
+        source_path: The file the content was read from, when it is not file_path
+                     (the blob of a snapshot stored in the blob store).
+    """
+    byte_offset: int | None = None
+    source_path: Path | None = None
+
+    @property
+    def read_path(self) -> Path:
+        """The file holding the content of the result."""
+        return self.source_path if self.source_path is not None else self.file_path
+
+
+def is_binary(head: bytes) -> bool:
+    """
+    Sniffs the beginning of a file to decide whether it is binary.
+
+    Args:
+        head (bytes): The first bytes of the file.
+
+    Returns:
+        bool: True if the data contains a NUL byte, which never appears in text files.
+    """
+    return b"\0" in head
+
+
+def scan_file(
+        file_path: Path,
+        params: SnapshotSearchParams,
+        compiled_regex: Optional[re.Pattern],
+        snapshot_name: str,
+        data: bytes | None = None,
+        window_size: int = DEFAULT_SCAN_WINDOW_SIZE,
+) -> list[ContentSearchResult]:
+    """
+    Searches the query in the lines of a file.
+
+    The file is memory-mapped (unless its content is already available) and scanned
+    in windows of about `window_size` bytes. Every window ends on a line break, so
+    a line, and therefore a match, never spans two windows. Windows that cannot
+    contain the query are skipped without being decoded.
+
+    As in SnapshotSearcher, every line is matched with its line break, normalized
+    to a line feed (so a REGEX like "foo\\s" matches "foo" at the end of a line). Only
+    files with a NUL byte at the beginning are binary: bytes that are not valid
+    UTF-8 are decoded as U+FFFD, so they never hide the other lines of the file.
+
+    Args:
+        file_path (Path): The file to scan.
+        params (SnapshotSearchParams): The search parameters.
+        compiled_regex (re.Pattern, optional): The compiled query, for REGEX searches.
+        snapshot_name (str): The name of the snapshot, stored in the results.
+        data (bytes | None): The content of the file, if it was already read.
+        window_size (int): The size of the scan windows.
+
+    Returns:
+        list[ContentSearchResult]: The matching lines with their line number and byte offset.
+                                   A line matching several terms of a multi-term search gives
+                                   one result per term. Binary files give no results.
+    """
+    if data is not None:
+        return _scan_buffer(file_path, data, params, compiled_regex, snapshot_name, window_size)
+    try:
+        with open(file_path, "rb") as f:
+            if f.seek(0, 2) == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return _scan_buffer(file_path, mm, params, compiled_regex, snapshot_name, window_size)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Error reading file {file_path} during search: {e}")
+        return []
+
+
+def _scan_buffer(
+        file_path: Path,
+        buffer: bytes | mmap.mmap,
+        params: SnapshotSearchParams,
+        compiled_regex: Optional[re.Pattern],
+        snapshot_name: str,
+        window_size: int,
+) -> list[ContentSearchResult]:
+    if is_binary(buffer[:BINARY_SNIFF_SIZE]):
+        logger.debug(f"Skipping binary file during search: {file_path}")
+        return []
+    prefilter = _get_prefilter(params)
+    results: list[ContentSearchResult] = []
+    size = len(buffer)
+    start = 0
+    line_offset = 0
+    while start < size:
+        end = buffer.find(b"\n", min(start + window_size, size) - 1)
+        end = size if end == -1 else end + 1
+        window = buffer[start:end]
+        if prefilter is None or prefilter(window):
+            text = window.decode("utf-8", errors="replace")
+            results.extend(_search_in_lines(file_path, window, text, start, line_offset, params, compiled_regex, snapshot_name))
+        line_offset += _count_lines(window)
+        start = end
+    return results
+
+
+def _get_prefilter(params: SnapshotSearchParams):
+    """Returns a cheap test telling whether a raw window may contain a match, or None to scan every window."""
+    if isinstance(params, MultiTermSearchParams):
+        needles = [term.encode("utf-8") for term in params.terms]
+        return lambda window: any(needle in window for needle in needles)
+    if params.query_type == QueryType.TEXT:
+        needle = params.query.encode("utf-8")
+        return lambda window: needle in window
+    literals = get_required_literals(params)
+    if not literals:
+        return None
+    # The literals are matched ASCII-case-insensitively, as in the index, so inline
+    # flags like (?i) can never exclude a window that contains a match.
+    literals = [literal.lower() for literal in literals]
+
+    def may_match(window: bytes) -> bool:
+        lowered = window.lower()
+        return all(literal in lowered for literal in literals)
+    return may_match
+
+
+def _count_lines(window: bytes) -> int:
+    if b"\r" not in window:
+        return window.count(b"\n")
+    return len(_LINE_BREAK_RE.findall(window))
+
+
+def _split_lines(text: str, keep_breaks: bool) -> list[str]:
+    """Splits text with \\n line breaks (see _search_in_lines) like a file read in text mode, optionally keeping the breaks."""
+    if keep_breaks and not any(line_break in text for line_break in _OTHER_LINE_BREAKS):
+        return text.splitlines(keepends=True)
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+        if keep_breaks:
+            return [line + "\n" for line in lines]
+    elif keep_breaks:
+        return [line + "\n" for line in lines[:-1]] + [lines[-1]]
+    return lines
+
+
+def _find_text_lines(text: str, query: str) -> list[tuple[int, int]]:
+    """
+    Finds the lines of a text containing a query without line breaks, searching the
+    whole text at once, and returns their indexes with the offset where they start.
+    """
+    found = []
+    line = 0
+    counted = 0
+    pos = text.find(query)
+    while pos != -1:
+        line += text.count("\n", counted, pos)
+        found.append((line, text.rfind("\n", 0, pos) + 1))
+        line_end = text.find("\n", pos + len(query))
+        if line_end == -1:
+            break
+        counted = line_end + 1
+        line += 1
+        pos = text.find(query, counted)
+    return found
+
+
+def _search_in_lines(
+        file_path: Path,
+        window: bytes,
+        text: str,
+        window_offset: int,
+        line_offset: int,
+        params: SnapshotSearchParams,
+        compiled_regex: Optional[re.Pattern],
+        snapshot_name: str,
+) -> list[ContentSearchResult]:
+    results: list[ContentSearchResult] = []
+    # Without multi-byte characters and \r the offsets in the text are the offsets in the window.
+    same_offsets = window.isascii() and b"\r" not in window
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    line_starts: list[int] | None = None
+    if params.query_type == QueryType.TEXT and "\n" not in params.query:
+        lines = _split_lines(text, False)
+        found = _find_text_lines(text, params.query)
+        matched = [i for i, _ in found]
+        if same_offsets:
+            line_starts = dict(found)
+    else:
+        # The query may match the line break, so it is kept at the end of the lines.
+        lines = _split_lines(text, True)
+        if params.query_type == QueryType.TEXT:
+            matched = [i for i, line in enumerate(lines) if params.query in line]
+        elif compiled_regex is not None:
+            search = compiled_regex.search
+            matched = [i for i, line in enumerate(lines) if search(line)]
+        else:
+            matched = []
+        if same_offsets and matched:
+            line_starts = [0, *accumulate(map(len, lines))]
+    if not matched:
+        return results
+    if line_starts is None:
+        # bytes.splitlines breaks on the same \r\n, \r and \n as the decoded lines above.
+        line_starts = [0, *accumulate(map(len, window.splitlines(keepends=True)))]
+    for i in matched:
+        line = lines[i]
+        terms = params.get_matched_terms(line) if isinstance(params, MultiTermSearchParams) else [params.query]
+        for term in terms:
+            results.append(ContentSearchResult(
+                file_path=file_path,
+                searched_text=term,
+                line_number=line_offset + i + 1,
+                line_content=line.strip(),
+                snapshot_name=snapshot_name,
+                byte_offset=window_offset + line_starts[i],
+            ))
+    return results
+
+
+def read_line_context(file_path: Path, byte_offset: int, before: int = 2, after: int = 2) -> list[tuple[int, str]]:
+    """
+    Reads a line of a file and the lines around it, seeking to its offset instead
+    of reading the whole file.
+
+    Args:
+        file_path (Path): The file to read.
+        byte_offset (int): The offset of the first byte of the line.
+        before (int): The number of lines to read before it.
+        after (int): The number of lines to read after it.
+
+    Returns:
+        list[tuple[int, str]]: The lines with their distance from the requested one
+                               (negative before it, 0 for the line itself). Empty if
+                               the file cannot be read.
+    """
+    try:
+        with open(file_path, "rb") as f:
+            start = max(0, byte_offset - CONTEXT_READ_SIZE)
+            f.seek(start)
+            head = f.read(byte_offset - start).splitlines()
+            if start > 0 and head:
+                # The first line read may be cut: keep it only if it is not needed.
+                head = head[1:]
+            tail = f.read(CONTEXT_READ_SIZE).splitlines()
+    except OSError as e:
+        logger.warning(f"Unable to read the context of {file_path}: {e}")
+        return []
+    head = head[-before:] if before > 0 else []
+    lines = [(i - len(head), line) for i, line in enumerate(head)]
+    lines += [(i, line) for i, line in enumerate(tail[:after + 1])]
+    return [(distance, line.decode("utf-8", errors="replace")) for distance, line in lines]
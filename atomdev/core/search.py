@@ -0,0 +1,527 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import Executor, Future, as_completed
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from loguru import logger
+from pylizlib.core.os.snap import Snapshot, SnapshotCatalogue, SnapshotSearcher, SnapshotSearchParams, \
+    SnapshotSearchResult, SnapshotProgressCallback, SnapshotUtils, SearchTarget, QueryType
+
+from atomdev.core.blob_store import BlobStore, get_blob_store_path, is_blob_snapshot
+from atomdev.core.manifest import SnapshotManifest, get_manifest_path
+from atomdev.core.query import MultiTermSearchParams
+from atomdev.core.scanner import scan_file, ContentSearchResult
+from atomdev.core.search_cache import SearchResultCache, get_params_key, get_snapshot_fingerprint
+from atomdev.core.search_index import SnapshotContentIndex, SnapshotContentIndexBuilder, get_index_path, \
+    get_required_literals, get_trigram_ids, DEFAULT_MAX_INDEXED_FILE_SIZE
+from atomdev.core.walker import walk
+
+
+@dataclass
+class SnapshotSearchStats:
+    """
+    Counters describing how a content search used the snapshot index.
+
+    Attributes:
+        files_total: The number of files matching the search filters.
+        files_scanned: The number of files actually opened and scanned.
+        index_hits: The number of files excluded by the index without being opened.
+        index_used: Whether a valid index was available for the snapshot.
+        files_skipped: The number of files not scanned because larger than the size limit.
+        cache_hits: The number of snapshots whose results were taken from the result cache.
+    """
+    files_total: int = 0
+    files_scanned: int = 0
+    index_hits: int = 0
+    index_used: bool = False
+    files_skipped: int = 0
+    cache_hits: int = 0
+
+    def add(self, other: 'SnapshotSearchStats'):
+        """Adds the counters of another search to this one."""
+        self.files_total += other.files_total
+        self.files_scanned += other.files_scanned
+        self.index_hits += other.index_hits
+        self.files_skipped += other.files_skipped
+        self.cache_hits += other.cache_hits
+        self.index_used = self.index_used or other.index_used
+
+
+DEFAULT_CHUNK_MAX_FILES = 64
+DEFAULT_CHUNK_MAX_BYTES = 8 * 1024 * 1024
+DEFAULT_BATCH_MAX_RESULTS = 500
+DEFAULT_BATCH_MAX_INTERVAL = 0.25
+
+SearchResultsCallback = Callable[[list[SnapshotSearchResult]], None]
+
+
+@dataclass
+class _SnapshotFile:
+    path: str
+    rel_path: str
+    size: int
+    mtime_ns: int
+    blob_path: str | None = None
+
+    @property
+    def suffix(self) -> str:
+        return os.path.splitext(self.path)[1]
+
+    @property
+    def read_path(self) -> str:
+        """The file holding the content: the blob for snapshots stored in blobs, the file itself otherwise."""
+        return self.blob_path if self.blob_path is not None else self.path
+
+
+def iter_tree_files(root: Path, rel_prefix: str) -> list[_SnapshotFile]:
+    """
+    Lists the files of a directory tree as files of a snapshot, sorted by relative path.
+
+    Args:
+        root (Path): The root of the tree.
+        rel_prefix (str): The directory the tree gets inside the snapshot (SnapDirAssociation.directory_name).
+
+    Returns:
+        list[_SnapshotFile]: The files, with their path relative to the snapshot directory.
+    """
+    prefix_len = len(os.path.join(root, ""))
+    files = [
+        _SnapshotFile(entry.path, rel_prefix + "/" + entry.path[prefix_len:].replace(os.sep, "/"), entry.size, entry.mtime_ns)
+        for entry in walk(root)
+    ]
+    files.sort(key=lambda file: file.rel_path)
+    return files
+
+
+def iter_snapshot_files(snapshot: Snapshot, snapshot_path: Path) -> Iterator[_SnapshotFile]:
+    """
+    Yields every file stored in the associated directories of a snapshot, sorted by
+    relative path so that results do not depend on the order of the parallel walk.
+
+    For snapshots stored in the blob store of the catalogue the files are read from
+    the manifest: their path is the one they would have inside the snapshot directory
+    and their content is read from the blob.
+
+    Args:
+        snapshot (Snapshot): The snapshot to walk.
+        snapshot_path (Path): The directory of the snapshot in the catalogue.
+
+    Yields:
+        _SnapshotFile: The file with its path relative to the snapshot directory and its stat data.
+    """
+    if is_blob_snapshot(snapshot_path):
+        manifest = SnapshotManifest.load(get_manifest_path(snapshot_path))
+        if manifest is None:
+            logger.warning(f"Manifest of snapshot {snapshot.id} missing or corrupted: its files cannot be listed.")
+            return
+        store = BlobStore(get_blob_store_path(snapshot_path.parent))
+        for entry in manifest:
+            path = os.path.join(snapshot_path, *entry.rel_path.split("/"))
+            yield _SnapshotFile(path, entry.rel_path, entry.size, entry.mtime_ns, str(store.get_blob_path(entry.digest)))
+        return
+    for dir_assoc in snapshot.directories:
+        yield from iter_tree_files(snapshot_path.joinpath(dir_assoc.directory_name), dir_assoc.directory_name)
+
+
+def refresh_snapshot_index(snapshot: Snapshot, snapshot_path: Path, files: list[_SnapshotFile] | None = None) -> SnapshotContentIndex:
+    """
+    Builds or updates the content index of a snapshot and saves it next to its metadata.
+
+    Files whose size and modification time match the previous index are not read again.
+
+    Args:
+        snapshot (Snapshot): The snapshot to index.
+        snapshot_path (Path): The directory of the snapshot in the catalogue.
+        files (list[_SnapshotFile] | None): The files of the snapshot, if already listed
+                                            by the caller. If None, the snapshot is walked.
+
+    Returns:
+        SnapshotContentIndex: The updated index.
+    """
+    index_path = get_index_path(snapshot_path)
+    old_index = SnapshotContentIndex.load(index_path)
+    old_grams: list[list[int]] | None = None
+    builder = SnapshotContentIndexBuilder()
+    if files is None:
+        files = list(iter_snapshot_files(snapshot, snapshot_path))
+    for file in files:
+        info = old_index.get_file_info(file.rel_path) if old_index is not None else None
+        if info is not None and info.is_fresh(file.size, file.mtime_ns):
+            if old_grams is None:
+                old_grams = old_index.get_file_grams()
+            grams = old_grams[info.file_id] if info.indexed else None
+            builder.add_file_grams(file.rel_path, file.size, file.mtime_ns, grams)
+        else:
+            builder.add_file(file.rel_path, file.size, file.mtime_ns, _read_for_index(file))
+    index = builder.build()
+    index.save(index_path)
+    logger.debug(f"Content index of snapshot {snapshot.id} updated ({len(index)} files).")
+    return index
+
+
+def _read_for_index(file: _SnapshotFile) -> bytes | None:
+    if file.size > DEFAULT_MAX_INDEXED_FILE_SIZE:
+        return None
+    try:
+        with open(file.read_path, "rb") as f:
+            return f.read()
+    except OSError as e:
+        logger.warning(f"Unable to index file {file.path}: {e}")
+        return None
+
+
+@dataclass
+class _FileJob:
+    """A file that has to be read, to be scanned for the query and/or to be (re)indexed."""
+    path: str
+    rel_path: str
+    size: int
+    mtime_ns: int
+    scan: bool
+    index: bool
+    read_path: str | None = None
+
+
+def scan_file_jobs(jobs: list[_FileJob], params: SnapshotSearchParams, snapshot_name: str) -> tuple[list[SnapshotSearchResult], dict[str, list[int] | None]]:
+    """
+    Processes a chunk of files, searching the query in the ones to scan and extracting
+    the trigrams of the ones to index.
+
+    Files to index are read whole (they are never larger than the index size limit),
+    the others are memory-mapped and scanned in windows by scan_file.
+
+    This is a module level function so it can run in the worker processes of a
+    ProcessPoolExecutor; it does not depend on any Qt object.
+
+    Args:
+        jobs (list[_FileJob]): The files to process.
+        params (SnapshotSearchParams): The search parameters.
+        snapshot_name (str): The name of the snapshot, stored in the results.
+
+    Returns:
+        tuple: The results found and the trigrams of the indexed files, keyed by relative path.
+    """
+    compiled_regex = _compile_query(params.query) if params.query_type == QueryType.REGEX else None
+    results: list[SnapshotSearchResult] = []
+    grams: dict[str, list[int] | None] = {}
+    for job in jobs:
+        file_path = Path(job.read_path if job.read_path is not None else job.path)
+        data = None
+        if job.index and job.size <= DEFAULT_MAX_INDEXED_FILE_SIZE:
+            try:
+                data = file_path.read_bytes()
+            except OSError as e:
+                logger.warning(f"Error reading file {file_path} during search: {e}")
+                continue
+            grams[job.rel_path] = get_trigram_ids(data)
+        elif job.index:
+            grams[job.rel_path] = None
+        if job.scan:
+            file_results = scan_file(file_path, params, compiled_regex, snapshot_name, data)
+            if job.read_path is not None:
+                file_results = [replace(res, file_path=Path(job.path), source_path=file_path) for res in file_results]
+            results.extend(file_results)
+    return results, grams
+
+
+def _get_index_candidates(index: SnapshotContentIndex, params: SnapshotSearchParams) -> set[int] | None:
+    """Returns the ids of the indexed files that may match the query, or None if the index cannot narrow it."""
+    if isinstance(params, MultiTermSearchParams):
+        # A file is a candidate if it may contain any of the terms.
+        literal_sets = [get_required_literals(SnapshotSearchParams(query=term, query_type=QueryType.TEXT)) for term in params.terms]
+        if not literal_sets or any(literals is None for literals in literal_sets):
+            return None
+        return set().union(*(index.get_candidates(literals) for literals in literal_sets))
+    literals = get_required_literals(params)
+    return index.get_candidates(literals) if literals else None
+
+
+@lru_cache(maxsize=32)
+def _compile_query(query: str) -> re.Pattern:
+    return re.compile(query)
+
+
+def _split_in_chunks(jobs: list[_FileJob], max_files: int, max_bytes: int) -> list[list[_FileJob]]:
+    chunks: list[list[_FileJob]] = []
+    current: list[_FileJob] = []
+    current_bytes = 0
+    for job in jobs:
+        if current and (len(current) >= max_files or current_bytes + job.size > max_bytes):
+            chunks.append(current)
+            current = []
+            current_bytes = 0
+        current.append(job)
+        current_bytes += job.size
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class _ResultsBatcher:
+    """Groups the results found while scanning and hands them to a callback in batches."""
+
+    def __init__(self, callback: SearchResultsCallback | None, max_results: int = DEFAULT_BATCH_MAX_RESULTS, max_interval: float = DEFAULT_BATCH_MAX_INTERVAL):
+        self.callback = callback
+        self.max_results = max_results
+        self.max_interval = max_interval
+        self._pending: list[SnapshotSearchResult] = []
+        self._last_flush = time.monotonic()
+
+    def add(self, results: list[SnapshotSearchResult]):
+        if self.callback is None or not results:
+            return
+        self._pending.extend(results)
+        if len(self._pending) >= self.max_results or time.monotonic() - self._last_flush >= self.max_interval:
+            self.flush()
+
+    def flush(self):
+        if self.callback is not None and self._pending:
+            pending, self._pending = self._pending, []
+            self.callback(pending)
+        self._last_flush = time.monotonic()
+
+
+class IndexedSnapshotSearcher(SnapshotSearcher):
+    """
+    A SnapshotSearcher that uses the per-snapshot trigram index to open only the
+    files that can contain the query.
+
+    Files missing from the index or changed after it was built are scanned in full,
+    and the index is refreshed with them at the end of the search. When an executor
+    is given, the files of the snapshot are split in chunks scanned in parallel.
+    """
+
+    def __init__(
+            self,
+            catalogue: SnapshotCatalogue,
+            update_index: bool = True,
+            executor: Executor | None = None,
+            chunk_max_files: int = DEFAULT_CHUNK_MAX_FILES,
+            chunk_max_bytes: int = DEFAULT_CHUNK_MAX_BYTES,
+            max_file_size: int | None = None,
+            cache: SearchResultCache | None = None,
+    ):
+        """
+        Initializes the IndexedSnapshotSearcher.
+
+        Args:
+            catalogue (SnapshotCatalogue): The SnapshotCatalogue to search in.
+            update_index (bool): Whether to save a refreshed index when the current one is missing or stale.
+            executor (Executor | None): The executor (usually a ProcessPoolExecutor) used to scan the
+                                        chunks in parallel. If None, files are scanned in the calling thread.
+            chunk_max_files (int): The maximum number of files in a chunk.
+            chunk_max_bytes (int): The maximum total size of the files in a chunk.
+            max_file_size (int | None): Files larger than this many bytes are not scanned. None disables the limit.
+            cache (SearchResultCache | None): The cache of the results of previous searches, used
+                                              while the snapshot content does not change.
+        """
+        super().__init__(catalogue)
+        self.update_index = update_index
+        self.executor = executor
+        self.chunk_max_files = chunk_max_files
+        self.chunk_max_bytes = chunk_max_bytes
+        self.max_file_size = max_file_size
+        self.cache = cache
+        self.last_stats = SnapshotSearchStats()
+        self._cancel_event = threading.Event()
+        self._futures: list[Future] = []
+        self._futures_lock = threading.Lock()
+
+    def cancel(self):
+        """Stops the current search, cancelling the chunks that have not started yet."""
+        self._cancel_event.set()
+        with self._futures_lock:
+            for future in self._futures:
+                future.cancel()
+
+    def is_cancelled(self) -> bool:
+        """Returns True if cancel() was called."""
+        return self._cancel_event.is_set()
+
+    def search(self, snapshot: Snapshot, params: SnapshotSearchParams, on_progress: Optional[SnapshotProgressCallback] = None, on_results: Optional[SearchResultsCallback] = None) -> list[SnapshotSearchResult]:
+        """
+        Performs a search in a single snapshot based on the provided parameters.
+
+        Args:
+            snapshot (Snapshot): The snapshot to search within.
+            params (SnapshotSearchParams): The search query and options.
+            on_progress (SnapshotProgressCallback, optional): Receives (filename, total_files, processed_files).
+            on_results (SearchResultsCallback, optional): Receives the results in batches while they are found,
+                                                          before the complete list is returned.
+
+        Returns:
+            list[SnapshotSearchResult]: The results matching the query.
+        """
+        self.last_stats = SnapshotSearchStats()
+        # The snapshot comes from the catalogue: resolving its folder directly avoids
+        # get_snap_directory_path, which reloads the whole catalogue on every call.
+        snapshot_path = SnapshotUtils.get_snapshot_path(snapshot.folder_name, self.catalogue.path_catalogue)
+
+        compiled_regex = None
+        if params.query_type == QueryType.REGEX:
+            try:
+                compiled_regex = re.compile(params.query)
+            except re.error as e:
+                logger.error(f"Invalid regex pattern provided: {e}")
+                return []
+
+        batcher = _ResultsBatcher(on_results)
+        files: list[_SnapshotFile] | None = None
+        cache_key: tuple[str, str] | None = None
+        if self.cache is not None and snapshot_path.is_dir():
+            files = list(iter_snapshot_files(snapshot, snapshot_path))
+            cache_key = (get_params_key(snapshot, params, self.max_file_size), get_snapshot_fingerprint(files))
+            cached = self.cache.get(*cache_key, snapshot_path)
+            if cached is not None:
+                self.last_stats.cache_hits = 1
+                batcher.add(cached)
+                batcher.flush()
+                return cached
+
+        if params.search_target == SearchTarget.FILE_NAME:
+            results = self._search_file_names(snapshot, snapshot_path, params, compiled_regex, on_progress, files)
+            if isinstance(params, MultiTermSearchParams):
+                results = [replace(res, searched_text=term) for res in results for term in params.get_matched_terms(res.file_path.name)]
+            batcher.add(results)
+        else:
+            results = self._search_content_indexed(snapshot, snapshot_path, params, on_progress, batcher, files)
+        batcher.flush()
+        if cache_key is not None and not self.is_cancelled():
+            self.cache.put(*cache_key, snapshot_path, snapshot.name, results)
+        return results
+
+    def _search_file_names(self, snapshot: Snapshot, snapshot_path: Path, params: SnapshotSearchParams, compiled_regex: Optional[re.Pattern], on_progress: Optional[SnapshotProgressCallback], files: list[_SnapshotFile] | None = None) -> list[SnapshotSearchResult]:
+        if not snapshot_path.is_dir():
+            logger.warning(f"Snapshot path '{snapshot_path}' for snapshot id '{snapshot.id}' does not exist or is not a directory.")
+            return []
+        if files is None:
+            files = list(iter_snapshot_files(snapshot, snapshot_path))
+        if params.extensions:
+            files = [file for file in files if file.suffix in params.extensions]
+        results: list[SnapshotSearchResult] = []
+        for i, file in enumerate(files):
+            if self.is_cancelled():
+                break
+            name = os.path.basename(file.path)
+            if on_progress:
+                on_progress(name, len(files), i + 1)
+            found = params.query in name if params.query_type == QueryType.TEXT else compiled_regex.search(name) is not None
+            if found and file.blob_path is not None:
+                results.append(ContentSearchResult(file_path=Path(file.path), searched_text=params.query, snapshot_name=snapshot.name, source_path=Path(file.blob_path)))
+            elif found:
+                results.append(SnapshotSearchResult(file_path=Path(file.path), searched_text=params.query, snapshot_name=snapshot.name))
+        return results
+
+    def _search_content_indexed(self, snapshot: Snapshot, snapshot_path: Path, params: SnapshotSearchParams, on_progress: Optional[SnapshotProgressCallback], batcher: _ResultsBatcher, files: list[_SnapshotFile] | None = None) -> list[SnapshotSearchResult]:
+        stats = self.last_stats
+        if not snapshot_path.is_dir():
+            logger.warning(f"Snapshot path '{snapshot_path}' for snapshot id '{snapshot.id}' does not exist or is not a directory.")
+            return []
+
+        index_path = get_index_path(snapshot_path)
+        index = SnapshotContentIndex.load(index_path)
+        candidates = _get_index_candidates(index, params) if index is not None else None
+        stats.index_used = index is not None
+
+        if files is None:
+            files = list(iter_snapshot_files(snapshot, snapshot_path))
+        jobs: list[_FileJob] = []
+        fresh_files: list[tuple[_SnapshotFile, int, bool]] = []
+        for file in files:
+            info = index.get_file_info(file.rel_path) if index is not None else None
+            fresh = info is not None and info.is_fresh(file.size, file.mtime_ns)
+            if fresh:
+                fresh_files.append((file, info.file_id, info.indexed))
+            is_searchable = not params.extensions or file.suffix in params.extensions
+            excluded = fresh and info.indexed and candidates is not None and info.file_id not in candidates
+            if is_searchable:
+                stats.files_total += 1
+                if excluded:
+                    stats.index_hits += 1
+                elif self.max_file_size is not None and file.size > self.max_file_size:
+                    stats.files_skipped += 1
+                    excluded = True
+            job = _FileJob(file.path, file.rel_path, file.size, file.mtime_ns, is_searchable and not excluded, self.update_index and not fresh, file.blob_path)
+            if job.scan or job.index:
+                jobs.append(job)
+        stats.files_scanned = sum(1 for job in jobs if job.scan)
+
+        if self.executor is not None and len(jobs) > 1:
+            results, grams = self._run_jobs_parallel(jobs, params, snapshot.name, on_progress, batcher)
+        else:
+            results, grams = self._run_jobs_sequential(jobs, params, snapshot.name, on_progress, batcher)
+
+        is_stale = index is None or len(fresh_files) != len(files) or len(index) != len(files)
+        if self.update_index and is_stale and not self.is_cancelled():
+            self._save_refreshed_index(index, fresh_files, jobs, grams, index_path)
+        return results
+
+    def _run_jobs_sequential(self, jobs: list[_FileJob], params: SnapshotSearchParams, snapshot_name: str, on_progress: Optional[SnapshotProgressCallback], batcher: _ResultsBatcher):
+        stats = self.last_stats
+        results: list[SnapshotSearchResult] = []
+        grams: dict[str, list[int] | None] = {}
+        processed = stats.index_hits + stats.files_skipped
+        for job in jobs:
+            if self.is_cancelled():
+                break
+            if job.scan:
+                processed += 1
+                if on_progress:
+                    on_progress(Path(job.path).name, stats.files_total, processed)
+            job_results, job_grams = scan_file_jobs([job], params, snapshot_name)
+            results.extend(job_results)
+            batcher.add(job_results)
+            grams.update(job_grams)
+        return results, grams
+
+    def _run_jobs_parallel(self, jobs: list[_FileJob], params: SnapshotSearchParams, snapshot_name: str, on_progress: Optional[SnapshotProgressCallback], batcher: _ResultsBatcher):
+        stats = self.last_stats
+        chunks = _split_in_chunks(jobs, self.chunk_max_files, self.chunk_max_bytes)
+        with self._futures_lock:
+            if self.is_cancelled():
+                return [], {}
+            future_to_chunk = {self.executor.submit(scan_file_jobs, chunk, params, snapshot_name): i for i, chunk in enumerate(chunks)}
+            self._futures = list(future_to_chunk)
+
+        chunk_results: list[list[SnapshotSearchResult]] = [[] for _ in chunks]
+        grams: dict[str, list[int] | None] = {}
+        processed = stats.index_hits + stats.files_skipped
+        try:
+            for future in as_completed(future_to_chunk):
+                if self.is_cancelled():
+                    break
+                chunk_id = future_to_chunk[future]
+                chunk_results[chunk_id], chunk_grams = future.result()
+                grams.update(chunk_grams)
+                batcher.add(chunk_results[chunk_id])
+                scanned = [job for job in chunks[chunk_id] if job.scan]
+                processed += len(scanned)
+                if on_progress and scanned:
+                    on_progress(Path(scanned[-1].path).name, stats.files_total, processed)
+        finally:
+            with self._futures_lock:
+                for future in self._futures:
+                    future.cancel()
+                self._futures = []
+        # Merge the chunks in file order so results do not depend on scheduling.
+        return [result for results in chunk_results for result in results], grams
+
+    @staticmethod
+    def _save_refreshed_index(old_index: SnapshotContentIndex | None, fresh_files: list[tuple[_SnapshotFile, int, bool]], jobs: list[_FileJob], grams: dict[str, list[int] | None], index_path: Path):
+        builder = SnapshotContentIndexBuilder()
+        if fresh_files:
+            old_grams = old_index.get_file_grams()
+            for file, file_id, indexed in fresh_files:
+                builder.add_file_grams(file.rel_path, file.size, file.mtime_ns, old_grams[file_id] if indexed else None)
+        for job in jobs:
+            if job.index and job.rel_path in grams:
+                builder.add_file_grams(job.rel_path, job.size, job.mtime_ns, grams[job.rel_path])
+        try:
+            builder.build().save(index_path)
+        except OSError as e:
+            logger.warning(f"Unable to save content index {index_path}: {e}")
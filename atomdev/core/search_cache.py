@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterable
+
+from loguru import logger
+from pylizlib.core.os.snap import Snapshot, SnapshotSearchParams, SnapshotSearchResult
+
+from atomdev.core.query import MultiTermSearchParams
+from atomdev.core.scanner import ContentSearchResult
+
+
+CACHE_FILE_SUFFIX = ".cache"
+CACHE_MAGIC = b"ADSC"
+CACHE_VERSION = 2
+DEFAULT_MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+_HEADER = struct.Struct("<4sH")
+
+
+def get_snapshot_fingerprint(files: Iterable) -> str:
+    """
+    Computes a fingerprint of the content of a snapshot from its file manifest.
+
+    Args:
+        files (Iterable): The files of the snapshot, with rel_path, size and mtime_ns attributes
+                          and, for snapshots stored in blobs, blob_path.
+
+    Returns:
+        str: A digest that changes whenever a file is added, removed or modified, or
+             when the snapshot is moved into the blob store.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for file in sorted(files, key=lambda f: f.rel_path):
+        blob_path = getattr(file, "blob_path", None) or ""
+        digest.update(f"{file.rel_path}\0{file.size}\0{file.mtime_ns}\0{blob_path}\n".encode("utf-8", errors="surrogateescape"))
+    return digest.hexdigest()
+
+
+def get_params_key(snapshot: Snapshot, params: SnapshotSearchParams, max_file_size: int | None) -> str:
+    """
+    Computes the key identifying a search of a snapshot, independently from its content.
+
+    Args:
+        snapshot (Snapshot): The searched snapshot.
+        params (SnapshotSearchParams): The search parameters.
+        max_file_size (int | None): The file size limit of the search, which changes its results.
+
+    Returns:
+        str: A digest of the snapshot id and of every parameter affecting the results.
+    """
+    data = {
+        "snapshot": snapshot.id,
+        "query": params.query,
+        "query_type": params.query_type.value,
+        "search_target": params.search_target.value,
+        "extensions": sorted(params.extensions),
+        "terms": params.terms if isinstance(params, MultiTermSearchParams) else None,
+        "max_file_size": max_file_size,
+    }
+    return hashlib.blake2b(json.dumps(data, sort_keys=True).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class SearchResultCache:
+    """
+    A persistent cache of the results of a search in a snapshot.
+
+    Every entry is a compressed file named after the search key and the fingerprint
+    of the snapshot content, so it is never returned after the snapshot changes.
+    When the total size of the entries exceeds the limit, the least recently used
+    ones (by file modification time, refreshed on every hit) are deleted.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_MAX_CACHE_BYTES):
+        """
+        Initializes the SearchResultCache.
+
+        Args:
+            cache_dir (Path): The directory holding the cache entries.
+            max_bytes (int): The maximum total size of the entries.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def get(self, params_key: str, fingerprint: str, snapshot_path: Path) -> list[SnapshotSearchResult] | None:
+        """
+        Returns the cached results of a search.
+
+        Args:
+            params_key (str): The key of the search, from get_params_key.
+            fingerprint (str): The current fingerprint of the snapshot.
+            snapshot_path (Path): The directory of the snapshot, used to rebuild the file paths.
+
+        Returns:
+            list[SnapshotSearchResult] | None: The results, or None if they are not cached.
+        """
+        path = self.__get_entry_path(params_key, fingerprint)
+        with self._lock:
+            try:
+                raw = path.read_bytes()
+                os.utime(path)
+            except FileNotFoundError:
+                return None
+            except OSError as e:
+                logger.warning(f"Unable to read search cache entry {path}: {e}")
+                return None
+        try:
+            magic, version = _HEADER.unpack_from(raw)
+            if magic != CACHE_MAGIC or version != CACHE_VERSION:
+                return None
+            entry = json.loads(zlib.decompress(raw[_HEADER.size:]))
+            return [self.__decode_result(item, entry["snapshot_name"], snapshot_path) for item in entry["results"]]
+        except (struct.error, zlib.error, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Search cache entry {path} is corrupted: {e}")
+            return None
+
+    def put(self, params_key: str, fingerprint: str, snapshot_path: Path, snapshot_name: str, results: list[SnapshotSearchResult]):
+        """
+        Stores the results of a search, replacing the entries of the same search
+        made on older contents of the snapshot, and evicts the least recently used
+        entries if the cache is over its size limit.
+
+        Args:
+            params_key (str): The key of the search, from get_params_key.
+            fingerprint (str): The fingerprint of the snapshot the results come from.
+            snapshot_path (Path): The directory of the snapshot; paths are stored relative to it.
+            snapshot_name (str): The name of the snapshot, stored in the results.
+            results (list[SnapshotSearchResult]): The results to store.
+        """
+        entry = {
+            "snapshot_name": snapshot_name,
+            "results": [self.__encode_result(res, snapshot_path) for res in results],
+        }
+        payload = _HEADER.pack(CACHE_MAGIC, CACHE_VERSION) + zlib.compress(json.dumps(entry).encode("utf-8"), 6)
+        if len(payload) > self.max_bytes:
+            return
+        path = self.__get_entry_path(params_key, fingerprint)
+        with self._lock:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                for old_path in self.cache_dir.glob(f"{params_key}-*{CACHE_FILE_SUFFIX}"):
+                    old_path.unlink(missing_ok=True)
+                tmp_path = path.with_name(path.name + ".tmp")
+                tmp_path.write_bytes(payload)
+                tmp_path.replace(path)
+                self.__evict()
+            except OSError as e:
+                logger.warning(f"Unable to write search cache entry {path}: {e}")
+
+    def clear(self):
+        """Deletes all the cache entries."""
+        with self._lock:
+            for path in self.cache_dir.glob(f"*{CACHE_FILE_SUFFIX}"):
+                path.unlink(missing_ok=True)
+
+    def __evict(self):
+        entries = []
+        for path in self.cache_dir.glob(f"*{CACHE_FILE_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def __get_entry_path(self, params_key: str, fingerprint: str) -> Path:
+        return self.cache_dir.joinpath(f"{params_key}-{fingerprint}{CACHE_FILE_SUFFIX}")
+
+    @staticmethod
+    def __encode_result(res: SnapshotSearchResult, snapshot_path: Path) -> list:
+        try:
+            file_path = res.file_path.relative_to(snapshot_path).as_posix()
+        except ValueError:
+            file_path = str(res.file_path)
+        source_path = getattr(res, "source_path", None)
+        source_path = str(source_path) if source_path is not None else None
+        return [file_path, res.searched_text, res.line_number, res.line_content, getattr(res, "byte_offset", None), source_path]
+
+    @staticmethod
+    def __decode_result(item: list, snapshot_name: str, snapshot_path: Path) -> SnapshotSearchResult:
+        file_path, searched_text, line_number, line_content, byte_offset, source_path = item
+        file_path = snapshot_path.joinpath(file_path)
+        if byte_offset is None and source_path is None:
+            return SnapshotSearchResult(file_path, searched_text, snapshot_name, line_number, line_content)
+        source_path = Path(source_path) if source_path is not None else None
+        return ContentSearchResult(file_path, searched_text, snapshot_name, line_number, line_content, byte_offset, source_path)
@@ -0,0 +1,355 @@
+import re
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from pathlib import Path
+from re import _parser as sre_parse
+
+from loguru import logger
+from pylizlib.core.os.snap import SnapshotSearchParams, QueryType
+
+
+INDEX_FILE_NAME = ".atomdev-index"
+INDEX_MAGIC = b"ADTX"
+INDEX_VERSION = 1
+DEFAULT_MAX_INDEXED_FILE_SIZE = 16 * 1024 * 1024
+
+_HEADER = struct.Struct("<4sH")
+_COUNTS = struct.Struct("<IIII")
+
+
+def get_index_path(snapshot_path: Path) -> Path:
+    """Returns the path of the content index stored inside a snapshot directory."""
+    return snapshot_path.joinpath(INDEX_FILE_NAME)
+
+
+def get_trigrams(data: bytes) -> set[bytes]:
+    """
+    Returns the distinct byte trigrams of the ASCII-lowercased data.
+
+    Args:
+        data (bytes): The raw content to split.
+
+    Returns:
+        set[bytes]: The set of 3-byte sequences found in the data.
+    """
+    data = data.lower()
+    return {data[i:i + 3] for i in range(len(data) - 2)}
+
+
+def get_trigram_ids(data: bytes) -> list[int]:
+    """
+    Returns the distinct trigrams of the data encoded as integers, as stored in the index.
+
+    Args:
+        data (bytes): The raw content to split.
+
+    Returns:
+        list[int]: The integer keys of the trigrams.
+    """
+    return [_gram_to_int(g) for g in get_trigrams(data)]
+
+
+def get_required_literals(params: SnapshotSearchParams) -> list[bytes] | None:
+    """
+    Extracts the literal byte sequences that every match of a query must contain.
+
+    For TEXT queries the whole query is required. For REGEX queries only the
+    contiguous literal runs at the top level of the pattern are used, so the
+    result is always a safe (possibly empty) subset of what a match contains.
+
+    Args:
+        params (SnapshotSearchParams): The search parameters.
+
+    Returns:
+        list[bytes] | None: The required literals of at least three bytes, or None
+                            if the query cannot be narrowed through the index.
+    """
+    if params.query_type == QueryType.TEXT:
+        literals = [params.query]
+    else:
+        literals = _get_regex_literals(params.query)
+    encoded = [lit.encode("utf-8") for lit in literals]
+    encoded = [lit for lit in encoded if len(lit) >= 3]
+    return encoded or None
+
+
+def _get_regex_literals(pattern: str) -> list[str]:
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return []
+    ignore_case = bool(parsed.state.flags & re.IGNORECASE)
+    runs: list[str] = []
+    current: list[str] = []
+    for op, arg in parsed:
+        if op is sre_parse.LITERAL:
+            char = chr(arg)
+            # bytes.lower() only folds ASCII, so a case-insensitive non-ASCII
+            # literal could match bytes that are not in the index.
+            if not (ignore_case and not char.isascii()):
+                current.append(char)
+                continue
+        if current:
+            runs.append("".join(current))
+            current = []
+    if current:
+        runs.append("".join(current))
+    return runs
+
+
+@dataclass
+class IndexedFileInfo:
+    """
+    Information stored in the index for a single file of a snapshot.
+
+    Attributes:
+        file_id: The position of the file inside the index.
+        size: The size of the file when it was indexed.
+        mtime_ns: The modification time of the file when it was indexed.
+        indexed: False if the file content was not indexed (e.g. too large).
+    """
+    file_id: int
+    size: int
+    mtime_ns: int
+    indexed: bool
+
+    def is_fresh(self, size: int, mtime_ns: int) -> bool:
+        """Checks whether the indexed entry still describes the file on disk."""
+        return self.size == size and self.mtime_ns == mtime_ns
+
+
+class SnapshotContentIndex:
+    """
+    An inverted trigram index of the files contained in a snapshot.
+
+    The index maps every byte trigram to the sorted list of files containing it,
+    so a query only has to open the files containing all the trigrams of its
+    required literals. Paths are stored relative to the snapshot directory.
+    """
+
+    def __init__(
+            self,
+            paths: list[str],
+            sizes: array,
+            mtimes: array,
+            indexed: array,
+            grams: array,
+            offsets: array,
+            postings: array,
+    ):
+        self.paths = paths
+        self.sizes = sizes
+        self.mtimes = mtimes
+        self.indexed = indexed
+        self.grams = grams
+        self.offsets = offsets
+        self.postings = postings
+        self._path_to_id = {path: i for i, path in enumerate(paths)}
+
+    def __len__(self):
+        return len(self.paths)
+
+    def get_file_info(self, rel_path: str) -> IndexedFileInfo | None:
+        """
+        Returns the indexed information of a file.
+
+        Args:
+            rel_path (str): The path of the file relative to the snapshot directory.
+
+        Returns:
+            IndexedFileInfo | None: The indexed information, or None if the file is not in the index.
+        """
+        file_id = self._path_to_id.get(rel_path)
+        if file_id is None:
+            return None
+        return IndexedFileInfo(file_id, self.sizes[file_id], self.mtimes[file_id], bool(self.indexed[file_id]))
+
+    def _get_posting(self, gram: int) -> array:
+        pos = bisect_left(self.grams, gram)
+        if pos == len(self.grams) or self.grams[pos] != gram:
+            return array("I")
+        return self.postings[self.offsets[pos]:self.offsets[pos + 1]]
+
+    def get_candidates(self, literals: list[bytes]) -> set[int]:
+        """
+        Returns the ids of the indexed files that may contain all the literals.
+
+        Args:
+            literals (list[bytes]): The literals every match must contain.
+
+        Returns:
+            set[int]: The ids of the candidate files.
+        """
+        query_grams = set()
+        for literal in literals:
+            query_grams.update(get_trigrams(literal))
+        candidates: set[int] | None = None
+        # Intersect the shortest posting lists first to shrink the set quickly.
+        postings = sorted((self._get_posting(_gram_to_int(g)) for g in query_grams), key=len)
+        for posting in postings:
+            candidates = set(posting) if candidates is None else candidates.intersection(posting)
+            if not candidates:
+                break
+        return candidates if candidates is not None else set(range(len(self.paths)))
+
+    def get_file_grams(self) -> list[list[int]]:
+        """Inverts the postings, returning the trigrams of every file."""
+        file_grams: list[list[int]] = [[] for _ in self.paths]
+        for pos, gram in enumerate(self.grams):
+            for file_id in self.postings[self.offsets[pos]:self.offsets[pos + 1]]:
+                file_grams[file_id].append(gram)
+        return file_grams
+
+    def save(self, path: Path):
+        """
+        Writes the index to disk in its compressed binary format.
+
+        Args:
+            path (Path): The destination file.
+        """
+        path_blob = "\0".join(self.paths).encode("utf-8")
+        payload = bytearray(_COUNTS.pack(len(self.paths), len(path_blob), len(self.grams), len(self.postings)))
+        payload += path_blob
+        for arr in (self.sizes, self.mtimes, self.indexed, self.grams, self.offsets, self.postings):
+            payload += to_le_bytes(arr)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_bytes(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION) + zlib.compress(bytes(payload), 6))
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'SnapshotContentIndex | None':
+        """
+        Reads an index from disk.
+
+        Args:
+            path (Path): The index file.
+
+        Returns:
+            SnapshotContentIndex | None: The index, or None if it is missing, corrupted
+                                        or written by an incompatible version.
+        """
+        try:
+            raw = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Unable to read content index {path}: {e}")
+            return None
+        try:
+            magic, version = _HEADER.unpack_from(raw)
+            if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                return None
+            payload = zlib.decompress(raw[_HEADER.size:])
+            file_count, path_blob_len, gram_count, posting_count = _COUNTS.unpack_from(payload)
+            pos = _COUNTS.size
+            path_blob = payload[pos:pos + path_blob_len].decode("utf-8")
+            pos += path_blob_len
+            paths = path_blob.split("\0") if file_count else []
+            arrays = []
+            for typecode, count in (("Q", file_count), ("q", file_count), ("B", file_count),
+                                    ("I", gram_count), ("I", gram_count + 1), ("I", posting_count)):
+                arr, pos = from_le_bytes(typecode, payload, pos, count)
+                arrays.append(arr)
+            if len(paths) != file_count:
+                return None
+            return cls(paths, *arrays)
+        except (struct.error, zlib.error, UnicodeDecodeError, ValueError) as e:
+            logger.warning(f"Content index {path} is corrupted: {e}")
+            return None
+
+
+class SnapshotContentIndexBuilder:
+    """Incrementally collects files and their trigrams to build a SnapshotContentIndex."""
+
+    def __init__(self):
+        self._paths: list[str] = []
+        self._sizes = array("Q")
+        self._mtimes = array("q")
+        self._indexed = array("B")
+        self._postings: dict[int, array] = {}
+
+    def add_file(self, rel_path: str, size: int, mtime_ns: int, data: bytes | None):
+        """
+        Adds a file to the index.
+
+        Args:
+            rel_path (str): The path of the file relative to the snapshot directory.
+            size (int): The size of the file.
+            mtime_ns (int): The modification time of the file.
+            data (bytes | None): The file content, or None to store the file as not indexed.
+        """
+        grams = None if data is None else get_trigram_ids(data)
+        self.add_file_grams(rel_path, size, mtime_ns, grams)
+
+    def add_file_grams(self, rel_path: str, size: int, mtime_ns: int, grams: list[int] | None):
+        """
+        Adds a file whose trigrams are already known (e.g. taken from a previous index).
+
+        Args:
+            rel_path (str): The path of the file relative to the snapshot directory.
+            size (int): The size of the file.
+            mtime_ns (int): The modification time of the file.
+            grams (list[int] | None): The trigrams of the file, or None if not indexed.
+        """
+        file_id = len(self._paths)
+        self._paths.append(rel_path)
+        self._sizes.append(size)
+        self._mtimes.append(mtime_ns)
+        self._indexed.append(grams is not None)
+        for gram in grams or ():
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array("I")
+            posting.append(file_id)
+
+    def build(self) -> SnapshotContentIndex:
+        """Returns the index containing all the added files."""
+        grams = array("I", sorted(self._postings))
+        offsets = array("I", [0])
+        postings = array("I")
+        for gram in grams:
+            postings.extend(self._postings[gram])
+            offsets.append(len(postings))
+        return SnapshotContentIndex(self._paths, self._sizes, self._mtimes, self._indexed, grams, offsets, postings)
+
+
+def _gram_to_int(gram: bytes) -> int:
+    return int.from_bytes(gram.ljust(3, b"\0"), "big")
+
+
+def to_le_bytes(arr: array) -> bytes:
+    """Returns the items of an array as little-endian bytes, whatever the byte order of the machine."""
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def from_le_bytes(typecode: str, payload: bytes, pos: int, count: int) -> tuple[array, int]:
+    """
+    Reads an array of little-endian items from a binary payload.
+
+    Args:
+        typecode (str): The typecode of the array.
+        payload (bytes): The payload holding the array.
+        pos (int): The offset of the first item.
+        count (int): The number of items.
+
+    Returns:
+        tuple[array, int]: The array and the offset following its last item.
+
+    Raises:
+        ValueError: If the payload is too short.
+    """
+    arr = array(typecode)
+    end = pos + count * arr.itemsize
+    if end > len(payload):
+        raise ValueError("Truncated payload")
+    arr.frombytes(payload[pos:end])
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr, end
@@ -0,0 +1,215 @@
+import heapq
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from loguru import logger
+
+from atomdev.core.walker import scan_dir
+
+
+SIZE_CACHE_VERSION = 2
+LARGEST_FILES_COUNT = 10
+
+
+@dataclass
+class DirectoryStats:
+    """
+    Statistics of the files of one or more directory trees.
+
+    Attributes:
+        size: The total size of the files, in bytes.
+        files: The number of files.
+        largest_files: The LARGEST_FILES_COUNT largest files as (size, path), largest first.
+    """
+    size: int = 0
+    files: int = 0
+    largest_files: list[tuple[int, str]] = field(default_factory=list)
+
+    def add(self, other: 'DirectoryStats'):
+        """Adds the statistics of other trees to these ones."""
+        self.size += other.size
+        self.files += other.files
+        self.largest_files = heapq.nlargest(LARGEST_FILES_COUNT, self.largest_files + other.largest_files)
+
+
+class DirectorySizeCache:
+    """
+    A persistent cache of the size of directory trees.
+
+    Every directory is stored with the modification time and inode it had when it
+    was listed, the total size and number of the files it directly contains, its
+    largest files and the names of its subdirectories. A directory is listed again only if its mtime or inode
+    changed (a file was added, removed or renamed in it); unchanged directories
+    cost a single stat, so refreshing a large tree only re-walks what changed.
+
+    Files rewritten in place without being replaced do not change the mtime of
+    their directory, so their new size is picked up the next time the directory
+    itself changes.
+    """
+
+    def __init__(self, cache_file: Path):
+        """
+        Initializes the DirectorySizeCache, loading the entries saved in the cache file.
+
+        Args:
+            cache_file (Path): The JSON file holding the cache.
+        """
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        self._dirs: dict[str, list] = {}
+        self._dirty = False
+        self.__load()
+
+    def get_cached_size(self, path: Path) -> int | None:
+        """
+        Returns the size of a directory tree as last computed, without touching the disk.
+
+        Args:
+            path (Path): The root of the tree.
+
+        Returns:
+            int | None: The size in bytes, or None if the tree was never computed.
+        """
+        with self._lock:
+            if str(path) not in self._dirs:
+                return None
+            total = 0
+            stack = [str(path)]
+            while stack:
+                dir_path = stack.pop()
+                entry = self._dirs.get(dir_path)
+                if entry is not None:
+                    total += entry[2]
+                    stack.extend(os.path.join(dir_path, name) for name in entry[3])
+            return total
+
+    def get_size(self, path: Path, is_cancelled: Callable[[], bool] | None = None) -> int | None:
+        """
+        Computes the size of a directory tree, listing only the directories changed
+        since the last computation.
+
+        Args:
+            path (Path): The root of the tree.
+            is_cancelled (Callable[[], bool], optional): Polled between directories to abort the walk.
+
+        Returns:
+            int | None: The size in bytes (0 if the directory does not exist), or None if cancelled.
+        """
+        stats = self.get_stats(path, is_cancelled)
+        return stats.size if stats is not None else None
+
+    def get_stats(
+            self,
+            path: Path,
+            is_cancelled: Callable[[], bool] | None = None,
+            on_directory: Callable[[DirectoryStats], None] | None = None,
+    ) -> DirectoryStats | None:
+        """
+        Computes the statistics of a directory tree, listing only the directories
+        changed since the last computation.
+
+        Args:
+            path (Path): The root of the tree.
+            is_cancelled (Callable[[], bool], optional): Polled between directories to abort the walk.
+            on_directory (Callable[[DirectoryStats], None], optional): Called after every directory
+                                                                       with the partial statistics of the tree.
+
+        Returns:
+            DirectoryStats | None: The statistics (empty if the directory does not exist), or None if cancelled.
+        """
+        stats = DirectoryStats()
+        largest: list[tuple[int, str]] = []
+        stack = [str(path)]
+        while stack:
+            if is_cancelled is not None and is_cancelled():
+                return None
+            dir_path = stack.pop()
+            try:
+                stat = os.stat(dir_path)
+            except OSError:
+                self.__forget(dir_path)
+                continue
+            with self._lock:
+                entry = self._dirs.get(dir_path)
+            if entry is None or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_ino:
+                entry = self.__list_directory(dir_path, stat)
+                if entry is None:
+                    continue
+            _, _, files_size, subdirs, files_count, dir_largest = entry
+            stats.size += files_size
+            stats.files += files_count
+            for size, name in dir_largest:
+                item = (size, os.path.join(dir_path, name))
+                if len(largest) < LARGEST_FILES_COUNT:
+                    heapq.heappush(largest, item)
+                elif item > largest[0]:
+                    heapq.heapreplace(largest, item)
+            stack.extend(os.path.join(dir_path, name) for name in subdirs)
+            if on_directory is not None:
+                stats.largest_files = sorted(largest, reverse=True)
+                on_directory(stats)
+        stats.largest_files = sorted(largest, reverse=True)
+        return stats
+
+    def save(self):
+        """Writes the cache file, if any entry changed since it was loaded or saved."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps({"version": SIZE_CACHE_VERSION, "dirs": self._dirs})
+            self._dirty = False
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_file.with_name(self.cache_file.name + ".tmp")
+            tmp_path.write_text(data, encoding="utf-8")
+            tmp_path.replace(self.cache_file)
+        except OSError as e:
+            logger.warning(f"Unable to save the directory size cache {self.cache_file}: {e}")
+
+    def __load(self):
+        try:
+            data = json.loads(self.cache_file.read_text(encoding="utf-8"))
+            if data.get("version") == SIZE_CACHE_VERSION:
+                self._dirs = data["dirs"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            logger.warning(f"Directory size cache {self.cache_file} is corrupted, it will be rebuilt: {e}")
+
+    def __list_directory(self, dir_path: str, stat: os.stat_result) -> list | None:
+        try:
+            entries, _ = scan_dir(dir_path)
+        except OSError as e:
+            logger.warning(f"Unable to list {dir_path} while computing its size: {e}")
+            self.__forget(dir_path)
+            return None
+        files = [(entry.size, os.path.basename(entry.path)) for entry in entries if not entry.is_dir]
+        subdirs = [os.path.basename(entry.path) for entry in entries if entry.is_dir]
+        files_size = sum(size for size, _ in files)
+        largest = [list(item) for item in heapq.nlargest(LARGEST_FILES_COUNT, files)]
+        entry = [stat.st_mtime_ns, stat.st_ino, files_size, subdirs, len(files), largest]
+        with self._lock:
+            old = self._dirs.get(dir_path)
+            if old is not None:
+                removed = set(old[3]) - set(subdirs)
+                for name in removed:
+                    self.__forget_tree(os.path.join(dir_path, name))
+            self._dirs[dir_path] = entry
+            self._dirty = True
+        return entry
+
+    def __forget(self, dir_path: str):
+        with self._lock:
+            self.__forget_tree(dir_path)
+
+    def __forget_tree(self, dir_path: str):
+        if self._dirs.pop(dir_path, None) is None:
+            return
+        self._dirty = True
+        prefix = dir_path + os.sep
+        for key in [key for key in self._dirs if key.startswith(prefix)]:
+            del self._dirs[key]
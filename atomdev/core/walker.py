@@ -0,0 +1,134 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+from loguru import logger
+
+
+DEFAULT_WALK_WORKERS = min(8, (os.cpu_count() or 1) + 2)
+
+
+class WalkEntry(NamedTuple):
+    """
+    A file or directory found while walking a tree.
+
+    Attributes:
+        path: The absolute path of the entry.
+        size: The size of the file in bytes (0 for directories).
+        mtime_ns: The modification time in nanoseconds.
+        is_dir: Whether the entry is a directory.
+    """
+    path: str
+    size: int
+    mtime_ns: int
+    is_dir: bool
+
+
+def scan_dir(dir_path: str) -> tuple[list[WalkEntry], list[str]]:
+    """
+    Lists the entries directly contained in a directory.
+
+    Sizes and times come from the DirEntry stat data, which os.scandir already
+    returns on Windows, so listing a directory costs no extra system call per file
+    there. Symbolic links to directories are not followed; symbolic links to files
+    are reported with the size of their target.
+
+    Args:
+        dir_path (str): The directory to list.
+
+    Returns:
+        tuple[list[WalkEntry], list[str]]: The files and the subdirectories of the
+                                           directory (also as entries, with is_dir
+                                           set), and the paths of the subdirectories.
+
+    Raises:
+        OSError: If the directory cannot be listed.
+    """
+    entries: list[WalkEntry] = []
+    subdirs: list[str] = []
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    entries.append(WalkEntry(entry.path, 0, stat.st_mtime_ns, True))
+                    subdirs.append(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    entries.append(WalkEntry(entry.path, stat.st_size, stat.st_mtime_ns, False))
+            except OSError:
+                continue
+    return entries, subdirs
+
+
+def walk(root: Path | str, include_dirs: bool = False, max_workers: int = DEFAULT_WALK_WORKERS) -> Iterator[WalkEntry]:
+    """
+    Yields every file (and optionally every directory) of a tree.
+
+    Directories are listed in parallel by a pool of threads, one task per
+    directory, so the waits of the file system (especially on network drives)
+    overlap. Entries are yielded as soon as their directory has been listed, in
+    no particular order. Directories that cannot be listed are logged and skipped.
+
+    Args:
+        root (Path | str): The root of the tree. Nothing is yielded if it is not a directory.
+        include_dirs (bool): Whether to also yield the subdirectories (never the root).
+        max_workers (int): The number of threads listing directories (1 lists them sequentially).
+
+    Yields:
+        WalkEntry: The entries of the tree.
+    """
+    root = os.fspath(root)
+    if not os.path.isdir(root):
+        return
+    if max_workers <= 1:
+        yield from _walk_sequential(root, include_dirs)
+        return
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="walker") as executor:
+        pending: dict[Future, str] = {executor.submit(scan_dir, root): root}
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    dir_path = pending.pop(future)
+                    try:
+                        entries, subdirs = future.result()
+                    except OSError as e:
+                        logger.warning(f"Unable to list directory {dir_path}: {e}")
+                        continue
+                    for subdir in subdirs:
+                        pending[executor.submit(scan_dir, subdir)] = subdir
+                    for entry in entries:
+                        if include_dirs or not entry.is_dir:
+                            yield entry
+        finally:
+            # The consumer may stop early: drop the directories not listed yet.
+            for future in pending:
+                future.cancel()
+
+
+def _walk_sequential(root: str, include_dirs: bool) -> Iterator[WalkEntry]:
+    stack = [root]
+    while stack:
+        dir_path = stack.pop()
+        try:
+            entries, subdirs = scan_dir(dir_path)
+        except OSError as e:
+            logger.warning(f"Unable to list directory {dir_path}: {e}")
+            continue
+        stack.extend(reversed(subdirs))
+        for entry in entries:
+            if include_dirs or not entry.is_dir:
+                yield entry
+
+
+def get_tree_size(root: Path | str, max_workers: int = DEFAULT_WALK_WORKERS) -> int:
+    """
+    Returns the total size of the files of a tree, in bytes (0 if it is not a directory).
+
+    Args:
+        root (Path | str): The root of the tree.
+        max_workers (int): The number of threads listing directories.
+    """
+    return sum(entry.size for entry in walk(root, max_workers=max_workers))
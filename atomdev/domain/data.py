@@ -1,10 +1,12 @@
-from dataclasses import dataclass
-from pathlib import Path
+from dataclasses import dataclass, field
 
 from pylizlib.core.data.unit import get_normalized_gb_mb_str
 from pylizlib.core.os.snap import Snapshot
 from pylizlib.qtfw.domain.sw import SoftwareData
 
+from atomdev.core.size_cache import DirectoryStats
+from atomdev.core.walker import get_tree_size
+
 
 @dataclass
 class DevlizSnapshotData:
@@ -19,14 +21,23 @@ class DevlizSnapshotData:
         total_size = 0
         for config in self.snapshot_list:
             for dir_assoc in config.directories:
-                path = Path(dir_assoc.original_path)
-                if path.exists() and path.is_dir():
-                    for file in path.rglob('*'):
-                        if file.is_file():
-                            total_size += file.stat().st_size
+                total_size += get_tree_size(dir_assoc.original_path)
         return get_normalized_gb_mb_str(total_size)
 
 
+@dataclass
+class CatalogueStats(DirectoryStats):
+    """
+    Statistics of the directories associated to the snapshots of the catalogue.
+
+    Attributes:
+        snapshot_sizes: The size of the associated directories of each snapshot, by snapshot id.
+        completed: False while the statistics are still being computed.
+    """
+    snapshot_sizes: dict[str, int] = field(default_factory=dict)
+    completed: bool = False
+
+
 # @dataclass
 # class DevlizSettingsData:
 #     starred_dirs: list[Path] = None
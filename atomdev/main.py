@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 
 from PySide6.QtWidgets import QApplication
@@ -9,6 +10,8 @@ from atomdev.view.splash import SplashWindow
 
 
 if __name__ == "__main__":
+    # Required by the content search process pool in the frozen (PyInstaller) build.
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     splash = SplashWindow()
     splash.show()
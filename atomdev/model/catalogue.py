@@ -1,29 +1,83 @@
-from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
-from pylizlib.core.os.snap import Snapshot, SnapshotSortKey, SnapshotUtils
+import threading
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Callable
 
-from atomdev.application.app import app_settings, AppSettings
-from atomdev.domain.data import DevlizSnapshotData
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt, QObject, Signal
+from loguru import logger
+from pylizlib.core.data.unit import get_normalized_gb_mb_str
+from pylizlib.core.os.snap import Snapshot, SnapshotSortKey
+from pylizlib.qt.handler.operation_core import Operation, Task
+from pylizlib.qt.handler.operation_domain import OperationInfo
+from pylizlib.qt.handler.operation_runner import RunnerStatistics
+
+from atomdev.application.app import app_settings, AppSettings, PATH_SIZE_CACHE
+from atomdev.core.archive import ZipOptions
+from atomdev.core.catalogue import DevlizSnapshotCatalogue
+from atomdev.core.catalogue_filter import CatalogueFilter
+from atomdev.core.catalogue_sort import CatalogueSorter
+from atomdev.core.manifest import SnapshotManifest
+from atomdev.core.progress import DEFAULT_PROGRESS_INTERVAL
+from atomdev.core.size_cache import DirectorySizeCache, DirectoryStats
+from atomdev.domain.data import CatalogueStats
+from atomdev.model.runner import DedicatedOperationRunner
+
+
+def get_associated_dirs(snapshots: list[Snapshot]) -> list[Path]:
+    """Returns the original paths of the directories associated to the snapshots."""
+    return [Path(dir_assoc.original_path) for snap in snapshots for dir_assoc in snap.directories]
+
+
+def _get_runs(rows: list[int]) -> list[tuple[int, int]]:
+    """Groups ascending row numbers into runs of consecutive rows, as (first, last) pairs."""
+    runs: list[tuple[int, int]] = []
+    for row in rows:
+        if runs and runs[-1][1] == row - 1:
+            runs[-1] = (runs[-1][0], row)
+        else:
+            runs.append((row, row))
+    return runs
 
 
 class SnapshotTableModel(QAbstractTableModel):
     """
     A table model for displaying Snapshot data in a QTableView.
+
+    The text of every row is computed once, when the snapshots are set or the
+    headers change, and kept as a tuple of strings: the view asks for every
+    visible cell on every repaint, and reading a tuple is much cheaper than
+    formatting the snapshot again. Rows are rebuilt individually with refresh_row.
+    The text of the rows removed by update_snapshots is kept too, so the rows hidden
+    by a filter are not formatted again when it is cleared.
     """
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self._snapshots: list[Snapshot] = []
+        self._rows: list[tuple[str, ...]] = []
+        self._hidden_rows: dict[str, tuple[Snapshot, tuple[str, ...]]] = {}
+        self._custom_keys: list[str] = []
         self._headers = []
         self.update_headers()
 
     def update_headers(self):
-        """Updates the headers based on application settings."""
+        """Updates the headers based on application settings, rebuilding the rows if the custom data changed."""
+        snap_custom_data = list(app_settings.get(AppSettings.snap_custom_data))
         headers = ["Nome", "Descrizione"]
-        snap_custom_data = app_settings.get(AppSettings.snap_custom_data)
         for i in snap_custom_data:
             headers.append(i)
         headers.append("Data/Ora")
         headers.append("Tags")
+        if snap_custom_data != self._custom_keys:
+            # The columns change: the view must forget the old ones.
+            self.beginResetModel()
+            self._custom_keys = snap_custom_data
+            self._headers = headers
+            self._rows = [self._build_row(snap) for snap in self._snapshots]
+            self._hidden_rows.clear()
+            self.endResetModel()
+            return
         self._headers = headers
         self.headerDataChanged.emit(Qt.Orientation.Horizontal, 0, len(self._headers) - 1)
 
@@ -38,15 +92,11 @@ class SnapshotTableModel(QAbstractTableModel):
         return len(self._headers)
 
     def data(self, index, role=Qt.ItemDataRole.DisplayRole):
-        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
             return None
-
         try:
-            snapshot = self._snapshots[index.row()]
-            snap_custom_data_keys = app_settings.get(AppSettings.snap_custom_data)
-            table_data = snapshot.get_for_table_array(snap_custom_data_keys)
-            return str(table_data[index.column()])
-        except (IndexError, KeyError):
+            return self._rows[index.row()][index.column()]
+        except IndexError:
             return None
 
     def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
@@ -61,8 +111,83 @@ class SnapshotTableModel(QAbstractTableModel):
         """Resets the model with a new list of snapshots."""
         self.beginResetModel()
         self._snapshots = snapshots if snapshots is not None else []
+        self._rows = [self._build_row(snap) for snap in self._snapshots]
+        self._hidden_rows.clear()
         self.endResetModel()
 
+    def update_snapshots(self, snapshots: list[Snapshot]):
+        """
+        Replaces the snapshots of the model with a new list, notifying the view of the
+        differences only, so the selection and the scroll position are kept.
+
+        Snapshots are matched by id: the rows of the snapshots no longer present are
+        removed, the new ones inserted, and only the rows whose snapshot changed are
+        rebuilt. If the snapshots kept are in a different order the rows are moved
+        with a layout change, which keeps the selection on the same snapshots.
+
+        Args:
+            snapshots (list[Snapshot]): The new list, in display order. Ids must be unique.
+        """
+        snapshots = snapshots if snapshots is not None else []
+        new_ids = {snap.id for snap in snapshots}
+        parent = QModelIndex()
+
+        # Removed rows, in runs from the bottom so the earlier row numbers stay valid.
+        removed = [row for row, snap in enumerate(self._snapshots) if snap.id not in new_ids]
+        for row in removed:
+            self._hidden_rows[self._snapshots[row].id] = (self._snapshots[row], self._rows[row])
+        for first, last in reversed(_get_runs(removed)):
+            self.beginRemoveRows(parent, first, last)
+            del self._snapshots[first:last + 1]
+            del self._rows[first:last + 1]
+            self.endRemoveRows()
+
+        # Moved rows: reorder the kept snapshots as in the new list.
+        old_order = [snap.id for snap in self._snapshots]
+        old_ids = set(old_order)
+        kept_order = [snap.id for snap in snapshots if snap.id in old_ids]
+        if kept_order != old_order:
+            self.layoutAboutToBeChanged.emit()
+            by_id = {snap.id: (snap, text) for snap, text in zip(self._snapshots, self._rows)}
+            self._snapshots = [by_id[snap_id][0] for snap_id in kept_order]
+            self._rows = [by_id[snap_id][1] for snap_id in kept_order]
+            persistent = self.persistentIndexList()
+            if persistent:
+                new_rows = {snap_id: i for i, snap_id in enumerate(kept_order)}
+                self.changePersistentIndexList(persistent, [
+                    self.index(new_rows[old_order[index.row()]], index.column()) for index in persistent
+                ])
+            self.layoutChanged.emit()
+
+        # Inserted rows: the kept snapshots are now a subsequence of the new list,
+        # so inserting the runs in ascending order puts every row in its place.
+        inserted = [row for row, snap in enumerate(snapshots) if snap.id not in old_ids]
+        for first, last in _get_runs(inserted):
+            self.beginInsertRows(parent, first, last)
+            self._snapshots[first:first] = snapshots[first:last + 1]
+            self._rows[first:first] = [self.__get_hidden_row(snap) for snap in snapshots[first:last + 1]]
+            self.endInsertRows()
+
+        # Changed rows, notified in runs of consecutive rows.
+        changed = [row for row, (current, snap) in enumerate(zip(self._snapshots, snapshots)) if current is not snap and current != snap]
+        self._snapshots = list(snapshots)
+        for row in changed:
+            self._rows[row] = self._build_row(snapshots[row])
+        for first, last in _get_runs(changed):
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(self._headers) - 1))
+
+    def forget_hidden_rows(self, snapshots: list[Snapshot]):
+        """Drops the text kept for the hidden rows of the snapshots not in a list, e.g. deleted from the catalogue."""
+        ids = {snap.id for snap in snapshots}
+        for snap_id in [snap_id for snap_id in self._hidden_rows if snap_id not in ids]:
+            del self._hidden_rows[snap_id]
+
+    def refresh_row(self, row: int):
+        """Rebuilds the text of a row after its snapshot was modified in place."""
+        if 0 <= row < len(self._snapshots):
+            self._rows[row] = self._build_row(self._snapshots[row])
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self._headers) - 1))
+
     def get_snapshot(self, row: int) -> Snapshot | None:
         """Returns the snapshot at a given row, or None if the row is invalid."""
         try:
@@ -70,56 +195,354 @@ class SnapshotTableModel(QAbstractTableModel):
         except IndexError:
             return None
 
+    def _build_row(self, snap: Snapshot) -> tuple[str, ...]:
+        return tuple(str(value) for value in snap.get_for_table_array(self._custom_keys))
+
+    def __get_hidden_row(self, snap: Snapshot) -> tuple[str, ...]:
+        hidden = self._hidden_rows.pop(snap.id, None)
+        if hidden is not None and (hidden[0] is snap or hidden[0] == snap):
+            return hidden[1]
+        return self._build_row(snap)
+
+
+class TaskGetCatalogueStats(Task):
+    """
+    A background task computing the statistics of the directories associated to
+    the snapshots, re-walking only the directories changed since the last time.
+
+    Signals:
+        task_stats_updated(str, object): Emitted with the task id and the partial
+                                         CatalogueStats while the directories are walked.
+    """
+    task_stats_updated = Signal(str, object)
+
+    def __init__(self, snapshots: list[Snapshot], size_cache: DirectorySizeCache):
+        """
+        Initializes the TaskGetCatalogueStats.
+
+        Args:
+            snapshots (list[Snapshot]): The snapshots whose directories are measured.
+            size_cache (DirectorySizeCache): The cache of the directory sizes.
+        """
+        super().__init__("Calcolo statistiche catalogo")
+        self.snapshots = snapshots
+        self.size_cache = size_cache
+        self._cancelled = threading.Event()
 
-class CatalogueModel:
+    def cancel(self):
+        """Stops the computation at the next directory."""
+        self._cancelled.set()
+
+    def execute(self) -> CatalogueStats | None:
+        """
+        Walks the associated directories of every snapshot.
+
+        Returns:
+            CatalogueStats | None: The statistics, or None if the task was cancelled.
+        """
+        stats = CatalogueStats()
+        last_update = time.monotonic()
+
+        def on_directory(tree_stats: DirectoryStats):
+            nonlocal last_update
+            if time.monotonic() - last_update < DEFAULT_PROGRESS_INTERVAL:
+                return
+            last_update = time.monotonic()
+            partial = replace(stats, snapshot_sizes=dict(stats.snapshot_sizes))
+            partial.add(tree_stats)
+            self.task_stats_updated.emit(self.id, partial)
+
+        try:
+            for i, snap in enumerate(self.snapshots):
+                stats.snapshot_sizes[snap.id] = 0
+                for path in get_associated_dirs([snap]):
+                    tree_stats = self.size_cache.get_stats(path, self._cancelled.is_set, on_directory)
+                    if tree_stats is None:
+                        return None
+                    stats.add(tree_stats)
+                    stats.snapshot_sizes[snap.id] += tree_stats.size
+                self.gen_update_task_progress(i + 1, len(self.snapshots))
+        finally:
+            self.size_cache.save()
+        stats.completed = True
+        return stats
+
+
+class TaskExportArchive(Task):
+    """
+    A background task writing a zip archive, reporting the bytes written as progress.
+    """
+
+    def __init__(self, description: str, write: Callable[[Callable[[int, int], None], Callable[[], bool]], Path | None]):
+        """
+        Initializes the TaskExportArchive.
+
+        Args:
+            description (str): The description of the task.
+            write (Callable): Writes the archive, given the progress callback and the cancel check,
+                              and returns the archive or None if cancelled (see DevlizSnapshotCatalogue.export_snapshot).
+        """
+        super().__init__(description)
+        self.write = write
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Stops the export at the next chunk; the partial archive is deleted."""
+        self._cancelled.set()
+
+    def execute(self) -> Path | None:
+        """
+        Writes the archive.
+
+        Returns:
+            Path | None: The archive, or None if the task was cancelled.
+        """
+        last_update = 0.0
+
+        def on_progress(done: int, total: int):
+            nonlocal last_update
+            if total <= 0 or (done < total and time.monotonic() - last_update < DEFAULT_PROGRESS_INTERVAL):
+                return
+            last_update = time.monotonic()
+            self.gen_update_task_progress(done, total)
+
+        return self.write(on_progress, self._cancelled.is_set)
+
+
+class CatalogueModel(QObject):
     """
     Manages the data and business logic for the snapshot catalogue.
+
+    Signals:
+        signal_stats_changed(object): Emitted with the CatalogueStats of the snapshots,
+                                      partial while they are computed in the background
+                                      and complete when the computation finishes.
+        signal_export_progress(int): Emitted with the percentage of the running export.
+        signal_export_finished(object): Emitted with the Path of the exported archive, or
+                                        None if the export was cancelled.
+        signal_export_failed(str): Emitted with the error that stopped the export.
     """
+    signal_stats_changed = Signal(object)
+    signal_export_progress = Signal(int)
+    signal_export_finished = Signal(object)
+    signal_export_failed = Signal(str)
 
-    def __init__(self):
+    def __init__(self, catalogue: DevlizSnapshotCatalogue):
+        """
+        Initializes the CatalogueModel.
+
+        Args:
+            catalogue (DevlizSnapshotCatalogue): The catalogue holding the snapshots and their manifests.
+        """
+        super().__init__()
+        self.catalogue = catalogue
         self._all_snapshots: list[Snapshot] = []
         self._filtered_snapshots: list[Snapshot] = []
         self._is_filtered = False
+        self._filter_text = ""
+        self._filter = CatalogueFilter()
+        self._sorter = CatalogueSorter(self.get_snapshot_size)
+        self._sort_key: SnapshotSortKey | None = None
+        self._sort_descending = False
         self.table_model = SnapshotTableModel()
 
+        self._size_cache = DirectorySizeCache(PATH_SIZE_CACHE)
+        self._stats: CatalogueStats | None = None
+        self._stats_task: TaskGetCatalogueStats | None = None
+        # A dedicated pool, so the statistics never wait behind searches or dashboard updates.
+        self._stats_runner = DedicatedOperationRunner()
+        self._stats_runner.runner_finish.connect(self.__on_stats_computed)
+
+        self._export_task: TaskExportArchive | None = None
+        self._export_runner = DedicatedOperationRunner()
+        self._export_runner.op_update_progress.connect(self.__on_export_progress)
+        self._export_runner.runner_finish.connect(self.__on_export_finished)
+
     def set_snapshots(self, snapshots: list[Snapshot]):
-        """Sets the master list of snapshots and updates the table view."""
-        self._all_snapshots = snapshots if snapshots is not None else []
-        self.filter("")  # Apply current filter or show all
+        """
+        Sets the master list of snapshots and updates the table view with the current
+        sort order and filter. Only the rows of the snapshots added, removed or changed
+        are updated.
+        """
+        snapshots = snapshots if snapshots is not None else []
+        self._sorter.set_snapshots(snapshots)
+        # The manifests were loaded again with the snapshots: the sizes may have changed.
+        self._sorter.invalidate_sizes()
+        self._all_snapshots = self._sorter.sort(self._sort_key, self._sort_descending) if self._sort_key is not None else list(snapshots)
+        self._filter.set_snapshots(self._all_snapshots)
+        self.filter(self._filter_text)
+        self.table_model.forget_hidden_rows(self._all_snapshots)
 
     def get_snapshot_at(self, row: int) -> Snapshot | None:
         """Gets the snapshot at a specific row of the current view (filtered or not)."""
         return self.table_model.get_snapshot(row)
 
     def sort(self, sort_key: SnapshotSortKey):
-        """Sorts the master list of snapshots and updates the view."""
-        self._all_snapshots = SnapshotUtils.sort_snapshots(self._all_snapshots, sort_key)
-        # After sorting, the view should reflect the sorted, unfiltered data
-        self._is_filtered = False
-        self._filtered_snapshots = []
-        self.table_model.set_snapshots(self._all_snapshots)
+        """
+        Sorts the snapshots by a key, in the current direction, and updates the view
+        keeping the filter. The order is kept when the snapshots are refreshed or filtered.
+        """
+        self._sort_key = sort_key
+        self.__apply_sort()
+
+    def set_sort_descending(self, descending: bool):
+        """Sets the direction of the sort and, if a sort key was chosen, updates the view."""
+        self._sort_descending = descending
+        if self._sort_key is not None:
+            self.__apply_sort()
+
+    def get_sort(self) -> tuple[SnapshotSortKey | None, bool]:
+        """Returns the sort key chosen (None if the catalogue order is kept) and whether the sort is descending."""
+        return self._sort_key, self._sort_descending
+
+    def __apply_sort(self):
+        self._all_snapshots = self._sorter.sort(self._sort_key, self._sort_descending)
+        self._filter.set_snapshots(self._all_snapshots)
+        self.filter(self._filter_text)
 
     def filter(self, text: str):
-        """Filters snapshots based on a text query and updates the view."""
-        text = text.lower().strip()
-        if not text:
+        """
+        Filters snapshots based on a text query and updates the view. Case, accents and
+        small typos are ignored, and words can be limited to a field with "field:word"
+        (see parse_query and CatalogueFilter). The snapshots matched are shown in the
+        sort order chosen or, if none was, best matches first.
+        """
+        self._filter_text = text
+        if not text.strip():
             self._is_filtered = False
-            self.table_model.set_snapshots(self._all_snapshots)
+            self.table_model.update_snapshots(self._all_snapshots)
         else:
             self._is_filtered = True
-            self._filtered_snapshots = [
-                config for config in self._all_snapshots
-                if (text in config.name.lower() or
-                    text in config.desc.lower() or
-                    any(text in tag.lower() for tag in config.tags) or
-                    (config.data and any(text in str(value).lower() for value in config.data.values())))
-            ]
-            self.table_model.set_snapshots(self._filtered_snapshots)
+            self._filtered_snapshots = self._filter.filter(text)
+            if self._sort_key is not None:
+                matched = {snap.id for snap in self._filtered_snapshots}
+                self._filtered_snapshots = [snap for snap in self._all_snapshots if snap.id in matched]
+            self.table_model.update_snapshots(self._filtered_snapshots)
 
     def count(self) -> int:
         """Returns the count of snapshots in the current view (filtered or not)."""
         return len(self._all_snapshots)
 
+    def get_snapshots(self) -> list[Snapshot]:
+        """Returns all the snapshots of the catalogue, ignoring the filter."""
+        return self._all_snapshots
+
+    def get_manifest(self, snap: Snapshot) -> SnapshotManifest | None:
+        """Returns the file manifest of a snapshot if already loaded, without touching the disk."""
+        return self.catalogue.get_cached_manifest(snap)
+
+    def get_snapshot_size(self, snap: Snapshot) -> int:
+        """
+        Returns the size of the files stored in a snapshot, in bytes, without touching the disk.
+        The size comes from the manifest of the snapshot or, if not loaded, from the sizes
+        of the associated directories recorded in its metadata.
+        """
+        manifest = self.get_manifest(snap)
+        if manifest is not None:
+            return manifest.total_size
+        return int(snap.get_assoc_dir_mb_size * 1024 * 1024)
+
+    def get_stats(self) -> CatalogueStats | None:
+        """Returns the statistics of the snapshots as last computed, or None if never computed."""
+        return self._stats
+
     def get_mb_size(self) -> str:
-        """Returns the total size of all snapshots in MB."""
-        return DevlizSnapshotData(snapshot_list=self._all_snapshots).get_mb_size
+        """
+        Returns the total size of all snapshots as last computed, without touching the disk.
+        Call refresh_stats to bring it up to date.
+        """
+        sizes = [self._size_cache.get_cached_size(path) for path in get_associated_dirs(self._all_snapshots)]
+        known = [size for size in sizes if size is not None]
+        if sizes and not known:
+            return "calcolo in corso..."
+        return get_normalized_gb_mb_str(sum(known))
+
+    def refresh_stats(self):
+        """
+        Recomputes the statistics of all snapshots in the background, cancelling the
+        computation still running for a previous refresh. signal_stats_changed is emitted
+        with the partial totals while the directories are walked and with the final ones
+        when the computation finishes.
+        """
+        self.stop_stats()
+        task = TaskGetCatalogueStats(list(self._all_snapshots), self._size_cache)
+        task.task_stats_updated.connect(self.__on_stats_updated)
+        self._stats_task = task
+        op = Operation([task], OperationInfo(name="Statistiche catalogo", description="Calcolo delle statistiche del catalogo", delay_each_task=0.0))
+        self._stats_runner.clear()
+        self._stats_runner.add(op)
+        self._stats_runner.start()
+
+    def stop_stats(self):
+        """Cancels the computation of the statistics, if running, without waiting for it."""
+        if self._stats_task is not None:
+            self._stats_task.cancel()
+            self._stats_task = None
+
+    def __on_stats_updated(self, task_id: str, stats: CatalogueStats):
+        if self._stats_task is not None and task_id == self._stats_task.id:
+            self.signal_stats_changed.emit(stats)
+
+    def __on_stats_computed(self, runner_stats: RunnerStatistics):
+        if runner_stats.has_ops_failed():
+            logger.error(f"Errore durante il calcolo delle statistiche del catalogo: {runner_stats.get_first_error()}")
+            return
+        for op in runner_stats.operations:
+            task = op.tasks[0]
+            if task is self._stats_task and task.result is not None:
+                self._stats_task = None
+                self._stats = task.result
+                self.signal_stats_changed.emit(task.result)
+
+    @staticmethod
+    def get_export_options() -> ZipOptions:
+        """Returns the compression options of the exports, as configured in the settings."""
+        return ZipOptions(level=app_settings.get(AppSettings.export_compression), zstd=app_settings.get(AppSettings.export_zstd))
+
+    def is_exporting(self) -> bool:
+        """Returns True while an export is running."""
+        return self._export_task is not None
+
+    def export_snapshot(self, snap: Snapshot, destination: Path, assoc_dirs: bool = False):
+        """
+        Exports a snapshot to a zip archive in the background, with the compression
+        options of the settings. The outcome is reported by signal_export_finished
+        or signal_export_failed, the progress by signal_export_progress.
+
+        Args:
+            snap (Snapshot): The snapshot to export.
+            destination (Path): The folder where the archive is saved.
+            assoc_dirs (bool): If True the associated directories of the snapshot are exported
+                               instead of the files stored in the catalogue.
+        """
+        if self.is_exporting():
+            raise RuntimeError("Un'esportazione è già in corso")
+        options = self.get_export_options()
+        export = self.catalogue.export_assoc_dirs if assoc_dirs else self.catalogue.export_snapshot
+        task = TaskExportArchive(
+            f"Esportazione di {snap.name}",
+            lambda on_progress, is_cancelled: export(snap.id, destination, options, on_progress, is_cancelled)
+        )
+        self._export_task = task
+        op = Operation([task], OperationInfo(name="Esportazione", description=f"Esportazione di {snap.name}", delay_each_task=0.0))
+        self._export_runner.clear()
+        self._export_runner.add(op)
+        self._export_runner.start()
+
+    def stop_export(self):
+        """Cancels the running export, if any, without waiting for it."""
+        if self._export_task is not None:
+            self._export_task.cancel()
+
+    def __on_export_progress(self, op_id: str, progress: int):
+        self.signal_export_progress.emit(progress)
+
+    def __on_export_finished(self, runner_stats: RunnerStatistics):
+        self._export_task = None
+        if runner_stats.has_ops_failed():
+            error = runner_stats.get_first_error()
+            logger.error(f"Errore durante l'esportazione: {error}")
+            self.signal_export_failed.emit(str(error))
+            return
+        for op in runner_stats.operations:
+            self.signal_export_finished.emit(op.tasks[0].result)
@@ -1,14 +1,28 @@
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from time import sleep
 
-from PySide6.QtCore import QAbstractTableModel, Qt, QModelIndex, Signal, QObject
-from PySide6.QtGui import QStandardItemModel, QStandardItem
+from PySide6.QtCore import QAbstractTableModel, QAbstractItemModel, Qt, QModelIndex, Signal, QObject, QTimer
+from PySide6.QtGui import QColor
 
-from pylizlib.core.os.snap import SnapshotCatalogue, Snapshot, SnapshotSearchParams, QueryType, SearchTarget, SnapshotSearcher, \
+from pylizlib.core.os.snap import SnapshotCatalogue, Snapshot, SnapshotSearchParams, SearchTarget, \
     SnapshotSearchResult
 from pylizlib.qt.handler.operation_core import Operation, Task
 from pylizlib.qt.handler.operation_domain import OperationInfo, OperationStatus
 from pylizlib.qt.handler.operation_runner import OperationRunner, RunnerStatistics
 
+from atomdev.application.app import app_settings, AppSettings, PATH_SEARCH_CACHE
+from atomdev.core.progress import ProgressThrottle, DEFAULT_PROGRESS_INTERVAL
+from atomdev.core.query import SearchMode, MultiTermSearchParams
+from atomdev.core.scanner import read_line_context
+from atomdev.core.search import IndexedSnapshotSearcher, SnapshotSearchStats
+from atomdev.core.search_cache import SearchResultCache
+
+
+UPDATE_INTERVAL_MS = int(DEFAULT_PROGRESS_INTERVAL * 1000)
+
 
 class SearchResultsTableModel(QAbstractTableModel):
     """
@@ -32,6 +46,15 @@ class SearchResultsTableModel(QAbstractTableModel):
         self._progress_data = {}
         self._status_data = {}
         self._results_count_data = {}
+        self._rows_by_id: dict[str, int] = {}
+
+        # Cell updates are collected and notified with a single dataChanged per interval.
+        self._dirty_rows: set[int] = set()
+        self._dirty_columns: set[int] = set()
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(UPDATE_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self.flush_changes)
 
     def rowCount(self, parent=QModelIndex()):
         """Returns the number of rows in the model."""
@@ -88,6 +111,7 @@ class SearchResultsTableModel(QAbstractTableModel):
         self._data = new_data
         self._progress_data.clear()
         self._status_data.clear()
+        self.__discard_changes()
         self.endResetModel()
 
     def remove_snapshot(self, row: int):
@@ -98,8 +122,10 @@ class SearchResultsTableModel(QAbstractTableModel):
             row (int): The row index of the snapshot to remove.
         """
         if 0 <= row < self.rowCount():
+            self.flush_changes()
             self.beginRemoveRows(QModelIndex(), row, row)
             del self._data[row]
+            self._rows_by_id.clear()
             self.endRemoveRows()
 
     def reset_search_state(self):
@@ -109,6 +135,7 @@ class SearchResultsTableModel(QAbstractTableModel):
         self._progress_data.clear()
         self._status_data.clear()
         self._results_count_data.clear()
+        self.__discard_changes()
         # Emit dataChanged for all rows and the relevant columns (status, progress, results)
         top_left = self.index(0, 1)
         bottom_right = self.index(self.rowCount() - 1, 3)
@@ -131,12 +158,9 @@ class SearchResultsTableModel(QAbstractTableModel):
             snap_id (str): The ID of the snapshot to update.
             progress (int): The new progress value (0-100).
         """
-        self._progress_data[snap_id] = progress
-        for i, snapshot in enumerate(self._data):
-            if snapshot.id == snap_id:
-                index = self.index(i, 3)
-                self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
-                return
+        if self._progress_data.get(snap_id) != progress:
+            self._progress_data[snap_id] = progress
+            self.__mark_changed(snap_id, 3)
 
     def update_status_for_snapshot(self, snap_id: str, status: str):
         """
@@ -146,12 +170,9 @@ class SearchResultsTableModel(QAbstractTableModel):
             snap_id (str): The ID of the snapshot to update.
             status (str): The new status string.
         """
-        self._status_data[snap_id] = status
-        for i, snapshot in enumerate(self._data):
-            if snapshot.id == snap_id:
-                index = self.index(i, 1)
-                self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
-                return
+        if self._status_data.get(snap_id) != status:
+            self._status_data[snap_id] = status
+            self.__mark_changed(snap_id, 1)
 
     def update_results_for_snapshot(self, snap_id: str, count: str):
         """
@@ -161,18 +182,53 @@ class SearchResultsTableModel(QAbstractTableModel):
             snap_id (str): The ID of the snapshot to update.
             count (str): The new results count as a string.
         """
-        self._results_count_data[snap_id] = count
-        for i, snapshot in enumerate(self._data):
-            if snapshot.id == snap_id:
-                index = self.index(i, 2)
-                self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
-                return
+        if self._results_count_data.get(snap_id) != count:
+            self._results_count_data[snap_id] = count
+            self.__mark_changed(snap_id, 2)
+
+    def flush_changes(self):
+        """
+        Notifies the views of the cells updated since the last notification, with a
+        single dataChanged covering all of them.
+        """
+        self._flush_timer.stop()
+        rows = [row for row in self._dirty_rows if row < len(self._data)]
+        if rows and self._dirty_columns:
+            top_left = self.index(min(rows), min(self._dirty_columns))
+            bottom_right = self.index(max(rows), max(self._dirty_columns))
+            self.dataChanged.emit(top_left, bottom_right, [Qt.ItemDataRole.DisplayRole])
+        self._dirty_rows.clear()
+        self._dirty_columns.clear()
+
+    def __mark_changed(self, snap_id: str, column: int):
+        if not self._rows_by_id:
+            self._rows_by_id = {snapshot.id: i for i, snapshot in enumerate(self._data)}
+        row = self._rows_by_id.get(snap_id)
+        if row is None:
+            return
+        self._dirty_rows.add(row)
+        self._dirty_columns.add(column)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def __discard_changes(self):
+        self._flush_timer.stop()
+        self._dirty_rows.clear()
+        self._dirty_columns.clear()
+        self._rows_by_id.clear()
 
 
 class SnapSearchTask(Task):
-    """A background task for searching within a single snapshot."""
+    """
+    A background task for searching within a single snapshot.
+
+    Signals:
+        task_results_found(str, object): Emitted with the task name and a batch of
+                                         SnapshotSearchResult while the search is running.
+    """
+    task_results_found = Signal(str, object)
 
-    def __init__(self, params: SnapshotSearchParams, snapshot: Snapshot, catalogue: SnapshotCatalogue):
+    def __init__(self, params: SnapshotSearchParams, snapshot: Snapshot, catalogue: SnapshotCatalogue, executor: ProcessPoolExecutor | None = None, max_file_size: int | None = None, cache: SearchResultCache | None = None):
         """
         Initializes the SnapSearchTask.
 
@@ -180,17 +236,28 @@ class SnapSearchTask(Task):
             params (SnapshotSearchParams): The parameters for the search.
             snapshot (Snapshot): The snapshot to search within.
             catalogue (SnapshotCatalogue): The catalogue manager instance.
+            executor (ProcessPoolExecutor | None, optional): The process pool used to scan the
+                                                             snapshot files in parallel chunks.
+            max_file_size (int | None, optional): Files larger than this many bytes are not scanned.
+            cache (SearchResultCache | None, optional): The cache of the results of previous searches.
         """
         super().__init__(f"Search in {snapshot.name}")
         self.params = params
         self.snapshot = snapshot
-        self.searcher = SnapshotSearcher(catalogue)
+        self.searcher = IndexedSnapshotSearcher(catalogue, executor=executor, max_file_size=max_file_size, cache=cache)
+        self.stats = SnapshotSearchStats()
+
+    def cancel(self):
+        """Cancels the search, dropping the chunks not yet scanned."""
+        self.searcher.cancel()
 
     def execute(self) -> list[SnapshotSearchResult]:
         """
         Executes the search task.
 
-        Connects a progress callback and runs the search using SnapshotSearcher.
+        Connects the progress and results callbacks and runs the search using the indexed
+        searcher, keeping its index statistics in `stats`. Results are streamed through
+        `task_results_found` as they are found.
 
         Returns:
             list[SnapshotSearchResult]: A list of results found in the snapshot.
@@ -200,56 +267,460 @@ class SnapSearchTask(Task):
             if total_files > 0:
                 self.gen_update_task_progress(current_file, total_files)
 
-        results = self.searcher.search(self.snapshot, self.params, on_progress=on_progress)
+        # Every progress report becomes several queued signals for the GUI thread
+        # (message, task, operation and runner progress, ETA): report at most 10 per second.
+        on_progress = ProgressThrottle(on_progress)
+
+        def on_results(results: list[SnapshotSearchResult]):
+            self.task_results_found.emit(self.name, results)
+
+        results = self.searcher.search(self.snapshot, self.params, on_progress=on_progress, on_results=on_results)
+        self.stats = self.searcher.last_stats
         return results
 
 
-class SearchResultsTreeModel:
-    """Manages the data model for the search results tree view."""
+class SearchResultsTreeModel(QAbstractItemModel):
+    """
+    A lazy tree model for displaying search results: snapshots, their files, the
+    matching lines of each file and, on demand, the lines around a match. In a
+    multi-term search the snapshots are grouped under one row per term.
+
+    Results are not kept as items: the model stores compact arrays (interned path
+    ids, group, file and hit tables with line numbers and byte offsets) and exposes
+    rows in batches through canFetchMore/fetchMore, so the view only creates the
+    rows it actually shows. The text of a matching line and its context are read
+    back from the file with a seek when they are first displayed.
+
+    A group is a snapshot under a term; without term grouping every snapshot
+    belongs to the single term 0, which is not shown. The internal id of an index
+    stores the kind of the row in its low bits and, above them, the key of its
+    parent: the term row plus one for groups (0 at the top level), the group id
+    for files, the file id for hits and the hit id for context lines.
+    """
 
-    def __init__(self):
-        """Initializes the SearchResultsTreeModel."""
-        self.model = QStandardItemModel()
-        self.model.setHorizontalHeaderLabels(['Risultati'])
+    FETCH_BATCH_SIZE = 256
+    CONTEXT_LINES = 2
+    LINE_CACHE_SIZE = 2048
+    FILE_PATH_ROLE = Qt.ItemDataRole.UserRole + 1
+    SOURCE_PATH_ROLE = Qt.ItemDataRole.UserRole + 2
 
-    def clear(self):
-        """Clears the tree model and resets the header."""
-        self.model.clear()
-        self.model.setHorizontalHeaderLabels(['Risultati'])
+    _KIND_TERM = 0
+    _KIND_GROUP = 1
+    _KIND_FILE = 2
+    _KIND_HIT = 3
+    _KIND_CONTEXT = 4
+    _KIND_BITS = 3
 
-    def populate_from_results(self, results: list[SnapshotSearchResult]):
+    def __init__(self, parent=None):
         """
-        Populates the tree model with search results, grouped by snapshot.
+        Initializes the SearchResultsTreeModel.
 
         Args:
-            results (list[SnapshotSearchResult]): The list of search results to display.
+            parent (QObject, optional): The parent object. Defaults to None.
         """
-        self.clear()
-        self.model.setHorizontalHeaderLabels([f"Risultati ({len(results)})"])
+        super().__init__(parent)
+        self._group_by_term = False
+        self.__reset_data()
+
+    def __reset_data(self):
+        self._paths: list[str] = []
+        self._path_ids: dict[str, int] = {}
+        # Files whose content is read from another path (blobs), by path id
+        self._source_paths: dict[int, str] = {}
+        # Terms, by row
+        self._term_names: list[str] = []
+        self._term_rows: dict[str, int] = {}
+        self._term_hits = array("I")
+        self._term_groups: list[array] = []
+        self._term_group_ids: list[dict[str, int]] = []
+        # Snapshots under a term, by group id
+        self._group_names: list[str] = []
+        self._group_terms = array("I")
+        self._group_rows = array("I")
+        self._group_hits = array("I")
+        self._group_fetched = array("I")
+        self._group_files: list[array] = []
+        self._group_file_ids: list[dict[int, int]] = []
+        # Files, by file id
+        self._file_paths = array("I")
+        self._file_groups = array("I")
+        self._file_rows = array("I")
+        self._file_fetched = array("I")
+        self._file_hits: list[array] = []
+        # Matching lines, by hit id
+        self._hit_files = array("I")
+        self._hit_rows = array("I")
+        self._hit_lines = array("I")
+        self._hit_offsets = array("q")
+        self._hit_texts: dict[int, str] = {}
+        self._line_cache: OrderedDict[int, str] = OrderedDict()
+        self._contexts: dict[int, list[tuple[int, str]]] = {}
+        self._results_count = 0
+        self._inserting = False
 
-        results_by_snapshot = {}
-        for res in results:
-            if res.snapshot_name not in results_by_snapshot:
-                results_by_snapshot[res.snapshot_name] = []
-            results_by_snapshot[res.snapshot_name].append(res)
+    def rowCount(self, parent=QModelIndex()):
+        """Returns the number of rows currently exposed under the given parent."""
+        if not parent.isValid():
+            if self._group_by_term:
+                return len(self._term_names)
+            return len(self._term_groups[0]) if self._term_groups else 0
+        if parent.column() != 0:
+            return 0
+        kind, key = self.__get_node(parent)
+        if kind == self._KIND_TERM:
+            return len(self._term_groups[key])
+        if kind == self._KIND_GROUP:
+            return self._group_fetched[key]
+        if kind == self._KIND_FILE:
+            return self._file_fetched[key]
+        if kind == self._KIND_HIT:
+            return len(self._contexts.get(key, ()))
+        return 0
 
-        for snapshot_name, snapshot_results in results_by_snapshot.items():
-            snapshot_item = QStandardItem(f"{snapshot_name} ({len(snapshot_results)})")
-            snapshot_item.setEditable(False)
+    def columnCount(self, parent=QModelIndex()):
+        """Returns the number of columns in the model."""
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        """Returns True if the given parent has children, even if they have not been fetched yet."""
+        if not parent.isValid():
+            return self.rowCount(parent) > 0
+        kind, key = self.__get_node(parent)
+        if kind == self._KIND_TERM:
+            return len(self._term_groups[key]) > 0
+        if kind == self._KIND_GROUP:
+            return len(self._group_files[key]) > 0
+        if kind == self._KIND_FILE:
+            return len(self._file_hits[key]) > 0
+        if kind == self._KIND_HIT:
+            return self._hit_offsets[key] >= 0 and self._contexts.get(key) != []
+        return False
+
+    def canFetchMore(self, parent):
+        """Returns True if the given row has children that have not been loaded yet."""
+        # Views may try to fetch while reacting to an insertion: defer them until it is complete.
+        if not parent.isValid() or self._inserting:
+            return False
+        kind, key = self.__get_node(parent)
+        if kind == self._KIND_GROUP:
+            return self._group_fetched[key] < len(self._group_files[key])
+        if kind == self._KIND_FILE:
+            return self._file_fetched[key] < len(self._file_hits[key])
+        if kind == self._KIND_HIT:
+            return self._hit_offsets[key] >= 0 and key not in self._contexts
+        return False
+
+    def fetchMore(self, parent):
+        """
+        Loads the children of the given row: the next batch of files of a snapshot,
+        the next batch of hits of a file, or the context lines of a hit read from the file.
+        """
+        if not self.canFetchMore(parent):
+            return
+        kind, key = self.__get_node(parent)
+        if kind == self._KIND_GROUP:
+            self.__expose_rows(parent, self._group_fetched, key, len(self._group_files[key]))
+        elif kind == self._KIND_FILE:
+            self.__expose_rows(parent, self._file_fetched, key, len(self._file_hits[key]))
+        elif kind == self._KIND_HIT:
+            context = read_line_context(self.__get_hit_source(key), self._hit_offsets[key], self.CONTEXT_LINES, self.CONTEXT_LINES)
+            if not context:
+                self._contexts[key] = []
+                return
+            with self.__inserting_rows(parent, 0, len(context) - 1):
+                self._contexts[key] = context
+
+    def index(self, row, column, parent=QModelIndex()):
+        """Returns the index of the item at the given row and column under the given parent."""
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            kind = self._KIND_TERM if self._group_by_term else self._KIND_GROUP
+            return self.createIndex(row, column, kind)
+        kind, key = self.__get_node(parent)
+        if kind == self._KIND_TERM:
+            return self.createIndex(row, column, self.__make_id(self._KIND_GROUP, key + 1))
+        return self.createIndex(row, column, self.__make_id(kind + 1, key))
+
+    def parent(self, index):
+        """Returns the parent of the given index."""
+        if not index.isValid():
+            return QModelIndex()
+        kind, parent_key = self.__split_id(index.internalId())
+        if kind == self._KIND_TERM or (kind == self._KIND_GROUP and parent_key == 0):
+            return QModelIndex()
+        if kind == self._KIND_GROUP:
+            return self.createIndex(parent_key - 1, 0, self._KIND_TERM)
+        if kind == self._KIND_FILE:
+            return self.createIndex(self._group_rows[parent_key], 0, self.__get_group_internal_id(parent_key))
+        if kind == self._KIND_HIT:
+            return self.createIndex(self._file_rows[parent_key], 0, self.__make_id(self._KIND_FILE, self._file_groups[parent_key]))
+        return self.createIndex(self._hit_rows[parent_key], 0, self.__make_id(self._KIND_HIT, self._hit_files[parent_key]))
 
-            files_in_snapshot = {}
-            for res in snapshot_results:
-                file_path_str = str(res.file_path)
-                if file_path_str not in files_in_snapshot:
-                    files_in_snapshot[file_path_str] = []
-                files_in_snapshot[file_path_str].append(res)
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        """
+        Returns the data for a given index and role.
 
-            for file_path_str, file_results in files_in_snapshot.items():
-                file_item = QStandardItem(file_path_str)
-                file_item.setEditable(False)
-                snapshot_item.appendRow(file_item)
+        Args:
+            index (QModelIndex): The index to retrieve data for.
+            role (Qt.ItemDataRole): The role for which to retrieve data. FILE_PATH_ROLE
+                                    returns the file a row refers to, SOURCE_PATH_ROLE
+                                    the file its content is read from (the blob of a
+                                    snapshot stored in the blob store, or the file itself).
 
-            self.model.appendRow(snapshot_item)
+        Returns:
+            Any: The term or snapshot name with its hit count, the file path, the
+                 matching line or a context line, prefixed by their line number.
+        """
+        if not index.isValid():
+            return None
+        kind, key = self.__get_node(index)
+        if role == self.FILE_PATH_ROLE:
+            if kind == self._KIND_FILE:
+                return self._paths[self._file_paths[key]]
+            if kind == self._KIND_HIT:
+                return self.__get_hit_path(key)
+            if kind == self._KIND_CONTEXT:
+                return self.__get_hit_path(key[0])
+            return None
+        if role == self.SOURCE_PATH_ROLE:
+            if kind == self._KIND_FILE:
+                return self.__get_source_path(self._file_paths[key])
+            if kind == self._KIND_HIT:
+                return self.__get_hit_source(key)
+            if kind == self._KIND_CONTEXT:
+                return self.__get_hit_source(key[0])
+            return None
+        if role == Qt.ItemDataRole.ForegroundRole and kind == self._KIND_CONTEXT and key[1][0] != 0:
+            return QColor(Qt.GlobalColor.gray)
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if kind == self._KIND_TERM:
+            return f"{self._term_names[key]} ({self._term_hits[key]})"
+        if kind == self._KIND_GROUP:
+            return f"{self._group_names[key]} ({self._group_hits[key]})"
+        if kind == self._KIND_FILE:
+            return self._paths[self._file_paths[key]]
+        if kind == self._KIND_HIT:
+            return f"{self._hit_lines[key]}: {self.__get_hit_text(key)}"
+        hit_id, (distance, line) = key
+        return f"{self._hit_lines[hit_id] + distance}: {line}"
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        """Returns the header data for a given section, orientation, and role."""
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return f"Risultati ({self._results_count})" if self._results_count else "Risultati"
+        return None
+
+    def flags(self, index):
+        """Returns the item flags: results are selectable but not editable."""
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def clear(self, group_by_term: bool = False):
+        """
+        Removes all the results and resets the header.
+
+        Args:
+            group_by_term (bool): Whether the next results are grouped by their searched
+                                  term, as in a multi-term search.
+        """
+        self.beginResetModel()
+        self._group_by_term = group_by_term
+        self.__reset_data()
+        self.endResetModel()
+        self.headerDataChanged.emit(Qt.Orientation.Horizontal, 0, 0)
+
+    def get_results_count(self) -> int:
+        """Returns the number of results currently in the model."""
+        return self._results_count
+
+    def append_results(self, results: list[SnapshotSearchResult]):
+        """
+        Adds a batch of search results to the model, grouped by term (if enabled),
+        snapshot and file. Content matches become child rows of their file; rows of
+        new files and hits are exposed only when the view fetches them.
+
+        Args:
+            results (list[SnapshotSearchResult]): The results to add.
+        """
+        if not results:
+            return
+        touched: set[int] = set()
+        for res in results:
+            term_row = self.__get_term_row(res.searched_text if self._group_by_term else "")
+            group_id = self._term_group_ids[term_row].get(res.snapshot_name)
+            if group_id is None:
+                group_id = self.__add_group(term_row, res.snapshot_name)
+            path_id = self.__intern_path(str(res.file_path))
+            source_path = getattr(res, "source_path", None)
+            if source_path is not None:
+                self._source_paths[path_id] = str(source_path)
+            file_ids = self._group_file_ids[group_id]
+            file_id = file_ids.get(path_id)
+            if file_id is None:
+                file_id = file_ids[path_id] = self.__add_file(group_id, path_id)
+            if res.line_number is not None:
+                self.__add_hit(file_id, res)
+            self._group_hits[group_id] += 1
+            self._term_hits[term_row] += 1
+            touched.add(group_id)
+
+        self._results_count += len(results)
+        for group_id in sorted(touched):
+            group_index = self.createIndex(self._group_rows[group_id], 0, self.__get_group_internal_id(group_id))
+            # Fill the first batch right away, the rest is exposed through fetchMore.
+            if self._group_fetched[group_id] < self.FETCH_BATCH_SIZE:
+                total = min(len(self._group_files[group_id]), self.FETCH_BATCH_SIZE)
+                self.__expose_rows(group_index, self._group_fetched, group_id, total)
+            self.dataChanged.emit(group_index, group_index, [Qt.ItemDataRole.DisplayRole])
+            if self._group_by_term:
+                term_index = self.parent(group_index)
+                self.dataChanged.emit(term_index, term_index, [Qt.ItemDataRole.DisplayRole])
+        self.headerDataChanged.emit(Qt.Orientation.Horizontal, 0, 0)
+
+    def populate_from_results(self, results: list[SnapshotSearchResult], group_by_term: bool = False):
+        """
+        Populates the tree model with search results, grouped by snapshot.
+
+        Args:
+            results (list[SnapshotSearchResult]): The list of search results to display.
+            group_by_term (bool): Whether to group the snapshots by searched term.
+        """
+        self.clear(group_by_term)
+        self.append_results(results)
+
+    def __make_id(self, kind: int, parent_key: int) -> int:
+        return (parent_key << self._KIND_BITS) | kind
+
+    def __split_id(self, internal_id: int) -> tuple[int, int]:
+        return internal_id & ((1 << self._KIND_BITS) - 1), internal_id >> self._KIND_BITS
+
+    def __get_group_internal_id(self, group_id: int) -> int:
+        """Returns the internal id of the index of a group."""
+        parent_key = self._group_terms[group_id] + 1 if self._group_by_term else 0
+        return self.__make_id(self._KIND_GROUP, parent_key)
+
+    def __get_node(self, index: QModelIndex):
+        """Returns the kind of a row and its key: term row, group id, file id, hit id or (hit id, context line)."""
+        kind, parent_key = self.__split_id(index.internalId())
+        row = index.row()
+        if kind == self._KIND_TERM:
+            return kind, row
+        if kind == self._KIND_GROUP:
+            return kind, self._term_groups[max(parent_key - 1, 0)][row]
+        if kind == self._KIND_FILE:
+            return kind, self._group_files[parent_key][row]
+        if kind == self._KIND_HIT:
+            return kind, self._file_hits[parent_key][row]
+        return kind, (parent_key, self._contexts[parent_key][row])
+
+    def __get_term_row(self, term: str) -> int:
+        row = self._term_rows.get(term)
+        if row is not None:
+            return row
+        row = len(self._term_names)
+        with self.__inserting_rows(QModelIndex(), row, row, self._group_by_term):
+            self._term_names.append(term)
+            self._term_rows[term] = row
+            self._term_hits.append(0)
+            self._term_groups.append(array("I"))
+            self._term_group_ids.append({})
+        return row
+
+    def __add_group(self, term_row: int, snapshot_name: str) -> int:
+        group_id = len(self._group_names)
+        groups = self._term_groups[term_row]
+        parent = self.index(term_row, 0) if self._group_by_term else QModelIndex()
+        with self.__inserting_rows(parent, len(groups), len(groups)):
+            self._group_names.append(snapshot_name)
+            self._group_terms.append(term_row)
+            self._group_rows.append(len(groups))
+            self._group_hits.append(0)
+            self._group_fetched.append(0)
+            self._group_files.append(array("I"))
+            self._group_file_ids.append({})
+            self._term_group_ids[term_row][snapshot_name] = group_id
+            groups.append(group_id)
+        return group_id
+
+    def __add_file(self, group_id: int, path_id: int) -> int:
+        file_id = len(self._file_paths)
+        self._file_rows.append(len(self._group_files[group_id]))
+        self._group_files[group_id].append(file_id)
+        self._file_paths.append(path_id)
+        self._file_groups.append(group_id)
+        self._file_fetched.append(0)
+        self._file_hits.append(array("I"))
+        return file_id
+
+    def __add_hit(self, file_id: int, res: SnapshotSearchResult):
+        hit_id = len(self._hit_files)
+        hits = self._file_hits[file_id]
+        self._hit_files.append(file_id)
+        self._hit_rows.append(len(hits))
+        self._hit_lines.append(res.line_number)
+        offset = getattr(res, "byte_offset", None)
+        self._hit_offsets.append(-1 if offset is None else offset)
+        if offset is None:
+            self._hit_texts[hit_id] = res.line_content or ""
+        hits.append(hit_id)
+
+    def __intern_path(self, path: str) -> int:
+        path_id = self._path_ids.get(path)
+        if path_id is None:
+            path_id = self._path_ids[path] = len(self._paths)
+            self._paths.append(path)
+        return path_id
+
+    def __get_hit_path(self, hit_id: int) -> str:
+        return self._paths[self._file_paths[self._hit_files[hit_id]]]
+
+    def __get_source_path(self, path_id: int) -> str:
+        return self._source_paths.get(path_id, self._paths[path_id])
+
+    def __get_hit_source(self, hit_id: int) -> str:
+        return self.__get_source_path(self._file_paths[self._hit_files[hit_id]])
+
+    def __get_hit_text(self, hit_id: int) -> str:
+        """Returns the stripped text of a matching line, reading it back from the file on first use."""
+        text = self._hit_texts.get(hit_id)
+        if text is not None:
+            return text
+        text = self._line_cache.get(hit_id)
+        if text is None:
+            context = read_line_context(self.__get_hit_source(hit_id), self._hit_offsets[hit_id], 0, 0)
+            text = context[0][1].strip() if context else ""
+            self._line_cache[hit_id] = text
+            if len(self._line_cache) > self.LINE_CACHE_SIZE:
+                self._line_cache.popitem(last=False)
+        else:
+            self._line_cache.move_to_end(hit_id)
+        return text
+
+    def __expose_rows(self, parent: QModelIndex, fetched: array, key: int, total: int):
+        """Exposes the rows of a parent up to `total`, at most one batch at a time."""
+        current = fetched[key]
+        count = min(total, current + self.FETCH_BATCH_SIZE)
+        if count <= current:
+            return
+        with self.__inserting_rows(parent, current, count - 1):
+            fetched[key] = count
+
+    @contextmanager
+    def __inserting_rows(self, parent: QModelIndex, first: int, last: int, notify: bool = True):
+        """Wraps a change of the data that inserts rows; with notify False the rows are not visible and no signal is sent."""
+        if not notify:
+            yield
+            return
+        self._inserting = True
+        try:
+            self.beginInsertRows(parent, first, last)
+            yield
+            self.endInsertRows()
+        finally:
+            self._inserting = False
 
 
 class CatalogueSearcherModel(QObject):
@@ -282,13 +753,19 @@ class CatalogueSearcherModel(QObject):
         super().__init__()
         self.catalogue = catalogue
         self.table_model = SearchResultsTableModel()
-        self.tree_model_manager = SearchResultsTreeModel()
+        self.tree_model = SearchResultsTreeModel()
         self.runner = OperationRunner()
 
         self._current_message = "In attesa..."
         self._current_progress = 0
         self._current_eta = "--:--"
 
+        # The status card is refreshed at most once per interval, with the latest values.
+        self._status_timer = QTimer(self)
+        self._status_timer.setSingleShot(True)
+        self._status_timer.setInterval(UPDATE_INTERVAL_MS)
+        self._status_timer.timeout.connect(self.__emit_status_update)
+
         self.runner.runner_start.connect(self.signal_search_started)
         self.runner.runner_stop.connect(self.signal_search_stopped)
         self.runner.runner_finish.connect(self.on_runner_finished)
@@ -301,6 +778,35 @@ class CatalogueSearcherModel(QObject):
         self.runner.op_eta_update.connect(self.on_eta_update)
 
         self._op_id_to_snap_id = {}
+        self._search_stats = SnapshotSearchStats()
+        self._executor: ProcessPoolExecutor | None = None
+        self._executor_workers = 0
+        self._result_cache = SearchResultCache(PATH_SEARCH_CACHE)
+
+    def __get_executor(self) -> ProcessPoolExecutor | None:
+        """
+        Returns the process pool used by the search tasks, creating it on first use.
+        The pool is kept between searches and recreated only if the number of workers changes.
+
+        Returns:
+            ProcessPoolExecutor | None: The pool, or None if parallel search is disabled.
+        """
+        workers = app_settings.get(AppSettings.search_workers)
+        if workers <= 1:
+            self.dispose()
+            return None
+        if self._executor is None or self._executor_workers != workers:
+            self.dispose()
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+            self._executor_workers = workers
+        return self._executor
+
+    def dispose(self):
+        """Shuts down the search process pool, if any."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._executor_workers = 0
 
     def __get_runner_operations(self, params: SnapshotSearchParams) -> list[Operation]:
         """
@@ -314,8 +820,12 @@ class CatalogueSearcherModel(QObject):
         """
         ops = []
         self._op_id_to_snap_id.clear()
+        executor = self.__get_executor() if params.search_target == SearchTarget.FILE_CONTENT else None
+        max_file_size = app_settings.get(AppSettings.search_max_file_size) * 1024 * 1024
         for snap in self.table_model.get_data():
-            current_task = SnapSearchTask(params=params, snapshot=snap, catalogue=self.catalogue)
+            current_task = SnapSearchTask(params=params, snapshot=snap, catalogue=self.catalogue, executor=executor,
+                                          max_file_size=max_file_size, cache=self._result_cache)
+            current_task.task_results_found.connect(self.on_task_results_found)
             op = Operation([current_task], OperationInfo(delay_each_task=0.0, name=f"Search in {snap.name})",
                                                  description="Searching snapshot contents"))
             self._op_id_to_snap_id[op.id] = snap.id
@@ -336,7 +846,7 @@ class CatalogueSearcherModel(QObject):
             snapshots = self.catalogue.get_all()
         self.table_model.update_data(snapshots)
 
-    def search(self, text: str, query_type: QueryType, search_target: SearchTarget, extensions: list[str]):
+    def search(self, text: str, search_mode: SearchMode, search_target: SearchTarget, extensions: list[str]):
         """
         Starts a new search operation.
 
@@ -344,31 +854,40 @@ class CatalogueSearcherModel(QObject):
         and starts the operation runner.
 
         Args:
-            text (str): The text or regex pattern to search for.
-            query_type (QueryType): The type of query (TEXT or REGEX).
+            text (str): The text or regex pattern to search for, or the terms separated
+                        by ';' in multi-term mode.
+            search_mode (SearchMode): The query mode (TEXT, REGEX or MULTI_TERM).
             search_target (SearchTarget): The target of the search (FILE_NAME or FILE_CONTENT).
             extensions (list[str]): A list of file extensions to filter by.
         """
         self.table_model.reset_search_state()
-        self.tree_model_manager.clear()
+        self.tree_model.clear(group_by_term=search_mode == SearchMode.MULTI_TERM)
+        self._search_stats = SnapshotSearchStats()
         self._current_message = "Avvio..."
         self._current_progress = 0
         self._current_eta = "--:--"
-        self.signal_status_card_update.emit(self._current_message, self._current_progress, self._current_eta)
+        self.__emit_status_update()
 
-        params = SnapshotSearchParams(
-            query=text,
-            query_type=query_type,
-            search_target=search_target,
-            extensions=extensions
-        )
+        if search_mode == SearchMode.MULTI_TERM:
+            params = MultiTermSearchParams.from_text(text, search_target, extensions)
+        else:
+            params = SnapshotSearchParams(
+                query=text,
+                query_type=search_mode.query_type,
+                search_target=search_target,
+                extensions=extensions
+            )
         operations = self.__get_runner_operations(params)
         self.runner.clear()
         self.runner.adds(operations)
         self.runner.start()
 
     def stop_search(self):
-        """Stops the ongoing search operation."""
+        """Stops the ongoing search operation, cancelling the chunks still queued in the process pool."""
+        for op in self.runner._all_operations:
+            for task in op.tasks:
+                if isinstance(task, SnapSearchTask):
+                    task.cancel()
         self.runner.stop()
 
     def on_operation_status_changed(self, op_id: str, status: OperationStatus):
@@ -404,7 +923,7 @@ class CatalogueSearcherModel(QObject):
         """
         self._current_message = "Ricerca in corso..."
         self._current_eta = "--:--"
-        self.signal_status_card_update.emit(self._current_message, self._current_progress, self._current_eta)
+        self.__request_status_update()
 
     def on_task_update_message(self, task_name: str, message: str):
         """
@@ -415,7 +934,17 @@ class CatalogueSearcherModel(QObject):
             message (str): The new message.
         """
         self._current_message = message
-        self.signal_status_card_update.emit(self._current_message, self._current_progress, self._current_eta)
+        self.__request_status_update()
+
+    def on_task_results_found(self, task_name: str, results: list[SnapshotSearchResult]):
+        """
+        Slot to handle a batch of results found by a running task. Appends them to the results tree.
+
+        Args:
+            task_name (str): The name of the task.
+            results (list[SnapshotSearchResult]): The results found since the previous batch.
+        """
+        self.tree_model.append_results(results)
 
     def on_runner_progress(self, progress: int):
         """
@@ -425,7 +954,7 @@ class CatalogueSearcherModel(QObject):
             progress (int): The overall progress percentage.
         """
         self._current_progress = progress
-        self.signal_status_card_update.emit(self._current_message, self._current_progress, self._current_eta)
+        self.__request_status_update()
 
     def on_eta_update(self, op_id: str, eta: str):
         """
@@ -436,25 +965,27 @@ class CatalogueSearcherModel(QObject):
             eta (str): The new estimated time remaining string.
         """
         self._current_eta = eta
-        self.signal_status_card_update.emit(self._current_message, self._current_progress, self._current_eta)
+        self.__request_status_update()
 
     def on_runner_finished(self, statistics: RunnerStatistics):
         """
         Slot to handle the completion of all search operations.
 
-        Aggregates all results and populates the results tree.
+        Reports the index statistics. The results tree is already populated by the
+        batches streamed from the tasks while they were running.
 
         Args:
             statistics (RunnerStatistics): Statistics about the completed run.
         """
-        self.signal_search_finished.emit()
-        all_results = []
         for op in self.runner._all_operations:
-            task_results = op.get_task_results()
-            if task_results and task_results[0]:
-                all_results.extend(task_results[0])
-
-        self.tree_model_manager.populate_from_results(all_results)
+            for task in op.tasks:
+                if isinstance(task, SnapSearchTask):
+                    self._search_stats.add(task.stats)
+        self._current_message = self.__get_index_stats_message("Ricerca completata")
+        self._current_progress = 100
+        self._current_eta = "00:00"
+        self.__emit_status_update()
+        self.signal_search_finished.emit()
 
     def on_operation_finished(self, op: Operation):
         """
@@ -480,4 +1011,37 @@ class CatalogueSearcherModel(QObject):
         elif op.is_failed():
             count_str = "?"
 
-        self.table_model.update_results_for_snapshot(snap_id, count_str)
\ No newline at end of file
+        self.table_model.update_results_for_snapshot(snap_id, count_str)
+
+    def __request_status_update(self):
+        """Schedules a refresh of the status card, coalescing the updates received in the meantime."""
+        if not self._status_timer.isActive():
+            self._status_timer.start()
+
+    def __emit_status_update(self):
+        """Refreshes the status card immediately with the current message, progress and ETA."""
+        self._status_timer.stop()
+        self.signal_status_card_update.emit(self._current_message, self._current_progress, self._current_eta)
+
+    def __get_index_stats_message(self, prefix: str) -> str:
+        """
+        Builds the status message reporting how many files were excluded by the index
+        and how many were actually scanned.
+
+        Args:
+            prefix (str): The text shown before the statistics.
+
+        Returns:
+            str: The status message.
+        """
+        stats = self._search_stats
+        if stats.files_total == 0:
+            if stats.cache_hits:
+                return f"{prefix}: {stats.cache_hits} snapshot dalla cache"
+            return prefix
+        message = f"{prefix}: {stats.index_hits} file esclusi dall'indice, {stats.files_scanned} file scansionati su {stats.files_total}"
+        if stats.files_skipped:
+            message += f", {stats.files_skipped} file troppo grandi ignorati"
+        if stats.cache_hits:
+            message += f", {stats.cache_hits} snapshot dalla cache"
+        return message
@@ -1,7 +1,6 @@
 from pathlib import Path
 
 from loguru import logger
-from pylizlib.core.os.snap import SnapshotCatalogue
 from pylizlib.qt.domain.view import UiWidgetMode
 from pylizlib.qt.handler.operation_core import Operation
 from pylizlib.qt.handler.operation_domain import OperationInfo
@@ -9,8 +8,11 @@ from pylizlib.qt.handler.operation_runner import OperationRunner, RunnerStatisti
 from PySide6.QtCore import QObject, Signal
 
 from atomdev.application.app import app_settings, AppSettings, PATH_BACKUPS, snap_settings
+from atomdev.core.backup import BackupRetention
+from atomdev.core.catalogue import DevlizSnapshotCatalogue
 from atomdev.domain.data import DevlizData
-from atomdev.model.devliz_update import TaskGetMonitoredSoftware, TaskGetSnapshots
+from atomdev.model.devliz_update import TaskGetMonitoredSoftware, TaskGetSnapshots, TaskPruneBackups
+from atomdev.model.runner import DedicatedOperationRunner
 from atomdev.view.dashboard import DashboardView
 
 
@@ -26,9 +28,13 @@ class DashboardModel(QObject):
         super().__init__()
         self.cached_data: DevlizData | None = None
         self.view = view
-        self.snap_catalogue = SnapshotCatalogue(
+        self.snap_catalogue = DevlizSnapshotCatalogue(
             path_catalogue=Path(app_settings.get(AppSettings.catalogue_path)),
-            settings=snap_settings
+            settings=snap_settings,
+            use_blob_store=app_settings.get(AppSettings.catalogue_blob_store),
+            delta_install=app_settings.get(AppSettings.delta_install),
+            staged_install=app_settings.get(AppSettings.staged_install),
+            link_duplicates=app_settings.get(AppSettings.link_duplicates)
         )
         self.task_monitored_soft = TaskGetMonitoredSoftware()
         self.task_snap = TaskGetSnapshots(self.snap_catalogue)
@@ -41,6 +47,9 @@ class DashboardModel(QObject):
         self.runner.runner_start.connect(self.on_runner_started)
         self.runner.runner_stop.connect(self.on_runner_stopped)
         self.runner.runner_finish.connect(self.on_runner_finished)
+        # La pulizia dei backup non deve attendere (né ritardare) l'aggiornamento della dashboard
+        self.backup_runner = DedicatedOperationRunner()
+        self.backup_runner.runner_finish.connect(self.on_backups_pruned)
 
 
     def get_cached_data(self) -> DevlizData | None:
@@ -56,11 +65,31 @@ class DashboardModel(QObject):
             op = Operation(tasks, self.operation_info)
             self.runner.add(op)
             self.runner.start()
+            # Ogni operazione che crea backup è seguita da un aggiornamento
+            self.prune_backups()
 
         except Exception as e:
             logger.error(f"Errore durante il lancio dell'aggiornamento: {e}")
             return
 
+    def prune_backups(self):
+        store = self.snap_catalogue.backup_store
+        if store is None:
+            return
+        retention = BackupRetention(
+            max_count=app_settings.get(AppSettings.backup_max_count),
+            max_age_days=app_settings.get(AppSettings.backup_max_age_days),
+            max_size=app_settings.get(AppSettings.backup_max_size_gb) * 1024 * 1024 * 1024,
+        )
+        op = Operation([TaskPruneBackups(store, retention)], OperationInfo(name="Pulizia backup", description="Eliminazione dei backup oltre i limiti di conservazione", delay_each_task=0.0))
+        self.backup_runner.clear()
+        self.backup_runner.add(op)
+        self.backup_runner.start()
+
+    def on_backups_pruned(self, stats: RunnerStatistics):
+        if stats.has_ops_failed():
+            logger.error(f"Errore durante la pulizia dei backup: {stats.get_first_error()}")
+
     def on_runner_started(self):
         logger.info("Aggiornamento Dashboard iniziato.")
         self.signal_on_update_started.emit()
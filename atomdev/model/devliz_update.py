@@ -1,13 +1,15 @@
 from pathlib import Path
 from time import sleep
 
-from pylizlib.core.os.snap import Snapshot, SnapshotUtils, SnapshotCatalogue
+from pylizlib.core.os.snap import Snapshot, SnapshotUtils
 from pylizlib.core.os.utils import is_software_installed, WindowsOsUtils
 from pylizlib.qt.handler.operation_core import Task
 from pylizlib.qtfw.domain.sw import SoftwareData
 from qfluentwidgets import FluentIcon
 
 from atomdev.application.app import app_settings, AppSettings
+from atomdev.core.backup import BackupStore, BackupRetention
+from atomdev.core.catalogue import DevlizSnapshotCatalogue
 
 
 class TaskGetMonitoredSoftware(Task):
@@ -37,9 +39,23 @@ class TaskGetMonitoredSoftware(Task):
 
 class TaskGetSnapshots(Task):
 
-    def __init__(self, catalogue: SnapshotCatalogue):
+    def __init__(self, catalogue: DevlizSnapshotCatalogue):
         super().__init__("Recupero snapshots salvati")
         self.catalogue = catalogue
 
     def execute(self):
-        return self.catalogue.get_all()
+        snapshots = self.catalogue.get_all()
+        # Load the manifests here, off the GUI thread, so the views read them from memory.
+        self.catalogue.load_manifests(snapshots)
+        return snapshots
+
+
+class TaskPruneBackups(Task):
+
+    def __init__(self, store: BackupStore, retention: BackupRetention):
+        super().__init__("Pulizia backup")
+        self.store = store
+        self.retention = retention
+
+    def execute(self):
+        return self.store.prune(self.retention)
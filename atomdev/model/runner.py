@@ -0,0 +1,27 @@
+from PySide6.QtCore import QThreadPool
+from pylizlib.qt.handler.operation_runner import OperationRunner
+
+
+class DedicatedOperationRunner(OperationRunner):
+    """
+    An OperationRunner with its own thread pool.
+
+    The pylizlib runner uses the global QThreadPool, so the operations of every
+    runner of the application queue behind each other. Background work that must
+    start immediately, whatever else is running, uses a runner of this kind.
+    """
+
+    def __init__(self, max_threads: int = 1, abort_all_on_error: bool = False):
+        """
+        Initializes the DedicatedOperationRunner.
+
+        Args:
+            max_threads (int): The number of threads of the pool.
+            abort_all_on_error (bool): Whether to stop the remaining operations when one fails.
+        """
+        max_global_threads = QThreadPool.globalInstance().maxThreadCount()
+        super().__init__(max_threads=max_threads, abort_all_on_error=abort_all_on_error)
+        # The base class also resizes the global pool: restore it.
+        QThreadPool.globalInstance().setMaxThreadCount(max_global_threads)
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(max_threads)
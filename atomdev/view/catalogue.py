@@ -1,17 +1,23 @@
 from pathlib import Path
 
-from PySide6.QtCore import Signal, Qt, QMargins, QModelIndex
+from PySide6.QtCore import Signal, Qt, QMargins, QModelIndex, QTimer
 from PySide6.QtGui import QActionGroup
 from PySide6.QtWidgets import QHBoxLayout, QWidget, QHeaderView
+from pylizlib.core.data.unit import get_normalized_gb_mb_str
 from pylizlib.core.os.snap import Snapshot, SnapshotSortKey
 from qfluentwidgets import SearchLineEdit, Action, FluentIcon, CommandBar, setFont, BodyLabel, RoundMenu, \
-    TransparentDropDownPushButton, CheckableMenu, MenuIndicatorType, TableView
+    TransparentDropDownPushButton, CheckableMenu, MenuIndicatorType, TableView, StateToolTip
 
 from atomdev.application.app import app_settings, AppSettings
+from atomdev.domain.data import CatalogueStats
 from atomdev.model.catalogue import CatalogueModel
 from atomdev.view.util.frame import DevlizQFrame
 
 
+# Attesa dopo l'ultimo tasto prima di filtrare il catalogo
+SEARCH_DEBOUNCE_MS = 150
+
+
 class SnapshotCatalogueUiBuilder:
 
     def __init__(self, parent):
@@ -21,8 +27,10 @@ class SnapshotCatalogueUiBuilder:
 class SnapshotCatalogueWidget(DevlizQFrame):
     signal_import_requested = Signal()
     signal_sort_requested = Signal(SnapshotSortKey)
+    signal_sort_order_requested = Signal(bool)
     signal_edit_requested = Signal(Snapshot)
     signal_install_requested = Signal(Snapshot)
+    signal_rollback_install_requested = Signal(Snapshot)
     signal_delete_requested = Signal(Snapshot)
     signal_delete_installed_folders_requested = Signal(Snapshot)
     signal_open_folder_requested = Signal(Snapshot)
@@ -33,6 +41,7 @@ class SnapshotCatalogueWidget(DevlizQFrame):
     signal_export_request_snapshot = Signal(Snapshot)
     signal_export_request_assoc_folders = Signal(Snapshot)
     signal_update_with_local_dirs_requested = Signal(Snapshot)
+    signal_export_cancel_requested = Signal()
 
     def __init__(self, model: CatalogueModel, parent=None):
         super().__init__(name="Catalogo", parent=parent)
@@ -46,12 +55,21 @@ class SnapshotCatalogueWidget(DevlizQFrame):
         self.__setup_table()
         self.__setup_footer()
 
+        self.model.signal_stats_changed.connect(self.__on_stats_changed)
+        self.model.signal_export_progress.connect(self.__on_export_progress)
+        self.export_tooltip: StateToolTip | None = None
+
     def __setup_label(self):
         self.install_label_title()
 
     def __setup_action_bar(self):
         self.search_line_edit = SearchLineEdit(self)
-        self.search_line_edit.textChanged.connect(self.model.filter)
+        self.search_line_edit.setPlaceholderText('Cerca (es. speedy tag:JIRA autore:"Mario Rossi")')
+        self.search_line_edit.textChanged.connect(self.__on_search_text_changed)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(lambda: self.model.filter(self.search_line_edit.text()))
 
         self.action_import = Action(FluentIcon.ADD, 'Importa', triggered=lambda: self.signal_import_requested.emit())
         self.action_edit = Action(FluentIcon.EDIT, 'Modifica', enabled=False,triggered=lambda: self.signal_edit_requested.emit())
@@ -103,6 +121,18 @@ class SnapshotCatalogueWidget(DevlizQFrame):
             action_sort_date_dim_mb_assoc,
         ])
 
+        # Il verso vale per qualsiasi criterio, anche scelto dopo
+        action_sort_ascending = Action(FluentIcon.UP, "Crescente", checkable=True, triggered=lambda: self.signal_sort_order_requested.emit(False))
+        action_sort_descending = Action(FluentIcon.DOWN, "Decrescente", checkable=True, triggered=lambda: self.signal_sort_order_requested.emit(True))
+        action_sort_ascending.setChecked(True)
+
+        action_sort_order_group = QActionGroup(self)
+        action_sort_order_group.addAction(action_sort_ascending)
+        action_sort_order_group.addAction(action_sort_descending)
+
+        menu.addSeparator()
+        menu.addActions([action_sort_ascending, action_sort_descending])
+
         if pos is not None:
             menu.exec(pos, ani=True)
 
@@ -193,6 +223,7 @@ class SnapshotCatalogueWidget(DevlizQFrame):
 
         menu = RoundMenu()
         menu.addAction(Action(FluentIcon.DOWN, "Installa", triggered=lambda: self.signal_install_requested.emit(config)))
+        menu.addAction(Action(FluentIcon.HISTORY, "Ripristina installazione precedente", triggered=lambda: self.signal_rollback_install_requested.emit(config)))
         menu.addAction(Action(FluentIcon.EDIT, "Modifica", triggered=lambda: self.signal_edit_requested.emit(config)))
         menu.addAction(Action(FluentIcon.SEARCH, "Cerca contenuto",triggered=lambda: self.signal_search_internal_content_single.emit(config)))
         menu.addAction(Action(FluentIcon.UP, "Aggiorna con locali", triggered=lambda: self.signal_update_with_local_dirs_requested.emit(config)))
@@ -224,12 +255,64 @@ class SnapshotCatalogueWidget(DevlizQFrame):
         self._distribuisci_colonne_perc()
         super(type(self.table), self.table).resizeEvent(event)
 
+    def __on_search_text_changed(self, text: str):
+        # Il filtro parte solo quando l'utente smette di digitare; svuotare la ricerca è immediato
+        if text:
+            self.search_timer.start()
+        else:
+            self.search_timer.stop()
+            self.model.filter("")
+
     def sort(self, method: SnapshotSortKey):
-        self.search_line_edit.clear()
+        # L'ordinamento mantiene la ricerca in corso
         self.model.sort(method)
 
+    def sort_order(self, descending: bool):
+        self.model.set_sort_descending(descending)
+
+    def __update_footer_stats(self, size: str):
+        self.footer_stats_label.setText(f"Totale configurazioni: {self.model.count()} ({size})")
+
+    def __on_stats_changed(self, stats: CatalogueStats):
+        size = f"{get_normalized_gb_mb_str(stats.size)}, {stats.files} file"
+        self.__update_footer_stats(size if stats.completed else f"{size}, calcolo in corso...")
+        if not stats.completed:
+            return
+        # Il dettaglio (dimensione per snapshot e file più grandi) è mostrato nel tooltip
+        lines = ["Dimensione per configurazione:"]
+        for snap in self.model.get_snapshots():
+            lines.append(f"  {snap.name}: {get_normalized_gb_mb_str(stats.snapshot_sizes.get(snap.id, 0))}")
+        if stats.largest_files:
+            lines.append("File più grandi:")
+            lines += [f"  {path} ({get_normalized_gb_mb_str(size)})" for size, path in stats.largest_files]
+        self.footer_stats_label.setToolTip("\n".join(lines))
+
+    def show_export_progress(self, title: str):
+        """Mostra l'avanzamento di un'esportazione; chiuderlo annulla l'esportazione."""
+        self.export_tooltip = StateToolTip(title, "Compressione in corso...", self.window())
+        self.export_tooltip.closedSignal.connect(self.signal_export_cancel_requested.emit)
+        self.export_tooltip.move(self.export_tooltip.getSuitablePos())
+        self.export_tooltip.show()
+
+    def hide_export_progress(self, text: str | None = None):
+        """Chiude l'avanzamento dell'esportazione, mostrando il risultato se indicato."""
+        if self.export_tooltip is None:
+            return
+        if text is not None and self.export_tooltip.isVisible():
+            self.export_tooltip.setContent(text)
+            self.export_tooltip.setState(True)
+        else:
+            self.export_tooltip.deleteLater()
+        self.export_tooltip = None
+
+    def __on_export_progress(self, progress: int):
+        if self.export_tooltip is not None:
+            self.export_tooltip.setContent(f"Compressione in corso... {progress}%")
+
     def reload_data(self):
-        self.footer_stats_label.setText(f"Totale configurazioni: {self.model.count()} ({self.model.get_mb_size()})")
+        # La dimensione in cache viene mostrata subito e aggiornata dal ricalcolo in background
+        self.__update_footer_stats(self.model.get_mb_size())
+        self.model.refresh_stats()
 
         # Aggiorna il path se necessario e le intestazioni della tabella
         new_path = app_settings.get(AppSettings.catalogue_path)
@@ -18,7 +18,10 @@ from qfluentwidgets import (
     ComboBox,
     RoundMenu
 )
-from pylizlib.core.os.snap import QueryType, SearchTarget
+from pylizlib.core.os.snap import SearchTarget
+
+from atomdev.core.query import SearchMode, MULTI_TERM_SEPARATOR
+from atomdev.model.catalogue_searcher import SearchResultsTreeModel
 
 
 class CatalogueSearcherView(QDialog):
@@ -32,11 +35,12 @@ class CatalogueSearcherView(QDialog):
     Signals:
         signal_delete_requested(int): Emitted when a user requests to remove a
                                       snapshot from the search list (row index).
-        signal_file_double_clicked(str): Emitted when a user double-clicks a file
-                                         in the results tree (file path).
+        signal_file_double_clicked(str, str): Emitted when a user double-clicks a file
+                                              in the results tree (file path and path of
+                                              the file holding its content).
     """
     signal_delete_requested = Signal(int)
-    signal_file_double_clicked = Signal(str)
+    signal_file_double_clicked = Signal(str, str)
 
     def __init__(self, parent=None):
         """
@@ -166,15 +170,15 @@ class CatalogueSearcherView(QDialog):
     def _on_tree_view_double_clicked(self, index: QModelIndex):
         """
         Handles the double-click event on the results tree view.
-        Emits signal_file_double_clicked if a file item is double-clicked.
+        Emits signal_file_double_clicked with the file of the clicked row, if any
+        (file rows, matching lines and their context).
 
         Args:
             index (QModelIndex): The model index of the clicked item.
         """
-        item = self.tree_view.model().itemFromIndex(index)
-        if item and item.parent():  # It's a child item (file path)
-            file_path = item.text()
-            self.signal_file_double_clicked.emit(file_path)
+        file_path = index.data(SearchResultsTreeModel.FILE_PATH_ROLE) if index.isValid() else None
+        if file_path:
+            self.signal_file_double_clicked.emit(file_path, index.data(SearchResultsTreeModel.SOURCE_PATH_ROLE))
 
     def _show_context_menu(self, pos):
         """
@@ -269,31 +273,35 @@ class CatalogueSearcherView(QDialog):
         action_group.setExclusive(True)
 
         self.action_query_type_map = {}
-        for query_type in QueryType:
-            action = Action(query_type.name.title(), self, checkable=True)
-            action.setData(query_type)
+        for search_mode in SearchMode:
+            action = Action(search_mode.name.replace("_", " ").title(), self, checkable=True)
+            action.setData(search_mode)
             action.triggered.connect(self._update_search_bar_placeholder)
-            self.action_query_type_map[query_type] = action
+            self.action_query_type_map[search_mode] = action
             action_group.addAction(action)
             menu.addAction(action)
 
         # Set default
-        self.action_query_type_map[QueryType.TEXT].setChecked(True)
+        self.action_query_type_map[SearchMode.TEXT].setChecked(True)
         return menu
 
     def _update_search_bar_placeholder(self):
         """Updates the search bar's placeholder text based on the selected search options."""
         target = self.get_selected_search_target()
-        query_type = self.get_selected_query_type()
+        search_mode = self.get_selected_search_mode()
 
-        if target == SearchTarget.FILE_CONTENT and query_type == QueryType.TEXT:
+        if target == SearchTarget.FILE_CONTENT and search_mode == SearchMode.TEXT:
             self.search_bar.setPlaceholderText("Cerca il contenuto di un file")
-        elif target == SearchTarget.FILE_CONTENT and query_type == QueryType.REGEX:
+        elif target == SearchTarget.FILE_CONTENT and search_mode == SearchMode.REGEX:
             self.search_bar.setPlaceholderText("Cerca il contenuto di un file usando una regex")
-        elif target == SearchTarget.FILE_NAME and query_type == QueryType.TEXT:
+        elif target == SearchTarget.FILE_CONTENT and search_mode == SearchMode.MULTI_TERM:
+            self.search_bar.setPlaceholderText(f"Cerca più testi nel contenuto dei file, separati da '{MULTI_TERM_SEPARATOR}'")
+        elif target == SearchTarget.FILE_NAME and search_mode == SearchMode.TEXT:
             self.search_bar.setPlaceholderText("Cerca il nome di un file")
-        elif target == SearchTarget.FILE_NAME and query_type == QueryType.REGEX:
+        elif target == SearchTarget.FILE_NAME and search_mode == SearchMode.REGEX:
             self.search_bar.setPlaceholderText("Cerca il nome di un file usando una regex")
+        elif target == SearchTarget.FILE_NAME and search_mode == SearchMode.MULTI_TERM:
+            self.search_bar.setPlaceholderText(f"Cerca più testi nel nome dei file, separati da '{MULTI_TERM_SEPARATOR}'")
 
     def get_selected_extensions(self) -> list[str]:
         """
@@ -315,17 +323,17 @@ class CatalogueSearcherView(QDialog):
             extensions.append(".xml")
         return extensions
 
-    def get_selected_query_type(self) -> QueryType:
+    def get_selected_search_mode(self) -> SearchMode:
         """
-        Retrieves the currently selected query type.
+        Retrieves the currently selected query mode.
 
         Returns:
-            QueryType: The selected QueryType enum member.
+            SearchMode: The selected SearchMode enum member.
         """
-        for query_type, action in self.action_query_type_map.items():
+        for search_mode, action in self.action_query_type_map.items():
             if action.isChecked():
-                return query_type
-        return QueryType.TEXT  # Default fallback
+                return search_mode
+        return SearchMode.TEXT  # Default fallback
 
     def get_selected_search_target(self) -> SearchTarget:
         """
@@ -340,7 +348,10 @@ class CatalogueSearcherView(QDialog):
         return SearchTarget.FILE_CONTENT  # Default fallback
 
     def set_operation_status(self, active: bool):
-        """Sets the UI state based on whether a search operation is active."""
+        """
+        Sets the UI state based on whether a search operation is active.
+        The status card stays visible after a search to show its final summary.
+        """
         is_enabled = not active
         self.search_bar.setEnabled(is_enabled)
         self.results_table.setEnabled(is_enabled)
@@ -350,8 +361,6 @@ class CatalogueSearcherView(QDialog):
 
         if active:
             self.status_card.show()
-        else:
-            self.status_card.hide()
 
     def update_status_card(self, text: str, value: int, eta: str = "--"):
         """Updates the status card with text, progress, and ETA."""
@@ -2,7 +2,7 @@ from PySide6.QtCore import Signal, Qt
 from PySide6.QtWidgets import QVBoxLayout
 from pylizlib.core.data.unit import get_normalized_gb_mb_str
 from pylizlib.qtfw.widgets.card import MasterListSettingCard
-from qfluentwidgets import PushSettingCard, FluentIcon, PushButton, SwitchSettingCard, OptionsSettingCard
+from qfluentwidgets import PushSettingCard, FluentIcon, PushButton, SwitchSettingCard, OptionsSettingCard, RangeSettingCard
 
 from atomdev.application.app import app, app_settings, AppSettings
 from atomdev.view.util.frame import DevlizQFrame
@@ -35,6 +35,7 @@ class WidgetSettings(DevlizQFrame):
 
     def __add_groups(self, layout: QVBoxLayout):
         self.__add_group_snapshot(layout)
+        self.__add_group_search(layout)
         self.__add_group_favorites(layout)
         self.__add_group_app(layout)
         self.__add_group_info(layout)
@@ -93,7 +94,7 @@ class WidgetSettings(DevlizQFrame):
         self.card_backup_before_install = SwitchSettingCard(
             icon=FluentIcon.BASKETBALL,
             title="Abilita backup pre-installazione",
-            content="Esegui il backup delle cartelle locali (presenti su questo pc) contenute nella configurazione prima di installarla",
+            content="Esegui il backup delle cartelle locali (presenti su questo pc) contenute nella configurazione prima di installarla (solo senza installazione transazionale, che conserva già la versione precedente)",
             configItem=setting_backup_before_install
         )
 
@@ -115,6 +116,84 @@ class WidgetSettings(DevlizQFrame):
             configItem=setting_backup_before_delete
         )
 
+        # Conservazione backup
+        setting_backup_max_count = AppSettings.backup_max_count
+        self.card_backup_max_count = RangeSettingCard(
+            setting_backup_max_count,
+            icon=FluentIcon.HISTORY,
+            title="Backup conservati per configurazione",
+            content="Numero di backup mantenuti per ogni configurazione; i più vecchi vengono eliminati automaticamente (0 = nessun limite)"
+        )
+        setting_backup_max_age_days = AppSettings.backup_max_age_days
+        self.card_backup_max_age_days = RangeSettingCard(
+            setting_backup_max_age_days,
+            icon=FluentIcon.CALENDAR,
+            title="Durata massima backup (giorni)",
+            content="I backup più vecchi vengono eliminati automaticamente, tranne l'ultimo di ogni configurazione (0 = nessun limite)"
+        )
+        setting_backup_max_size_gb = AppSettings.backup_max_size_gb
+        self.card_backup_max_size_gb = RangeSettingCard(
+            setting_backup_max_size_gb,
+            icon=FluentIcon.SAVE,
+            title="Spazio massimo backup (GB)",
+            content="Oltre questo spazio i backup più vecchi vengono eliminati, tranne l'ultimo di ogni configurazione (0 = nessun limite)"
+        )
+
+        # Archivio deduplicato
+        setting_blob_store = AppSettings.catalogue_blob_store
+        self.card_blob_store = SwitchSettingCard(
+            icon=FluentIcon.LIBRARY,
+            title="Archivio deduplicato",
+            content="Salva i file delle nuove configurazioni una sola volta nel catalogo, anche se presenti in più configurazioni",
+            configItem=setting_blob_store
+        )
+
+        # Installazione incrementale
+        setting_delta_install = AppSettings.delta_install
+        self.card_delta_install = SwitchSettingCard(
+            icon=FluentIcon.SYNC,
+            title="Installazione incrementale",
+            content="Durante l'installazione copia solo i file diversi da quelli già presenti ed elimina solo quelli non contenuti nella configurazione",
+            configItem=setting_delta_install
+        )
+
+        # Installazione transazionale
+        setting_staged_install = AppSettings.staged_install
+        self.card_staged_install = SwitchSettingCard(
+            icon=FluentIcon.UPDATE,
+            title="Installazione transazionale",
+            content="Prepara le cartelle accanto a quelle installate e le sostituisce in un istante, conservando la versione precedente per il ripristino",
+            configItem=setting_staged_install
+        )
+
+        # Duplicazione senza copia
+        setting_link_duplicates = AppSettings.link_duplicates
+        self.card_link_duplicates = SwitchSettingCard(
+            icon=FluentIcon.COPY,
+            title="Duplicazione senza copia",
+            content="Le configurazioni duplicate condividono i file con l'originale invece di copiarli. Aprire la cartella di una configurazione ne copia tutti i file condivisi, aprire un file dalla ricerca copia solo quel file",
+            configItem=setting_link_duplicates
+        )
+
+        # Compressione esportazioni
+        setting_export_compression = AppSettings.export_compression
+        self.card_export_compression = OptionsSettingCard(
+            setting_export_compression,
+            icon=FluentIcon.ZIP_FOLDER,
+            title="Compressione esportazioni",
+            content="Livello di compressione degli archivi zip esportati: più alto produce file più piccoli ma richiede più tempo",
+            texts=["Nessuna", "Veloce", "Normale", "Massima"],
+        )
+
+        # Compressione Zstandard
+        setting_export_zstd = AppSettings.export_zstd
+        self.card_export_zstd = SwitchSettingCard(
+            icon=FluentIcon.SPEED_HIGH,
+            title="Compressione Zstandard",
+            content="Esporta archivi più piccoli e più veloci da creare, apribili solo da archiviatori recenti (es. 7-Zip 24). Richiede il pacchetto zstandard",
+            configItem=setting_export_zstd
+        )
+
         grp_manager = SettingGroupManager(self.tr("Snapshots"), self)
         grp_manager.add_widget(setting_catalogue, self.card_general_catalogue, self.signal_ask_catalogue_path)
         grp_manager.add_widget(setting_tags, self.card_fav_tags, None)
@@ -122,6 +201,41 @@ class WidgetSettings(DevlizQFrame):
         grp_manager.add_widget(setting_backup_before_install, self.card_backup_before_install,None)
         grp_manager.add_widget(setting_backup_before_edit, self.card_backup_before_edit, None)
         grp_manager.add_widget(setting_backup_before_delete, self.card_backup_before_delete, None)
+        grp_manager.add_widget(setting_backup_max_count, self.card_backup_max_count, None)
+        grp_manager.add_widget(setting_backup_max_age_days, self.card_backup_max_age_days, None)
+        grp_manager.add_widget(setting_backup_max_size_gb, self.card_backup_max_size_gb, None)
+        grp_manager.add_widget(setting_blob_store, self.card_blob_store, None)
+        grp_manager.add_widget(setting_delta_install, self.card_delta_install, None)
+        grp_manager.add_widget(setting_staged_install, self.card_staged_install, None)
+        grp_manager.add_widget(setting_link_duplicates, self.card_link_duplicates, None)
+        grp_manager.add_widget(setting_export_compression, self.card_export_compression, None)
+        grp_manager.add_widget(setting_export_zstd, self.card_export_zstd, None)
+        grp_manager.install_group_on(layout)
+
+
+    def __add_group_search(self, layout: QVBoxLayout):
+
+        # Processi di ricerca
+        setting_search_workers = AppSettings.search_workers
+        self.card_search_workers = RangeSettingCard(
+            setting_search_workers,
+            icon=FluentIcon.SEARCH,
+            title="Processi di ricerca",
+            content="Numero di processi usati per cercare in parallelo nei file di uno snapshot (1 = nessun parallelismo)"
+        )
+
+        # Dimensione massima dei file
+        setting_search_max_file_size = AppSettings.search_max_file_size
+        self.card_search_max_file_size = RangeSettingCard(
+            setting_search_max_file_size,
+            icon=FluentIcon.DOCUMENT,
+            title="Dimensione massima file (MB)",
+            content="I file più grandi di questa dimensione vengono ignorati durante la ricerca nel contenuto"
+        )
+
+        grp_manager = SettingGroupManager(self.tr("Ricerca"), self)
+        grp_manager.add_widget(setting_search_workers, self.card_search_workers, None)
+        grp_manager.add_widget(setting_search_max_file_size, self.card_search_max_file_size, None)
         grp_manager.install_group_on(layout)
 
 
@@ -213,7 +327,7 @@ class WidgetSettings(DevlizQFrame):
             icon=FluentIcon.DELETE,
             title="Cancella Backups di " +  app.name,
             #content="Questa operazione eliminerà tutti i file di backup creati dall'applicazione. (Attualmente: " + size_str + ")"
-            content="Questa operazione eliminerà tutti i file di backup creati dall'applicazione."
+            content="Questa operazione eliminerà tutti i file di backup creati dall'applicazione. I backup sono incrementali: i file invariati sono condivisi tra backup successivi."
         )
 
         # Tema applicazione
@@ -0,0 +1,96 @@
+"""
+Measures the cost of filtering the catalogue while a query is typed.
+
+Usage:
+    python benchmarks/bench_catalogue_filter.py [--snapshots 10000] [--query "configurazione 12"]
+
+The query is typed one character at a time. For every keystroke the time of the
+filter alone and of the filter plus the table update is reported, and compared
+with lowercasing every field of every snapshot at each keystroke (what the
+catalogue did before it was indexed). One frame is 16.7 ms.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QCoreApplication  # noqa: E402
+from pylizlib.core.os.snap import Snapshot  # noqa: E402
+
+from atomdev.core.catalogue_filter import CatalogueFilter  # noqa: E402
+from atomdev.model.catalogue import SnapshotTableModel  # noqa: E402
+
+
+def make_snapshots(count: int) -> list[Snapshot]:
+    """Creates `count` snapshots with varied names, tags and custom data."""
+    families = ["Speedy", "Flex", "Cutter", "Hydra", "Città"]
+    return [
+        Snapshot(
+            id=f"snap{i:06d}",
+            name=f"Configurazione {i}",
+            desc=f"Impianto {families[i % len(families)]} linea {i % 97}",
+            author=f"utente{i % 13}",
+            tags=["JIRA", "IntLay", f"T{i % 17}"],
+            data={"Famiglia": families[i % len(families)], "Macchina": f"M{i % 211}"},
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_filter(snapshots: list[Snapshot], text: str) -> list[Snapshot]:
+    text = text.lower().strip()
+    return [
+        config for config in snapshots
+        if (text in config.name.lower() or
+            text in config.desc.lower() or
+            any(text in tag.lower() for tag in config.tags) or
+            (config.data and any(text in str(value).lower() for value in config.data.values())))
+    ]
+
+
+def type_query(query: str, run) -> list[float]:
+    times = []
+    for i in range(1, len(query) + 1):
+        start = time.perf_counter()
+        run(query[:i])
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def report(name: str, times: list[float]):
+    print(f"{name:<28} median {statistics.median(times):7.2f} ms   max {max(times):7.2f} ms per keystroke")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshots", type=int, default=10_000, help="The number of snapshots of the catalogue.")
+    parser.add_argument("--query", default="configurazione 12", help="The query typed.")
+    args = parser.parse_args()
+
+    qt_app = QCoreApplication.instance() or QCoreApplication(sys.argv)  # noqa: F841
+    snapshots = make_snapshots(args.snapshots)
+
+    catalogue_filter = CatalogueFilter()
+    start = time.perf_counter()
+    catalogue_filter.set_snapshots(snapshots)
+    print(f"Index built for {args.snapshots} snapshots in {(time.perf_counter() - start) * 1000:.1f} ms")
+    start = time.perf_counter()
+    catalogue_filter.set_snapshots(make_snapshots(args.snapshots))
+    print(f"Index refreshed with unchanged snapshots in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    report("legacy filter", type_query(args.query, lambda text: legacy_filter(snapshots, text)))
+    report("inverted index", type_query(args.query, catalogue_filter.filter))
+
+    model = SnapshotTableModel()
+    model.set_snapshots(snapshots)
+    catalogue_filter.set_snapshots(snapshots)
+    report("inverted index + table update", type_query(args.query, lambda text: model.update_snapshots(catalogue_filter.filter(text))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Checks that scan_file finds what SnapshotSearcher finds, then compares their speed.
+
+Usage:
+    python benchmarks/bench_scanner.py [--lines 200000] [--repeat 3]
+
+The check runs TEXT and REGEX queries (including ones matching the line break,
+like "foo\\s" or ";\\n") over small UTF-8 files with LF, CRLF and CR line breaks,
+with and without a line break at the end, with and without non-ASCII text,
+scanned in windows of a few bytes so lines fall on every window boundary. The
+byte offset of every result must be where its line starts. It stops at the
+first difference. Files that are not valid UTF-8 are left out on purpose:
+SnapshotSearcher stops at the first invalid byte, scan_file reads it as U+FFFD
+and goes on.
+
+The benchmark then searches a large generated file with both.
+"""
+import argparse
+import re
+import statistics
+import sys
+import tempfile
+import time
+from itertools import accumulate
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pylizlib.core.os.snap import SnapshotSearcher, SnapshotSearchParams, QueryType  # noqa: E402
+
+from atomdev.core.scanner import scan_file  # noqa: E402
+
+SAMPLE_LINES = ["foo", "foo bar;", "  indented foo  ", "", "città;", "bar foo", "x;y;", "\tfoo\t", "end"]
+ASCII_SAMPLE_LINES = [line for line in SAMPLE_LINES if line.isascii()]
+QUERIES = [
+    (QueryType.TEXT, "foo"),
+    (QueryType.TEXT, ";"),
+    (QueryType.TEXT, "città"),
+    (QueryType.REGEX, r"foo\s"),
+    (QueryType.REGEX, r";\n"),
+    (QueryType.REGEX, r"^foo$"),
+    (QueryType.REGEX, r"\s$"),
+    (QueryType.REGEX, r"^$"),
+    (QueryType.REGEX, r"(?i)END"),
+]
+WINDOW_SIZES = [1, 7, 64, 4 * 1024 * 1024]
+
+
+def get_key(results) -> list[tuple]:
+    return [(result.searched_text, result.line_number, result.line_content) for result in results]
+
+
+def check_equivalence(directory: Path) -> int:
+    """Compares scan_file with SnapshotSearcher on every sample; returns the number of comparisons."""
+    searcher = SnapshotSearcher(None)
+    checked = 0
+    samples = [(lines, newline, terminated) for lines in (SAMPLE_LINES, ASCII_SAMPLE_LINES)
+               for newline in ("\n", "\r\n", "\r") for terminated in (True, False)]
+    for lines, newline, terminated in samples:
+        data = (newline.join(lines) + (newline if terminated else "")).encode("utf-8")
+        line_starts = [0, *accumulate(map(len, data.splitlines(keepends=True)))]
+        path = directory.joinpath("sample.txt")
+        path.write_bytes(data)
+        for query_type, query in QUERIES:
+            params = SnapshotSearchParams(query=query, query_type=query_type)
+            regex = re.compile(query) if query_type == QueryType.REGEX else None
+            expected = get_key(searcher._search_in_file(path, params, regex, "s"))
+            for window_size in WINDOW_SIZES:
+                results = scan_file(path, params, regex, "s", window_size=window_size)
+                found = get_key(results)
+                if any(result.byte_offset != line_starts[result.line_number - 1] for result in results):
+                    raise AssertionError(f"{query!r} on {newline!r} lines (window={window_size}): wrong byte offsets")
+                if found != expected:
+                    raise AssertionError(f"{query!r} on {newline!r} lines (terminated={terminated}, window={window_size}): "
+                                         f"expected {expected}, found {found}")
+                checked += 1
+    return checked
+
+
+def bench(name: str, search, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(search())
+        times.append(time.perf_counter() - start)
+    print(f"{name:<28} {statistics.median(times) * 1000:8.1f} ms   ({count} results)")
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=200_000, help="The number of lines of the large file.")
+    parser.add_argument("--repeat", type=int, default=3, help="The number of runs measured (the median is shown).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp:
+        directory = Path(temp)
+        print(f"scan_file matches SnapshotSearcher in {check_equivalence(directory)} comparisons")
+
+        path = directory.joinpath("large.txt")
+        path.write_text("".join(f"line {i} value={i * 7} {'needle' if i % 1000 == 0 else 'hay'};\n" for i in range(args.lines)), encoding="utf-8")
+        searcher = SnapshotSearcher(None)
+        for query_type, query in [(QueryType.TEXT, "needle"), (QueryType.REGEX, r"needle;\s")]:
+            params = SnapshotSearchParams(query=query, query_type=query_type)
+            regex = re.compile(query) if query_type == QueryType.REGEX else None
+            print(f"{query_type.name} {query!r}")
+            base = bench("SnapshotSearcher", lambda: searcher._search_in_file(path, params, regex, "s"), args.repeat)
+            scan = bench("scan_file", lambda: scan_file(path, params, regex, "s"), args.repeat)
+            print(f"{'':<28} {base / scan:8.2f}x faster")
+
+
+if __name__ == "__main__":
+    main()
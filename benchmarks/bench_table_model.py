@@ -0,0 +1,102 @@
+"""
+Measures the cost of repainting the catalogue table, per visible row.
+
+Usage:
+    python benchmarks/bench_table_model.py [--snapshots 1000] [--visible 40] [--repaints 200]
+
+A repaint asks the model for the text of every visible cell. The benchmark
+scrolls through a synthetic catalogue one page at a time and compares the
+cached rows of SnapshotTableModel with formatting every cell on request (what
+the model did before: reading the settings and building the whole row once
+per cell).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QCoreApplication, Qt  # noqa: E402
+from pylizlib.core.os.snap import Snapshot  # noqa: E402
+
+from atomdev.application.app import app_settings, AppSettings  # noqa: E402
+from atomdev.model.catalogue import SnapshotTableModel  # noqa: E402
+
+
+def make_snapshots(count: int) -> list[Snapshot]:
+    """Creates `count` snapshots with tags and the custom data of the settings."""
+    keys = app_settings.get(AppSettings.snap_custom_data)
+    start = datetime(2024, 1, 1)
+    return [
+        Snapshot(
+            id=f"snap{i:06d}",
+            name=f"Configurazione {i}",
+            desc=f"Descrizione della configurazione numero {i}",
+            tags=["JIRA", "IntLay", f"T{i % 17}"],
+            date_created=start + timedelta(minutes=i),
+            data={key: f"{key} {i % 23}" for key in keys},
+        )
+        for i in range(count)
+    ]
+
+
+def uncached_cell(snapshot: Snapshot, column: int) -> str:
+    keys = app_settings.get(AppSettings.snap_custom_data)
+    return str(snapshot.get_for_table_array(keys)[column])
+
+
+def repaint_cached(model: SnapshotTableModel, first_row: int, visible: int):
+    role = Qt.ItemDataRole.DisplayRole
+    for row in range(first_row, min(first_row + visible, model.rowCount())):
+        for column in range(model.columnCount()):
+            model.data(model.index(row, column), role)
+
+
+def repaint_uncached(model: SnapshotTableModel, first_row: int, visible: int):
+    # Same index handling as the view, but every cell formatted from the snapshot.
+    for row in range(first_row, min(first_row + visible, model.rowCount())):
+        for column in range(model.columnCount()):
+            index = model.index(row, column)
+            uncached_cell(model.get_snapshot(index.row()), index.column())
+
+
+def bench(name: str, repaint, model: SnapshotTableModel, visible: int, repaints: int) -> float:
+    times = []
+    rows = model.rowCount()
+    for i in range(repaints):
+        first_row = (i * visible) % max(1, rows - visible)
+        start = time.perf_counter()
+        repaint(model, first_row, visible)
+        times.append(time.perf_counter() - start)
+    per_row = statistics.median(times) / visible * 1_000_000
+    print(f"{name:<28} {per_row:8.2f} us per visible row   ({statistics.median(times) * 1000:.3f} ms per repaint)")
+    return per_row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshots", type=int, default=1000, help="The number of snapshots of the catalogue.")
+    parser.add_argument("--visible", type=int, default=40, help="The number of rows visible in the table.")
+    parser.add_argument("--repaints", type=int, default=200, help="The number of repaints measured (the median is shown).")
+    args = parser.parse_args()
+
+    qt_app = QCoreApplication.instance() or QCoreApplication(sys.argv)  # noqa: F841
+    snapshots = make_snapshots(args.snapshots)
+    model = SnapshotTableModel()
+    start = time.perf_counter()
+    model.set_snapshots(snapshots)
+    print(f"Rows built for {args.snapshots} snapshots in {(time.perf_counter() - start) * 1000:.1f} ms, "
+          f"{model.columnCount()} columns")
+
+    base = bench("format on every cell", repaint_uncached, model, args.visible, args.repaints)
+    cached = bench("cached rows", repaint_cached, model, args.visible, args.repaints)
+    print(f"{'':<28} {base / cached:8.2f}x faster")
+
+
+if __name__ == "__main__":
+    main()
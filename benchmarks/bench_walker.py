@@ -0,0 +1,90 @@
+"""
+Compares the shared directory walker with Path.rglob on a large tree.
+
+Usage:
+    python benchmarks/bench_walker.py [--path DIR] [--files 100000] [--repeat 3]
+
+Without --path a temporary tree with the requested number of small files is
+created (and deleted at the end). Run it against a network share with --path to
+see the effect of the parallel listing on slow file systems.
+"""
+import argparse
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from atomdev.core.walker import walk, DEFAULT_WALK_WORKERS  # noqa: E402
+
+
+def make_tree(root: Path, files: int, files_per_dir: int = 50, dirs_per_dir: int = 8):
+    """Creates `files` small files spread over a tree of nested directories."""
+    created = 0
+    pending = [root]
+    while created < files:
+        directory = pending.pop(0)
+        directory.mkdir(parents=True, exist_ok=True)
+        for i in range(min(files_per_dir, files - created)):
+            directory.joinpath(f"file{i}.txt").write_bytes(b"x" * (i % 512))
+            created += 1
+        pending.extend(directory.joinpath(f"dir{i}") for i in range(dirs_per_dir))
+
+
+def rglob_size(root: Path) -> tuple[int, int]:
+    count = size = 0
+    for path in root.rglob("*"):
+        if path.is_file():
+            count += 1
+            size += path.stat().st_size
+    return count, size
+
+
+def walker_size(root: Path, workers: int) -> tuple[int, int]:
+    count = size = 0
+    for entry in walk(root, max_workers=workers):
+        count += 1
+        size += entry.size
+    return count, size
+
+
+def bench(name: str, func, repeat: int):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    print(f"{name:<24} {statistics.median(times):8.3f} s   files={result[0]} bytes={result[1]}")
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", type=Path, default=None, help="An existing tree to walk.")
+    parser.add_argument("--files", type=int, default=100_000, help="The number of files of the generated tree.")
+    parser.add_argument("--repeat", type=int, default=3, help="The number of runs of each walker (the median is shown).")
+    args = parser.parse_args()
+
+    temp_dir = None
+    root = args.path
+    if root is None:
+        temp_dir = tempfile.mkdtemp(prefix="atomdev-bench-")
+        root = Path(temp_dir)
+        print(f"Creating {args.files} files in {root}...")
+        make_tree(root, args.files)
+    try:
+        base = bench("Path.rglob + stat", lambda: rglob_size(root), args.repeat)
+        for workers in sorted({1, DEFAULT_WALK_WORKERS}):
+            elapsed = bench(f"walk ({workers} threads)", lambda: walker_size(root, workers), args.repeat)
+            print(f"{'':<24} {base / elapsed:8.2f}x faster than rglob")
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()